@@ -1,8 +1,7 @@
-from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Optional, Union
-
-from pydantic import BaseModel, ConfigDict
+from abc import abstractmethod
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Union
 
+from astsynth.enumeration import SearchStrategy
 from astsynth.program.blanks import (
     Blank,
     BlankContent,
@@ -12,39 +11,169 @@ from astsynth.program.blanks import (
 )
 
 if TYPE_CHECKING:
+    from astsynth.generator import ProgramGenerator
     from astsynth.program.graph import ProgramGraph
 
 
-class Stop(BaseModel):
-    model_config = ConfigDict(frozen=True)
+class _Action:
+    """Immutable slotted action, hashed once from its fields,
+    and compared by identity before comparing fields."""
+
+    __slots__ = ("_hash",)
+    _hash: int
+
+    def _fields(self) -> tuple[Any, ...]:
+        return ()
+
+    def _freeze(self, **fields: Any) -> None:
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_hash", hash((type(self).__name__, *self._fields())))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
+    def __hash__(self) -> int:
+        return self._hash
 
-class FillBlanks(BaseModel):
-    model_config = ConfigDict(frozen=True)
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        assert isinstance(other, _Action)
+        return self._hash == other._hash and self._fields() == other._fields()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Stop(_Action):
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        self._freeze()
+
+
+class FillBlanks(_Action):
+    __slots__ = ("blanks_contents",)
     blanks_contents: tuple[tuple[Blank, BlankContent], ...]
 
+    def __init__(self, blanks_contents: tuple[tuple[Blank, BlankContent], ...]) -> None:
+        self._freeze(blanks_contents=blanks_contents)
+
+    def _fields(self) -> tuple[Any, ...]:
+        return (self.blanks_contents,)
 
-class EmptySubBlanks(BaseModel):
-    model_config = ConfigDict(frozen=True)
-    parent_blank: Optional[Blank] = None
+
+class EmptySubBlanks(_Action):
+    __slots__ = ("parent_blank", "blanks")
+    parent_blank: Optional[Blank]
     blanks: tuple[Blank, ...]
 
+    def __init__(
+        self, blanks: tuple[Blank, ...], parent_blank: Optional[Blank] = None
+    ) -> None:
+        self._freeze(parent_blank=parent_blank, blanks=blanks)
+
+    def _fields(self) -> tuple[Any, ...]:
+        return (self.parent_blank, self.blanks)
 
-class JumpToFrontiere(BaseModel):
-    model_config = ConfigDict(frozen=True)
+
+class JumpToFrontiere(_Action):
+    __slots__ = ("config",)
     config: ProgramHash
 
+    def __init__(self, config: ProgramHash) -> None:
+        self._freeze(config=config)
+
+    def _fields(self) -> tuple[Any, ...]:
+        return (self.config,)
+
 
 SynthAction = Union[Stop, FillBlanks, EmptySubBlanks, JumpToFrontiere]
 
 
-class SynthesisAgent(ABC):
+class Candidates:
+    """Candidate actions of the generator, indexed by kind and blank set.
+
+    Iterating over candidates gives every action in the generator order.
+
+    """
+
+    def __init__(self, actions: Iterable[SynthAction]) -> None:
+        self.actions: list[SynthAction] = []
+        self.fill_blanks: list[FillBlanks] = []
+        self.constant_fill_blanks: list[FillBlanks] = []
+        self.constant_fill_blanks_by_blanks: dict[
+            tuple[Blank, ...], list[FillBlanks]
+        ] = {}
+        self.empty_sub_blanks: list[EmptySubBlanks] = []
+        self.empty_sub_blanks_by_blanks: dict[tuple[Blank, ...], int] = {}
+        """Index of the first EmptySubBlanks action of each blank set."""
+        self.jumps_to_frontiere: list[JumpToFrontiere] = []
+        self.stop: Optional[Stop] = None
+
+        for action in actions:
+            self.actions.append(action)
+            match action:
+                case FillBlanks():
+                    self.fill_blanks.append(action)
+                    if all_constants(action):
+                        self.constant_fill_blanks.append(action)
+                        self.constant_fill_blanks_by_blanks.setdefault(
+                            action_blanks(action), []
+                        ).append(action)
+                case EmptySubBlanks():
+                    self.empty_sub_blanks_by_blanks.setdefault(
+                        action.blanks, len(self.empty_sub_blanks)
+                    )
+                    self.empty_sub_blanks.append(action)
+                case JumpToFrontiere():
+                    self.jumps_to_frontiere.append(action)
+                case Stop():
+                    self.stop = action
+
+    def __iter__(self) -> Iterator[SynthAction]:
+        return iter(self.actions)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def __getitem__(self, index: int) -> SynthAction:
+        return self.actions[index]
+
+
+class SynthesisAgent(SearchStrategy):
     """Agent choosing which program blank to fill and with what available content."""
 
+    keeps_complete_programs_in_frontiere: bool = False
+    """Complete programs reached by a fill stay jump candidates until generated,
+    so that the agent can generate them after programs of other branches."""
+
+    def enumerate(
+        self, generator: "ProgramGenerator", max_depth: int
+    ) -> Iterator["ProgramGraph"]:
+        return generator.enumerate_step_by_step(agent=self, max_depth=max_depth)
+
     @abstractmethod
-    def act(self, candidates: list[SynthAction], graph: "ProgramGraph") -> SynthAction:
+    def act(self, candidates: Candidates, graph: "ProgramGraph") -> SynthAction:
         """Agent action in the given context."""
 
+    def act_batch(
+        self, candidates: Candidates, graph: "ProgramGraph"
+    ) -> list[SynthAction]:
+        """Ordered batch of agent actions in the given context.
+
+        Every action of the batch must be one of the given candidates,
+        they are applied in order before candidates are computed again.
+        Complete programs reached by the batch are all generated,
+        but only the program reached by the last action has its candidates explored.
+
+        """
+        return [self.act(candidates=candidates, graph=graph)]
+
 
 class TopDownBFS(SynthesisAgent):
     """Top down enumeration of all programs
@@ -57,66 +186,69 @@ class TopDownBFS(SynthesisAgent):
     def __init__(self) -> None:
         self.blanks_with_other_constants: set[tuple[Blank, ...]] = set()
 
-    def act(self, candidates: list[SynthAction], graph: "ProgramGraph") -> SynthAction:
-        fill_blanks = [
-            action for action in candidates if isinstance(action, FillBlanks)
-        ]
-
-        fill_blanks_with_variable: list[FillBlanks] = []
-        for action in fill_blanks:
-            if all_constants(action):
-                fill_blanks_with_variable.append(action)
-
-        if fill_blanks_with_variable:
-            fill_blank_action = fill_blanks_with_variable[0]
-            current_blanks = set(
-                blank for blank, _content in fill_blank_action.blanks_contents
-            )
-
-            other_blanks_constants: list[FillBlanks] = []
-            for action in fill_blanks:
-                other_blanks = set(blank for blank, _content in action.blanks_contents)
-                if (
-                    action != fill_blank_action
-                    and other_blanks == current_blanks
-                    and all_constants(action)
-                ):
-                    other_blanks_constants.append(action)
-
-            if other_blanks_constants:
-                blanks = tuple(
-                    [blank for blank, _content in fill_blank_action.blanks_contents]
-                )
+    def act(self, candidates: Candidates, graph: "ProgramGraph") -> SynthAction:
+        if candidates.constant_fill_blanks:
+            fill_blank_action = candidates.constant_fill_blanks[0]
+            blanks = action_blanks(fill_blank_action)
+            if len(candidates.constant_fill_blanks_by_blanks[blanks]) > 1:
                 self.blanks_with_other_constants.add(blanks)
             return fill_blank_action
 
-        empty_blanks = [
-            action for action in candidates if isinstance(action, EmptySubBlanks)
+        empty_blank_indexes = [
+            candidates.empty_sub_blanks_by_blanks[blanks]
+            for blanks in self.blanks_with_other_constants
+            if blanks in candidates.empty_sub_blanks_by_blanks
         ]
-        for empty_blank_action in empty_blanks:
-            if empty_blank_action.blanks in self.blanks_with_other_constants:
-                self.blanks_with_other_constants.remove(empty_blank_action.blanks)
-                return empty_blank_action
+        if empty_blank_indexes:
+            empty_blank_action = candidates.empty_sub_blanks[min(empty_blank_indexes)]
+            self.blanks_with_other_constants.remove(empty_blank_action.blanks)
+            return empty_blank_action
 
-        if fill_blanks:
+        if candidates.fill_blanks:
             self.blanks_with_other_constants = set()
-            return fill_blanks[0]
+            return candidates.fill_blanks[0]
 
-        available_frontiere = [
-            action for action in candidates if isinstance(action, JumpToFrontiere)
-        ]
-        if available_frontiere:
+        if candidates.jumps_to_frontiere:
             self.blanks_with_other_constants = set()
-            return available_frontiere[0]
+            return candidates.jumps_to_frontiere[0]
+
+        if candidates.empty_sub_blanks:
+            return candidates.empty_sub_blanks[0]
+
+        if candidates.stop is None:  # pragma: no cover
+            raise ValueError("Candidates should always contain a Stop action")
+        return candidates.stop
+
+    def act_batch(
+        self, candidates: Candidates, graph: "ProgramGraph"
+    ) -> list[SynthAction]:
+        """Fill sibling blanks with all their constant options at once.
+
+        One by one, each constant fill would be followed by emptying the same blanks,
+        so the batch gives the same programs in the same order.
+
+        """
+        constant_fills = candidates.constant_fill_blanks
+        if len(constant_fills) > 1:
+            blanks = action_blanks(constant_fills[0])
+            if self.blanks_with_other_constants <= {blanks} and _are_sibling_blanks(
+                blanks, graph
+            ):
+                self.blanks_with_other_constants = set()
+                return list(constant_fills)
+        return [self.act(candidates=candidates, graph=graph)]
+
+
+def action_blanks(action: FillBlanks) -> tuple[Blank, ...]:
+    return tuple(blank for blank, _content in action.blanks_contents)
 
-        empty_blanks = [
-            action for action in candidates if isinstance(action, EmptySubBlanks)
-        ]
-        if empty_blanks:
-            return empty_blanks[0]
 
-        stop = [action for action in candidates if isinstance(action, Stop)].pop()
-        return stop
+def _are_sibling_blanks(blanks: tuple[Blank, ...], graph: "ProgramGraph") -> bool:
+    """Check if blanks are exactly the ones emptied by a single EmptySubBlanks."""
+    if blanks == (graph.root,):
+        return True
+    parent = graph.parent(blanks[0])
+    return parent is not None and tuple(graph.sub_blanks(*parent)) == blanks
 
 
 def all_constants(action: FillBlanks) -> bool:
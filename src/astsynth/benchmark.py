@@ -0,0 +1,364 @@
+"""Reproducible benchmarks of synthesis throughput and scaling.
+
+Each benchmark case synthesizes a task with a planted solution from a canonical DSL,
+and measures the enumeration rate, the evaluation rate, the peak memory
+and the time to the first solution, as depth, DSL size and example count grow.
+Reports are written as JSON, and compared to a baseline report to catch regressions:
+
+    python -m astsynth.benchmark --output report.json --baseline baseline.json
+
+"""
+
+import argparse
+import itertools
+import random
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional, Sequence
+
+from pydantic import BaseModel
+
+from astsynth.agent import TopDownBFS
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.namer import DefaultProgramNamer
+from astsynth.program.evaluate import Evaluator
+from astsynth.program.writter import graph_to_program
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+
+STRING_DSL_SOURCE = """
+TWO = 2
+THREE = 3
+
+def repeat(string: str, times: int) -> str:
+    return string * times
+
+def concat(string: str, other_string: str) -> str:
+    return string + other_string
+"""
+
+ARITHMETIC_DSL_SOURCE = """
+ONE = 1
+TWO = 2
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+def sub(a: int, b: int) -> int:
+    return a - b
+
+def mul(a: int, b: int) -> int:
+    return a * b
+"""
+
+LIST_DSL_SOURCE = """
+ONE = 1
+
+def reverse(items: list[int]) -> list[int]:
+    return items[::-1]
+
+def sort(items: list[int]) -> list[int]:
+    return sorted(items)
+
+def concat(items: list[int], other_items: list[int]) -> list[int]:
+    return items + other_items
+
+def drop(items: list[int], count: int) -> list[int]:
+    return items[count:]
+
+def length(items: list[int]) -> int:
+    return len(items)
+"""
+
+DSL_SOURCES = {
+    "string": STRING_DSL_SOURCE,
+    "arithmetic": ARITHMETIC_DSL_SOURCE,
+    "list": LIST_DSL_SOURCE,
+}
+"""Canonical DSLs of the benchmarks, the string one being the README example."""
+
+
+class BenchmarkTask(NamedTuple):
+    name: str
+    dsl: str
+    """Name of the canonical DSL of the task."""
+    solution_depth: int
+    """Depth of the planted solution."""
+    solution: Callable[..., Any]
+    """Planted solution, giving the expected output of example inputs."""
+    random_inputs: Callable[[random.Random], dict[str, Any]]
+
+    def task(self, n_examples: int, seed: int = 0) -> Task:
+        rng = random.Random(seed)
+        examples = []
+        for _ in range(n_examples):
+            inputs = self.random_inputs(rng)
+            examples.append((inputs, self.solution(**inputs)))
+        return Task.from_tuples(examples)
+
+
+def _random_string(rng: random.Random) -> dict[str, Any]:
+    return {"s": "".join(rng.choices("abc", k=rng.randint(1, 4)))}
+
+
+def _random_int(rng: random.Random) -> dict[str, Any]:
+    return {"x": rng.randint(-10, 10)}
+
+
+def _random_list(rng: random.Random) -> dict[str, Any]:
+    return {"items": [rng.randint(0, 9) for _ in range(rng.randint(2, 5))]}
+
+
+BENCHMARK_TASKS = [
+    BenchmarkTask("string_repeat", "string", 1, lambda s: s * 3, _random_string),
+    BenchmarkTask("string_frame", "string", 2, lambda s: s + s * 2, _random_string),
+    BenchmarkTask(
+        "string_nested", "string", 3, lambda s: (s + s * 2) * 2, _random_string
+    ),
+    BenchmarkTask(
+        "arithmetic_successor", "arithmetic", 1, lambda x: x + 1, _random_int
+    ),
+    BenchmarkTask(
+        "arithmetic_product", "arithmetic", 2, lambda x: x * (x + 2), _random_int
+    ),
+    BenchmarkTask(
+        "arithmetic_polynomial",
+        "arithmetic",
+        3,
+        lambda x: x * (x + 1) + 2,
+        _random_int,
+    ),
+    BenchmarkTask("list_reverse", "list", 1, lambda items: items[::-1], _random_list),
+    BenchmarkTask(
+        "list_sorted_tail", "list", 2, lambda items: sorted(items)[1:], _random_list
+    ),
+    BenchmarkTask(
+        "list_palindrome",
+        "list",
+        3,
+        lambda items: sorted(items) + sorted(items)[::-1],
+        _random_list,
+    ),
+]
+"""Tasks of increasing difficulty for each canonical DSL."""
+
+
+class BenchmarkCase(NamedTuple):
+    task: BenchmarkTask
+    max_depth: int
+    n_examples: int
+    n_operation_copies: int
+    """Number of renamed copies of each DSL operation, growing the DSL size."""
+
+
+class BenchmarkResult(BaseModel):
+    task: str
+    dsl: str
+    max_depth: int
+    n_examples: int
+    n_operations: int
+    """Number of operations in the DSL."""
+    n_programs: int
+    """Number of programs enumerated up to the maximum depth."""
+    enumeration_rate: float
+    """Programs enumerated per second, without writing nor evaluating them."""
+    evaluation_rate: float
+    """Programs compiled and evaluated on the task per second."""
+    peak_memory: int
+    """Peak memory (bytes) allocated while enumerating programs."""
+    time_to_first_solution: Optional[float]
+    """Time (s) for the synthesizer to find a first solution, None if none was found."""
+
+    @property
+    def key(self) -> tuple[str, int, int, int]:
+        return (self.task, self.max_depth, self.n_examples, self.n_operations)
+
+
+class BenchmarkReport(BaseModel):
+    python_version: str
+    results: list[BenchmarkResult]
+
+
+def benchmark_cases(
+    tasks: Sequence[BenchmarkTask] = BENCHMARK_TASKS,
+    max_depths: Sequence[int] = (1, 2),
+    examples_counts: Sequence[int] = (5, 50),
+    operation_copies: Sequence[int] = (0, 1),
+) -> list[BenchmarkCase]:
+    """Cases of every task for every scaling parameter,
+    only keeping depths from which the planted solution can be found."""
+    return [
+        BenchmarkCase(task, max_depth, n_examples, n_copies)
+        for task, max_depth, n_examples, n_copies in itertools.product(
+            tasks, max_depths, examples_counts, operation_copies
+        )
+        if max_depth >= task.solution_depth
+    ]
+
+
+def benchmark_dsl(
+    dsl_name: str, task: Task, n_operation_copies: int = 0
+) -> DomainSpecificLanguage:
+    """Canonical DSL with the task inputs and renamed copies of its operations."""
+    source = DSL_SOURCES[dsl_name]
+    copies = [
+        re.sub(r"^def (\w+)\(", rf"def \1_{copy_index}(", source, flags=re.MULTILINE)
+        for copy_index in range(n_operation_copies)
+    ]
+    dsl = load_symbols_from_python_source(source)
+    for copy_source in copies:
+        copy_dsl = load_symbols_from_python_source(copy_source)
+        dsl.operations += copy_dsl.operations
+    dsl.add_task_inputs(task)
+    return dsl
+
+
+def run_case(case: BenchmarkCase, seed: int = 0) -> BenchmarkResult:
+    task = case.task.task(n_examples=case.n_examples, seed=seed)
+    dsl = benchmark_dsl(case.task.dsl, task, case.n_operation_copies)
+
+    def _generator() -> ProgramGenerator:
+        return ProgramGenerator(
+            dsl=dsl, output_type=task.output_type, agent=TopDownBFS()
+        )
+
+    start_time = time.perf_counter()
+    graphs = list(_generator().enumerate(max_depth=case.max_depth))
+    enumeration_time = time.perf_counter() - start_time
+    n_programs = len(graphs)
+
+    namer = DefaultProgramNamer()
+    programs = [graph_to_program(graph, namer.name(graph), dsl) for graph in graphs]
+    evaluator = Evaluator(dsl)
+    start_time = time.perf_counter()
+    for program in programs:
+        evaluator.program_succeeds_on_task(program, task)
+    evaluation_time = time.perf_counter() - start_time
+    del graphs, programs
+
+    tracemalloc.start()
+    for _graph in _generator().enumerate(max_depth=case.max_depth):
+        pass
+    _current, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    synthesizer = Synthesizer(dsl=dsl, task=task)
+    start_time = time.perf_counter()
+    first_success = next(iter(synthesizer.run_iter(max_depth=case.max_depth)), None)
+    time_to_first_solution = (
+        time.perf_counter() - start_time if first_success is not None else None
+    )
+    return BenchmarkResult(
+        task=case.task.name,
+        dsl=case.task.dsl,
+        max_depth=case.max_depth,
+        n_examples=case.n_examples,
+        n_operations=len(dsl.operations),
+        n_programs=n_programs,
+        enumeration_rate=_rate(n_programs, enumeration_time),
+        evaluation_rate=_rate(n_programs, evaluation_time),
+        peak_memory=peak_memory,
+        time_to_first_solution=time_to_first_solution,
+    )
+
+
+def run_suite(
+    cases: Sequence[BenchmarkCase],
+    seed: int = 0,
+    progress: Optional[Callable[[BenchmarkResult], None]] = None,
+) -> BenchmarkReport:
+    results = []
+    for case in cases:
+        result = run_case(case, seed=seed)
+        if progress is not None:
+            progress(result)
+        results.append(result)
+    return BenchmarkReport(python_version=sys.version, results=results)
+
+
+def find_regressions(
+    baseline: BenchmarkReport, report: BenchmarkReport, tolerance: float = 0.25
+) -> list[str]:
+    """Describe each measure worse than the baseline by more than the tolerance,
+    on cases present in both reports."""
+    baseline_results = {result.key: result for result in baseline.results}
+    regressions = []
+    for result in report.results:
+        reference = baseline_results.get(result.key)
+        if reference is None:
+            continue
+        for rate_name in ("enumeration_rate", "evaluation_rate"):
+            rate = getattr(result, rate_name)
+            reference_rate = getattr(reference, rate_name)
+            if rate < reference_rate * (1 - tolerance):
+                regressions.append(
+                    f"{result.key}: {rate_name} {rate:.1f} < {reference_rate:.1f}"
+                )
+        if result.peak_memory > reference.peak_memory * (1 + tolerance):
+            regressions.append(
+                f"{result.key}: peak_memory {result.peak_memory}"
+                f" > {reference.peak_memory}"
+            )
+        if result.n_programs != reference.n_programs:
+            regressions.append(
+                f"{result.key}: n_programs {result.n_programs}"
+                f" != {reference.n_programs}"
+            )
+        if (
+            reference.time_to_first_solution is not None
+            and result.time_to_first_solution is None
+        ):
+            regressions.append(f"{result.key}: no solution found anymore")
+    return regressions
+
+
+def _rate(n_programs: int, duration: float) -> float:
+    return n_programs / duration if duration > 0 else float("inf")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--max-depths", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--examples-counts", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--operation-copies", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--dsls", nargs="+", default=list(DSL_SOURCES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    cases = benchmark_cases(
+        tasks=[task for task in BENCHMARK_TASKS if task.dsl in args.dsls],
+        max_depths=args.max_depths,
+        examples_counts=args.examples_counts,
+        operation_copies=args.operation_copies,
+    )
+
+    def _print_progress(result: BenchmarkResult) -> None:
+        print(
+            f"{result.task} depth={result.max_depth} examples={result.n_examples}"
+            f" operations={result.n_operations}: {result.n_programs} programs,"
+            f" {result.enumeration_rate:.0f} enumerated/s,"
+            f" {result.evaluation_rate:.0f} evaluated/s",
+            file=sys.stderr,
+        )
+
+    report = run_suite(cases, seed=args.seed, progress=_print_progress)
+    args.output.write_text(report.model_dump_json(indent=2))
+
+    if args.baseline is None:
+        return 0
+    baseline = BenchmarkReport.model_validate_json(args.baseline.read_text())
+    regressions = find_regressions(baseline, report, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
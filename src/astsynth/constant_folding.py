@@ -0,0 +1,162 @@
+"""Folding of constant-only subexpressions into derived constants.
+
+Subexpressions only made of DSL constants, such as `add(TWO, THREE)`,
+have the same value in every program and on every example.
+They are evaluated once here, deduplicated by value, and given to the generator
+as derived constants, so that it does not enumerate them as operation subtrees.
+
+"""
+
+import itertools
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from astsynth.hashing import Digest, canonical_digest
+from astsynth.program.blanks import Constant, DerivedConstant, Operation
+from astsynth.program.evaluate import operations_functions
+from astsynth.type_lattice import TypeLattice
+
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+
+
+FoldedExpression = tuple[str, tuple[str, ...]]
+"""Name of an operation and names of the constants it is applied to."""
+
+EVALUATION_ERRORS: tuple[type[Exception], ...] = (
+    ArithmeticError,
+    AssertionError,
+    AttributeError,
+    LookupError,
+    TypeError,
+    ValueError,
+)
+"""Exceptions meaning that an expression has no value, such as a division by zero.
+Other exceptions, such as a missing name or module, are failures to report."""
+
+
+class FoldedConstants(NamedTuple):
+    constants: list[DerivedConstant]
+    """Derived constants with a value distinct from every other constant."""
+    depth: int
+    """Depth up to which every constant-only subexpression was folded."""
+    expressions: set[FoldedExpression]
+    """Expressions whose value is the value of a DSL or derived constant."""
+
+
+def fold_constants(
+    dsl: "DomainSpecificLanguage",
+    max_depth: int = 1,
+    max_derived_constants: int = 1000,
+) -> FoldedConstants:
+    """Evaluate constant-only subexpressions of pure operations up to the given depth.
+
+    Expressions raising one of the `EVALUATION_ERRORS` or giving a value without
+    a stable digest are not folded, the generator then still enumerates them.
+    Expressions giving the value of a shallower constant are folded into it.
+    If `max_derived_constants` is reached, the folding depth is the last depth
+    that was fully explored.
+
+    """
+    operations = [operation for operation in dsl.operations if operation.pure]
+    functions = operations_functions(dsl, operations)
+    lattice = TypeLattice()
+
+    pool: list[Constant] = list(dsl.constants)
+    seen_values: set[Digest] = set()
+    for constant in pool:
+        seen_values.add(canonical_digest(constant.value))
+    taken_names = {constant.name for constant in pool}
+    derived_constants: list[DerivedConstant] = []
+    folded_expressions: set[FoldedExpression] = set()
+
+    for depth in range(1, max_depth + 1):
+        new_constants: list[DerivedConstant] = []
+        for operation in operations:
+            arguments_options = [
+                [
+                    constant
+                    for constant in pool
+                    if lattice.is_subtype(constant.type, input_type)
+                ]
+                for input_type in operation.inputs_types.values()
+            ]
+            for arguments in itertools.product(*arguments_options):
+                if max((_depth(arg) for arg in arguments), default=0) != depth - 1:
+                    continue
+                try:
+                    value = functions[operation.name](
+                        *(argument.value for argument in arguments)
+                    )
+                    value_digest = canonical_digest(value, stable=True)
+                except EVALUATION_ERRORS:
+                    continue
+                expression = (
+                    operation.name,
+                    tuple(argument.name for argument in arguments),
+                )
+                if value_digest in seen_values:
+                    folded_expressions.add(expression)
+                    continue
+                if len(derived_constants) >= max_derived_constants:
+                    return FoldedConstants(
+                        derived_constants, depth - 1, folded_expressions
+                    )
+                seen_values.add(value_digest)
+                folded_expressions.add(expression)
+
+                derived_constant = _derived_constant(
+                    operation, arguments, value, depth, taken_names
+                )
+                taken_names.add(derived_constant.name)
+                new_constants.append(derived_constant)
+                derived_constants.append(derived_constant)
+        pool += new_constants
+
+    return FoldedConstants(derived_constants, max_depth, folded_expressions)
+
+
+def _derived_constant(
+    operation: Operation,
+    arguments: tuple[Constant, ...],
+    value: Any,
+    depth: int,
+    taken_names: set[str],
+) -> DerivedConstant:
+    name = "_".join(
+        [operation.name.upper()] + [argument.name for argument in arguments]
+    )
+    unique_name = name
+    for index in itertools.count(1):
+        if unique_name not in taken_names:
+            break
+        unique_name = f"{name}_{index}"
+
+    constants: dict[str, Constant] = {}
+    operations: dict[str, Operation] = {operation.name: operation}
+    for argument in arguments:
+        if isinstance(argument, DerivedConstant):
+            constants.update((c.name, c) for c in argument.constants)
+            operations.update((op.name, op) for op in argument.operations)
+        else:
+            constants[argument.name] = argument
+
+    return DerivedConstant(
+        name=unique_name,
+        value=value,
+        expression=f"{operation.name}({', '.join(_expression(a) for a in arguments)})",
+        depth=depth,
+        constants=list(constants.values()),
+        operations=list(operations.values()),
+    )
+
+
+def _expression(constant: Constant) -> str:
+    if isinstance(constant, DerivedConstant):
+        return constant.expression
+    return constant.name
+
+
+def _depth(constant: Constant) -> int:
+    if isinstance(constant, DerivedConstant):
+        return constant.depth
+    return 0
@@ -1,21 +1,43 @@
 import ast
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Type
+from typing import TYPE_CHECKING, Any, Optional
 
 from pydantic import BaseModel, Field
 
-from astsynth.program.blanks import Input, Operation, Constant
+from astsynth.program.blanks import (
+    Input,
+    Operation,
+    Constant,
+    DerivedConstant,
+    operation,
+    operation_metadata,
+)
+from astsynth.type_lattice import normalize_type
 
 if TYPE_CHECKING:
-    from astsynth.task import Task
+    from astsynth.task import ExamplesProvider
+
+__all__ = [
+    "DomainSpecificLanguage",
+    "load_symbols_from_python_file",
+    "load_symbols_from_python_source",
+    "operation",
+]
 
 
 class DomainSpecificLanguage(BaseModel):
     inputs: list[Input] = Field(default_factory=list)
     constants: list[Constant] = Field(default_factory=list)
     operations: list[Operation] = Field(default_factory=list)
-
-    def add_task_inputs(self, task: "Task") -> None:
+    folded_constants_depth: int = 0
+    """Depth up to which constant-only subexpressions are folded into constants."""
+    folded_expressions: set[tuple[str, tuple[str, ...]]] = Field(default_factory=set)
+    """Constant-only subexpressions, as (operation name, constants names),
+    whose value is the value of a constant, so that they are not enumerated."""
+    prelude: str = ""
+    """Imports and classes of the DSL source, written before programs using them."""
+
+    def add_task_inputs(self, task: "ExamplesProvider") -> None:
         self.inputs += [
             Input(name=name, type=type) for name, type in task.input_types.items()
         ]
@@ -27,6 +49,28 @@ class DomainSpecificLanguage(BaseModel):
         self.inputs += other.inputs
         self.constants += other.constants
         self.operations += other.operations
+        self.prelude = "\n".join(
+            prelude for prelude in (self.prelude, other.prelude) if prelude
+        )
+
+    def add_folded_constants(
+        self, max_depth: int = 1, max_derived_constants: int = 1000
+    ) -> list[DerivedConstant]:
+        """Add constants derived from constant-only subexpressions.
+
+        The generator then no longer enumerates the folded constant-only
+        subexpressions, as constants stand for them.
+
+        """
+        from astsynth.constant_folding import fold_constants
+
+        folded = fold_constants(
+            self, max_depth=max_depth, max_derived_constants=max_derived_constants
+        )
+        self.constants += folded.constants
+        self.folded_constants_depth = folded.depth
+        self.folded_expressions |= folded.expressions
+        return folded.constants
 
 
 def _check_empty_intersection(list_a: list, list_b: list) -> None:
@@ -39,12 +83,16 @@ def _check_empty_intersection(list_a: list, list_b: list) -> None:
 
 def load_symbols_from_python_source(source: str) -> DomainSpecificLanguage:
     module = ast.parse(source)
-    exec(compile(module, filename="<ast>", mode="exec"), locals())
+    namespace: dict[str, Any] = {}
+    exec(compile(module, filename="<ast>", mode="exec"), namespace)
 
     constants: list[Constant[Any]] = []
     operations: list[Operation] = []
+    prelude: list[str] = []
 
     for element in module.body:
+        if isinstance(element, (ast.Import, ast.ImportFrom, ast.ClassDef)):
+            prelude.append(ast.unparse(element))
         if isinstance(element, ast.Assign):
             if len(element.targets) != 1:
                 raise NotImplementedError
@@ -62,7 +110,7 @@ def load_symbols_from_python_source(source: str) -> DomainSpecificLanguage:
                         f"Missing argument type annotation of argument {arg.arg}"
                         f" of function {element.name} in given source"
                     )
-                input_types[arg.arg] = _annotation_to_type(arg.annotation)
+                input_types[arg.arg] = _annotation_to_type(arg.annotation, namespace)
 
             if element.returns is None:
                 raise ValueError(
@@ -80,18 +128,45 @@ def load_symbols_from_python_source(source: str) -> DomainSpecificLanguage:
             new_op = Operation(
                 name=element.name,
                 source="\n".join(op_source_lines),
-                output_type=_annotation_to_type(element.returns),
+                output_type=_annotation_to_type(element.returns, namespace),
                 inputs_types=input_types,
+                **operation_metadata(namespace[element.name]),
             )
             operations.append(new_op)
 
-    return DomainSpecificLanguage(constants=constants, operations=operations)
+    return DomainSpecificLanguage(
+        constants=constants, operations=operations, prelude="\n".join(prelude)
+    )
+
+
+def load_symbols_from_python_file(
+    filepath: Path, cache_dir: Optional[Path] = None
+) -> DomainSpecificLanguage:
+    """Load a DSL from a python file.
+
+    If a cache directory is given, the DSL is loaded from its precompiled artifact
+    there, which is created on the first load.
+
+    """
+    source = filepath.read_text()
+    if cache_dir is not None:
+        from astsynth.dsl_cache import load_symbols_cached
+
+        return load_symbols_cached(source, cache_dir)
+    return load_symbols_from_python_source(source)
 
 
-def load_symbols_from_python_file(filepath: Path) -> DomainSpecificLanguage:
-    return load_symbols_from_python_source(filepath.read_text())
+def _annotation_to_type(annotation: ast.expr, namespace: dict[str, Any]) -> Any:
+    """Evaluate an annotation in the DSL namespace.
 
+    Any annotation valid in the DSL module is supported: plain and user classes,
+    parametric types such as list[int], Optional[str] or unions.
 
-def _annotation_to_type(annotation: ast.expr) -> Type[Any]:
-    type_name: ast.Name = annotation  # type: ignore
-    return eval(type_name.id)
+    """
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        annotation = ast.parse(annotation.value, mode="eval").body
+    type_expression = eval(
+        compile(ast.Expression(annotation), filename="<annotation>", mode="eval"),
+        namespace,
+    )
+    return normalize_type(type_expression)
@@ -0,0 +1,172 @@
+"""Precompiled DSL artifacts, cached on disk by source hash.
+
+Loading a DSL from source executes it, walks its ast and evaluates every annotation.
+A compiled artifact keeps the result of this work: constants, operations metadata,
+a table of the annotations they use and the bytecode of the DSL module.
+Workers can then get a ready `DomainSpecificLanguage` from a cache directory
+without parsing nor validating anything, the annotations being evaluated
+in the namespace of the executed bytecode, so that they can refer to DSL classes.
+
+"""
+
+import ast
+import hashlib
+import importlib.util
+import marshal
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.program.blanks import Constant, Operation
+from astsynth.type_lattice import normalize_type
+
+ARTIFACT_SUFFIX = ".dslc"
+ARTIFACT_VERSION = 4
+
+
+class OperationRecord(BaseModel):
+    """Operation metadata, referring to types by their index in the annotations table."""
+
+    name: str
+    source: str
+    output_type: int
+    inputs_types: dict[str, int]
+    pure: bool
+    cost: float
+    can_raise: bool
+    vectorizable: bool
+
+
+class DslArtifact(BaseModel):
+    """Compiled form of a DSL source."""
+
+    source_hash: str
+    constants: list[tuple[str, Any]]
+    operations: list[OperationRecord]
+    annotations: list[str]
+    """Table of the sources of the type annotations of operations."""
+    prelude: str
+    """Imports and classes of the DSL source."""
+    code: bytes
+    """Marshaled bytecode of the DSL module."""
+
+    @classmethod
+    def compile(cls, source: str) -> "DslArtifact":
+        dsl = load_symbols_from_python_source(source)
+        annotations: list[str] = []
+
+        def _annotation_index(annotation: ast.expr) -> int:
+            if isinstance(annotation, ast.Constant) and isinstance(
+                annotation.value, str
+            ):
+                annotation_source = annotation.value
+            else:
+                annotation_source = ast.unparse(annotation)
+            if annotation_source not in annotations:
+                annotations.append(annotation_source)
+            return annotations.index(annotation_source)
+
+        operations = []
+        for op in dsl.operations:
+            function_def: ast.FunctionDef = ast.parse(op.source).body[0]  # type: ignore
+            operations.append(
+                OperationRecord(
+                    name=op.name,
+                    source=op.source,
+                    output_type=_annotation_index(function_def.returns),  # type: ignore
+                    inputs_types={
+                        arg.arg: _annotation_index(arg.annotation)  # type: ignore
+                        for arg in function_def.args.args
+                    },
+                    pure=op.pure,
+                    cost=op.cost,
+                    can_raise=op.can_raise,
+                    vectorizable=op.vectorizable,
+                )
+            )
+        return cls(
+            source_hash=source_hash(source),
+            constants=[(constant.name, constant.value) for constant in dsl.constants],
+            operations=operations,
+            annotations=annotations,
+            prelude=dsl.prelude,
+            code=marshal.dumps(compile(source, filename="<dsl>", mode="exec")),
+        )
+
+    def to_dsl(self) -> DomainSpecificLanguage:
+        """Build the DSL without validation, the artifact was validated on compile."""
+        namespace = self.namespace()
+        types = [
+            normalize_type(eval(annotation, namespace))
+            for annotation in self.annotations
+        ]
+        return DomainSpecificLanguage.model_construct(
+            inputs=[],
+            constants=[
+                Constant.model_construct(name=name, value=value)
+                for name, value in self.constants
+            ],
+            operations=[
+                Operation.model_construct(
+                    name=record.name,
+                    source=record.source,
+                    output_type=types[record.output_type],
+                    inputs_types={
+                        name: types[type_index]
+                        for name, type_index in record.inputs_types.items()
+                    },
+                    pure=record.pure,
+                    cost=record.cost,
+                    can_raise=record.can_raise,
+                    vectorizable=record.vectorizable,
+                )
+                for record in self.operations
+            ],
+            prelude=self.prelude,
+        )
+
+    def namespace(self) -> dict[str, Any]:
+        """Execute the DSL bytecode, giving its constants and functions by name."""
+        namespace: dict[str, Any] = {}
+        exec(marshal.loads(self.code), namespace)
+        return namespace
+
+
+def source_hash(source: str) -> str:
+    """Hash of a DSL source, also depending on the python bytecode version."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(ARTIFACT_VERSION.to_bytes(4, "little"))
+    hasher.update(importlib.util.MAGIC_NUMBER)
+    hasher.update(source.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def load_symbols_cached(source: str, cache_dir: Path) -> DomainSpecificLanguage:
+    """Load the DSL of the given source from its cached artifact, compiling it if missing."""
+    return load_artifact_cached(source, cache_dir).to_dsl()
+
+
+def load_artifact_cached(source: str, cache_dir: Path) -> DslArtifact:
+    artifact_path = cache_dir / (source_hash(source) + ARTIFACT_SUFFIX)
+    if artifact_path.exists():
+        with open(artifact_path, mode="rb") as artifact_file:
+            artifact: DslArtifact = pickle.load(artifact_file)
+        return artifact
+
+    artifact = DslArtifact.compile(source)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write then rename so that concurrent workers never read a partial artifact.
+    file_descriptor, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as artifact_file:
+            pickle.dump(artifact, artifact_file)
+        os.replace(tmp_path, artifact_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return artifact
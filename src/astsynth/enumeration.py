@@ -0,0 +1,128 @@
+"""Strategies of the generator to enumerate programs.
+
+Agents choose generator actions step by step among candidates computed for them.
+Other strategies enumerate programs by themselves from the fills of empty blanks,
+without candidates: a beam search keeping a bounded number of partial programs,
+and a constant-memory canonical depth-first search.
+
+"""
+
+from abc import ABC, abstractmethod
+import heapq
+import itertools
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+from astsynth.program.graph import ProgramGraph
+
+if TYPE_CHECKING:
+    from astsynth.generator import ProgramGenerator
+
+
+class SearchStrategy(ABC):
+    """How the generator enumerates programs."""
+
+    n_discarded_states: int = 0
+    """Number of partial programs discarded without exploring them."""
+
+    @abstractmethod
+    def enumerate(
+        self, generator: "ProgramGenerator", max_depth: int
+    ) -> Iterator[ProgramGraph]:
+        """Programs of the generator up to the given depth."""
+
+
+class BeamSearch(SearchStrategy):
+    """Bounded-memory beam search over programs.
+
+    Programs are enumerated depth by depth, only keeping the
+    `beam_width` partial programs of best score at each depth,
+    so that memory does not depend on the maximum depth.
+    The search is incomplete: programs only reachable from discarded partial
+    programs are never generated, they are counted in `n_discarded_states`.
+
+    """
+
+    def __init__(
+        self,
+        beam_width: int = 100,
+        score: Optional[Callable[[ProgramGraph], float]] = None,
+    ) -> None:
+        self.beam_width = beam_width
+        self.score = score if score is not None else smallest_first
+        self.n_discarded_states = 0
+
+    def enumerate(
+        self, generator: "ProgramGenerator", max_depth: int
+    ) -> Iterator[ProgramGraph]:
+        beam = [ProgramGraph(output_type=generator.output_type)]
+        order = itertools.count()
+        for depth in range(max_depth + 1):
+            next_beam: list[tuple[float, int, ProgramGraph]] = []
+            for graph in beam:
+                consequences = generator.fill_blanks_consequences(graph)
+                for _blanks_contents, would_be_graph in consequences:
+                    if would_be_graph.complete:
+                        yield would_be_graph
+                        continue
+                    if depth + 1 > max_depth:
+                        continue
+
+                    # Negative order so that the latest of equal scores is dropped first.
+                    scored_graph = (
+                        self.score(would_be_graph),
+                        -next(order),
+                        would_be_graph,
+                    )
+                    if len(next_beam) < self.beam_width:
+                        heapq.heappush(next_beam, scored_graph)
+                        continue
+                    heapq.heappushpop(next_beam, scored_graph)
+                    self.n_discarded_states += 1
+
+            beam = [graph for _score, _order, graph in sorted(next_beam, reverse=True)]
+            if not beam:
+                return
+
+
+class CanonicalDFS(SearchStrategy):
+    """Constant-memory depth-first enumeration in a canonical order.
+
+    Each step fills every empty blank of a partial program, so a program
+    can only be reached from the empty program by a single sequence of fills.
+    Programs are enumerated depth first with a stack of lazy iterators,
+    giving each program exactly once without remembering visited programs,
+    with memory only growing with the maximum depth.
+
+    """
+
+    def enumerate(
+        self, generator: "ProgramGenerator", max_depth: int
+    ) -> Iterator[ProgramGraph]:
+        """Enumerate programs depth first, in the order of fill consequences.
+
+        The stack holds, for each partial program of the current path, its depth
+        and the iterator over its remaining fills, nothing else is remembered.
+
+        """
+        root = ProgramGraph(output_type=generator.output_type)
+        stack = [(0, generator.fill_blanks_consequences(root))]
+        while stack:
+            depth, consequences = stack[-1]
+            next_consequence = next(consequences, None)
+            if next_consequence is None:
+                stack.pop()
+                continue
+            _blanks_contents, would_be_graph = next_consequence
+            if would_be_graph.complete:
+                yield would_be_graph
+                continue
+            if depth + 1 > max_depth:
+                continue
+            stack.append(
+                (depth + 1, generator.fill_blanks_consequences(would_be_graph))
+            )
+
+
+def smallest_first(graph: ProgramGraph) -> float:
+    """Default beam score, keeping partial programs with the fewest nodes."""
+    return -graph.number_of_nodes()
@@ -1,11 +1,12 @@
 from copy import deepcopy
 import itertools
-from typing import Generator, Sequence, Type
+from typing import Any, Generator, Iterator, Sequence, Type
 
 from networkx import DiGraph
 
 
 from astsynth.agent import (
+    Candidates,
     EmptySubBlanks,
     JumpToFrontiere,
     SynthAction,
@@ -17,19 +18,37 @@ from astsynth.agent import (
 from astsynth.program.blanks import (
     Blank,
     BlankContent,
+    Constant,
     ProgramHash,
     StandardOperation,
 )
 from astsynth.dsl import DomainSpecificLanguage
+from astsynth.enumeration import SearchStrategy
+from astsynth.profiling import Profiler
 from astsynth.program.graph import ProgramGraph
+from astsynth.tracing import (
+    ACTION_CHOSEN,
+    EARLY_REJECTION,
+    PROGRAM_EMITTED,
+    STATE_EXPANDED,
+    SearchHooks,
+)
+from astsynth.type_lattice import TypeLattice
 
 
 class ProgramGenerator:
+    """Generate programs of the DSL giving the output type.
+
+    Programs are enumerated by the given search strategy: either an agent choosing
+    actions step by step among candidates, or a strategy enumerating fills itself.
+
+    """
+
     def __init__(
         self,
         dsl: DomainSpecificLanguage,
         output_type: Type[object],
-        agent: SynthesisAgent,
+        agent: SearchStrategy,
         standard_operations: list[StandardOperation] | None = None,
     ) -> None:
         self.output_type = output_type
@@ -43,8 +62,49 @@ class ProgramGenerator:
             + list(self.dsl.operations)
             + standard_operations
         )
+        self.type_lattice = TypeLattice(
+            [output_type, bool]
+            + [_content_type(content) for content in self.available_contents]
+            + [
+                input_type
+                for operation in self.dsl.operations
+                for input_type in operation.inputs_types.values()
+            ]
+        )
+        self._contents_by_blank_type: dict[Any, list[BlankContent]] = {}
+        self.profiler = Profiler(enabled=False)
+        self.hooks = SearchHooks()
+
+    def contents_for_type(self, blank_type: Any) -> list[BlankContent]:
+        """Available contents that can fill a blank of the given type."""
+        contents = self._contents_by_blank_type.get(blank_type)
+        if contents is None:
+            contents = [
+                content
+                for content in self.available_contents
+                if self.type_lattice.is_subtype(_content_type(content), blank_type)
+            ]
+            self._contents_by_blank_type[blank_type] = contents
+        return contents
 
-    def enumerate(self, max_depth: int) -> Generator[ProgramGraph, None, None]:
+    def enumerate(self, max_depth: int) -> Iterator[ProgramGraph]:
+        programs = self.agent.enumerate(generator=self, max_depth=max_depth)
+        if not self.hooks.subscribers:
+            return programs
+        return self._traced_programs(programs)
+
+    def _traced_programs(
+        self, programs: Iterator[ProgramGraph]
+    ) -> Generator[ProgramGraph, None, None]:
+        for graph in programs:
+            self.hooks.emit(PROGRAM_EMITTED, n_nodes=graph.number_of_nodes())
+            yield graph
+
+    def enumerate_step_by_step(
+        self, agent: SynthesisAgent, max_depth: int
+    ) -> Generator[ProgramGraph, None, None]:
+        """Enumerate programs by applying the actions the agent chooses
+        among the candidates of the current partial program."""
         current_graph = ProgramGraph(output_type=self.output_type)
 
         programs_graph = DiGraph()
@@ -58,39 +118,62 @@ class ProgramGenerator:
         frontiere: dict[ProgramHash, ProgramGraph] = {
             current_graph.hashable_config: current_graph
         }
-        actions_consequences: dict[SynthAction, ProgramGraph] = self._update_frontiere(
-            frontiere=frontiere,
-            programs_graph=programs_graph,
-            current_graph=current_graph,
-            max_depth=max_depth,
-        )
+        profiler = self.profiler
+        hooks = self.hooks
+        with profiler.phase("generate"):
+            actions_consequences: dict[SynthAction, ProgramGraph] = (
+                self._update_frontiere(
+                    frontiere=frontiere,
+                    programs_graph=programs_graph,
+                    current_graph=current_graph,
+                    max_depth=max_depth,
+                    keep_complete_programs=agent.keeps_complete_programs_in_frontiere,
+                )
+            )
 
         if not actions_consequences:
             raise SynthesisError(
                 f"Could not find any way to generate output type: {self.output_type}"
             )
 
-        done = False
-        while not done:
-            action = self.agent.act(
-                candidates=list(actions_consequences.keys()),
-                graph=current_graph,
-            )
+        while True:
+            profiler.record_step(len(actions_consequences), len(frontiere))
+            if hooks.subscribers:
+                hooks.emit(
+                    STATE_EXPANDED,
+                    n_candidates=len(actions_consequences),
+                    frontier_size=len(frontiere),
+                )
+            with profiler.phase("agent"):
+                actions = agent.act_batch(
+                    candidates=Candidates(actions_consequences.keys()),
+                    graph=current_graph,
+                )
 
-            done = isinstance(action, Stop)
-            if done:
-                return
+            for action_index, action in enumerate(actions):
+                if hooks.subscribers:
+                    hooks.emit(ACTION_CHOSEN, action=type(action).__name__)
+                if isinstance(action, Stop):
+                    return
 
-            current_graph = actions_consequences[action]
-            if current_graph.complete:
-                yield current_graph
+                profiler.n_taken_actions += 1
 
-            actions_consequences = self._update_frontiere(
-                frontiere=frontiere,
-                programs_graph=programs_graph,
-                current_graph=current_graph,
-                max_depth=max_depth,
-            )
+                current_graph = actions_consequences[action]
+                if current_graph.complete:
+                    yield current_graph
+                    if action_index < len(actions) - 1:
+                        # Complete programs have nothing left to explore,
+                        # only the last program of the batch gets its candidates.
+                        _mark_explored(programs_graph, frontiere, current_graph)
+
+            with profiler.phase("generate"):
+                actions_consequences = self._update_frontiere(
+                    frontiere=frontiere,
+                    programs_graph=programs_graph,
+                    current_graph=current_graph,
+                    max_depth=max_depth,
+                    keep_complete_programs=agent.keeps_complete_programs_in_frontiere,
+                )
 
     def _update_frontiere(
         self,
@@ -98,6 +181,7 @@ class ProgramGenerator:
         programs_graph: DiGraph,
         current_graph: ProgramGraph,
         max_depth: int,
+        keep_complete_programs: bool = False,
     ) -> dict[SynthAction, ProgramGraph]:
         current_config = current_graph.hashable_config
         programs_graph.nodes[current_config]["explored"] = True
@@ -106,15 +190,9 @@ class ProgramGenerator:
             frontiere.pop(current_config)
         available_actions_results: dict[SynthAction, ProgramGraph] = {}
 
-        fill_blank_options: dict[Blank, list[tuple[Blank, BlankContent]]] = {}
         for blank in current_graph.blanks:
             blank_content = current_graph.content(blank)
             if blank_content is None:
-                fill_blank_options[blank] = _available_fill_blank_contents(
-                    candidate_contents=self.available_contents,
-                    blank=blank,
-                    graph=current_graph,
-                )
                 continue
 
             match blank_content.kind:
@@ -145,16 +223,15 @@ class ProgramGenerator:
                 available_actions_results[empty_return_action] = would_be_graph
                 continue
 
-        for blanks_contents in itertools.product(*fill_blank_options.values()):
+        for blanks_contents, would_be_graph in self.fill_blanks_consequences(
+            current_graph
+        ):
             action = FillBlanks(blanks_contents=blanks_contents)
             depth_increase = 0 if all_constants(action) else 1
-            would_be_graph = deepcopy(current_graph)
-            for blank, content in blanks_contents:
-                would_be_graph.fill_blank(blank=blank, content=content)
-
             would_be_config = would_be_graph.hashable_config
             would_be_depth = current_depth + depth_increase
             if would_be_config in programs_graph:
+                self.profiler.n_dedup_hits += 1
                 pred_depths_p1 = [
                     programs_graph.nodes[pred]["depth"] + 1
                     for pred in programs_graph.predecessors(would_be_config)
@@ -163,6 +240,8 @@ class ProgramGenerator:
                 programs_graph.nodes[would_be_config]["depth"] = would_be_depth
 
             if would_be_depth > max_depth:
+                if self.hooks.subscribers:
+                    self.hooks.emit(EARLY_REJECTION, reason="max_depth")
                 continue
 
             if would_be_config not in programs_graph:
@@ -172,54 +251,128 @@ class ProgramGenerator:
                     depth=would_be_depth,
                     program_graph=would_be_graph,
                 )
-                if not would_be_graph.complete:
+                if keep_complete_programs or not would_be_graph.complete:
                     frontiere[would_be_config] = would_be_graph
 
             programs_graph.add_edge(current_config, would_be_config, action=action)
             if programs_graph.nodes[would_be_config]["explored"]:
                 continue
 
-            available_actions_results[
-                FillBlanks(blanks_contents=blanks_contents)
-            ] = would_be_graph
+            available_actions_results[action] = would_be_graph
 
+        reachable_configs = {
+            graph.hashable_config for graph in available_actions_results.values()
+        }
         for config, graph in frontiere.items():
             if programs_graph.nodes[config]["depth"] > max_depth:  # pragma: no cover
                 continue
-            if config in [
-                g.hashable_config for g in available_actions_results.values()
-            ]:
+            if config in reachable_configs:
                 continue
             available_actions_results[JumpToFrontiere(config=config)] = graph
 
         available_actions_results[Stop()] = current_graph
         return available_actions_results
 
+    def fill_blank_options(
+        self, blank: Blank, graph: ProgramGraph
+    ) -> list[tuple[Blank, BlankContent]]:
+        """Available contents to fill the given empty blank of the graph."""
+        return _available_fill_blank_contents(
+            candidate_contents=self.contents_for_type(blank.type),
+            blank=blank,
+            graph=graph,
+        )
+
+    def fill_blanks_consequences(
+        self, graph: ProgramGraph
+    ) -> Iterator[tuple[tuple[tuple[Blank, BlankContent], ...], ProgramGraph]]:
+        """Every way to fill all empty blanks of the graph, with the resulting graph."""
+        fill_blank_options: list[list[tuple[Blank, BlankContent]]] = [
+            self.fill_blank_options(blank, graph) for blank in graph.empty_blanks
+        ]
+        for blanks_contents in itertools.product(*fill_blank_options):
+            would_be_graph = deepcopy(graph)
+            for blank, content in blanks_contents:
+                would_be_graph.fill_blank(blank=blank, content=content)
+
+            if self.dsl.folded_expressions and _makes_folded_subexpression(
+                would_be_graph, blanks_contents, self.dsl.folded_expressions
+            ):
+                if self.hooks.subscribers:
+                    self.hooks.emit(EARLY_REJECTION, reason="folded_subexpression")
+                continue
+            yield blanks_contents, would_be_graph
+
+
+def _mark_explored(
+    programs_graph: DiGraph,
+    frontiere: dict[ProgramHash, ProgramGraph],
+    graph: ProgramGraph,
+) -> None:
+    config = graph.hashable_config
+    if config in programs_graph:
+        programs_graph.nodes[config]["explored"] = True
+    frontiere.pop(config, None)
+
 
 class SynthesisError(Exception):
     """Exception due to invalid program synthesis configuration"""
 
 
+def _makes_folded_subexpression(
+    graph: ProgramGraph,
+    blanks_contents: tuple[tuple[Blank, BlankContent], ...],
+    folded_expressions: set[tuple[str, tuple[str, ...]]],
+) -> bool:
+    """Check if filling blanks completed an operation only taking constants
+    that was folded into a derived constant or an other constant of same value."""
+    for blank, content in blanks_contents:
+        if not isinstance(content, Constant):
+            continue
+        parent = graph.parent(blank)
+        if parent is None:
+            continue
+        parent_blank, parent_content = parent
+        if parent_content.kind != "operation":
+            continue
+        sub_blanks = graph.sub_blanks(parent_blank, parent_content)
+        arguments = [
+            argument
+            for argument in map(graph.content, sub_blanks)
+            if isinstance(argument, Constant)
+        ]
+        if len(arguments) != len(sub_blanks):
+            continue
+        expression = (
+            parent_content.name,
+            tuple(argument.name for argument in arguments),
+        )
+        if expression in folded_expressions:
+            return True
+    return False
+
+
+def _content_type(content: BlankContent) -> Any:
+    match content.kind:
+        case "input" | "constant":
+            return content.type
+        case "operation":
+            return content.output_type
+    # We can always replace a blank by an if branch with the same return type
+    return Any
+
+
 def _available_fill_blank_contents(
     candidate_contents: Sequence[BlankContent], blank: Blank, graph: ProgramGraph
 ) -> list[tuple[Blank, BlankContent]]:
+    """Fill options of the blank among contents already matching its type."""
     available_actions: list[tuple[Blank, BlankContent]] = []
     for content in candidate_contents:
         match content.kind:
-            case "input" | "constant":
-                if not issubclass(content.type, blank.type):
-                    continue
-            case "operation":
-                if not issubclass(content.output_type, blank.type):
-                    continue
             case "if":
-                # We can always replace a blank by an if branch with the same return type
-                # But we avoid having if branches directly within an if
-                preds = list(graph.predecessors(blank))
-                if len(preds) > 0:
-                    pred_blank = list(graph.predecessors(preds[0]))[0]
-                    pred_content = graph.content(pred_blank)
-                    if pred_content and pred_content.kind == "if":
-                        continue
+                # If branches are written as the last statement of programs,
+                # so they can only fill the root blank
+                if graph.parent(blank) is not None:
+                    continue
         available_actions.append((blank, content))
     return available_actions
@@ -0,0 +1,351 @@
+"""Probabilistic grammar over program contents, fitted from solved programs.
+
+The grammar gives the probability of each content (operation, constant, input
+or if branching) to fill a blank given the context of this blank:
+the operation it is an argument of and the name of this argument.
+It is fitted offline by counting contents in a corpus of successful programs,
+then guides a best-first `ProbabilisticGrammarAgent`.
+
+"""
+
+import ast
+import heapq
+import itertools
+import json
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from astsynth.agent import (
+    Candidates,
+    FillBlanks,
+    JumpToFrontiere,
+    SynthAction,
+    SynthesisAgent,
+)
+from astsynth.program import GeneratedProgram
+from astsynth.program.blanks import Blank, BlankContent, ProgramHash
+
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+    from astsynth.program.graph import ProgramGraph
+
+Context = tuple[str, str]
+"""Context of a blank: (parent operation name, argument name)."""
+
+ROOT_CONTEXT: Context = ("return", "")
+
+
+class ProbabilisticGrammar:
+    """Smoothed probabilities of contents given their blank context.
+
+    Smoothing spreads probability over every known symbol: those of the corpus,
+    the given DSL symbols, and one more for any symbol unknown to both.
+
+    """
+
+    def __init__(
+        self,
+        counts: Optional[dict[Context, dict[str, int]]] = None,
+        smoothing: float = 1.0,
+        symbols: Iterable[str] = (),
+    ) -> None:
+        self.counts: dict[Context, dict[str, int]] = (
+            counts if counts is not None else {}
+        )
+        self.smoothing = smoothing
+        self.symbols = set(symbols).union(
+            *(context_counts.keys() for context_counts in self.counts.values())
+        )
+        self._n_symbols = 1 + len(self.symbols)
+        self._log_probabilities: dict[tuple[Context, str], float] = {}
+        self._best_log_probabilities: dict[Context, float] = {}
+
+    @classmethod
+    def fit(
+        cls,
+        programs: Iterable[GeneratedProgram],
+        smoothing: float = 1.0,
+        dsl: Optional["DomainSpecificLanguage"] = None,
+    ) -> "ProbabilisticGrammar":
+        """Count contents by context in the given successful programs,
+        smoothing over every symbol of the DSL if given."""
+        counts: dict[Context, dict[str, int]] = {}
+        for program in programs:
+            for context, symbol in program_productions(program):
+                context_counts = counts.setdefault(context, {})
+                context_counts[symbol] = context_counts.get(symbol, 0) + 1
+        return cls(
+            counts=counts,
+            smoothing=smoothing,
+            symbols=dsl_symbols(dsl) if dsl is not None else (),
+        )
+
+    def log_probability(self, context: Context, symbol: str) -> float:
+        key = (context, symbol)
+        log_probability = self._log_probabilities.get(key)
+        if log_probability is None:
+            context_counts = self.counts.get(context, {})
+            log_probability = self._smoothed_log_probability(
+                context_counts.get(symbol, 0), context_counts
+            )
+            self._log_probabilities[key] = log_probability
+        return log_probability
+
+    def best_log_probability(self, context: Context) -> float:
+        """Highest log probability of any content in the given context."""
+        best = self._best_log_probabilities.get(context)
+        if best is None:
+            context_counts = self.counts.get(context, {})
+            best = self._smoothed_log_probability(
+                max(context_counts.values(), default=0), context_counts
+            )
+            self._best_log_probabilities[context] = best
+        return best
+
+    def _smoothed_log_probability(
+        self, count: int, context_counts: dict[str, int]
+    ) -> float:
+        total = sum(context_counts.values())
+        return math.log(
+            (count + self.smoothing) / (total + self.smoothing * self._n_symbols)
+        )
+
+    def save(self, path: Path) -> None:
+        path.write_text(
+            json.dumps(
+                {
+                    "smoothing": self.smoothing,
+                    "symbols": sorted(self.symbols),
+                    "counts": {
+                        ">".join(context): context_counts
+                        for context, context_counts in self.counts.items()
+                    },
+                }
+            )
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "ProbabilisticGrammar":
+        data = json.loads(path.read_text())
+        return cls(
+            counts={
+                _parse_context(context): context_counts
+                for context, context_counts in data["counts"].items()
+            },
+            smoothing=data["smoothing"],
+            symbols=data.get("symbols", ()),
+        )
+
+
+def dsl_symbols(dsl: "DomainSpecificLanguage") -> set[str]:
+    """Symbols of every input, constant and operation of the DSL."""
+    contents: list[BlankContent] = [*dsl.inputs, *dsl.constants, *dsl.operations]
+    return {content_symbol(content) for content in contents}
+
+
+def program_productions(program: GeneratedProgram) -> Iterator[tuple[Context, str]]:
+    """Contents of a written program with their blank context, from its module ast."""
+    functions = {
+        statement.name: statement
+        for statement in program.module.body
+        if isinstance(statement, ast.FunctionDef)
+    }
+    arguments_names = {
+        name: [argument.arg for argument in function.args.args]
+        for name, function in functions.items()
+    }
+    program_function = functions[program.name]
+    shared_variables: dict[str, ast.expr] = {}
+    for statement in program_function.body:
+        if isinstance(statement, ast.Assign):
+            shared_variables[statement.targets[0].id] = statement.value  # type: ignore
+
+    def _expression_productions(
+        expression: ast.expr, context: Context
+    ) -> Iterator[tuple[Context, str]]:
+        if isinstance(expression, ast.Name):
+            if expression.id in shared_variables:
+                yield from _expression_productions(
+                    shared_variables[expression.id], context
+                )
+                return
+            yield context, expression.id
+        elif isinstance(expression, ast.Call) and isinstance(expression.func, ast.Name):
+            operation_name = expression.func.id
+            yield context, operation_name
+            for argument_name, argument in zip(
+                arguments_names.get(operation_name, []), expression.args
+            ):
+                yield from _expression_productions(
+                    argument, (operation_name, argument_name)
+                )
+
+    last_statement = program_function.body[-1]
+    if isinstance(last_statement, ast.Return) and last_statement.value is not None:
+        yield from _expression_productions(last_statement.value, ROOT_CONTEXT)
+    elif isinstance(last_statement, ast.If):
+        yield ROOT_CONTEXT, "if"
+        yield from _expression_productions(last_statement.test, ("if", "test"))
+        for branch, statements in (
+            ("body", last_statement.body),
+            ("else", last_statement.orelse),
+        ):
+            branch_return = statements[0]
+            if isinstance(branch_return, ast.Return) and branch_return.value:
+                yield from _expression_productions(branch_return.value, ("if", branch))
+
+
+class ProbabilisticGrammarAgent(SynthesisAgent):
+    """Best-first enumeration of the most likely programs under a grammar.
+
+    The score of a partial program is the log probability of its contents,
+    plus the best log probability of each of its empty blanks,
+    so that it bounds the score of any program completing it.
+    Partial programs of the frontier wait in a priority queue, trimmed to
+    the `max_queue_size` most likely ones when it grows twice larger,
+    less likely ones are then never expanded.
+    Complete programs are queued with the partial ones, so that programs
+    are generated from the most to the least likely. Complete programs reachable
+    from the current program are given at once while none of the queue is likelier.
+
+    Trimming the queue does not bound memory: trimmed programs are remembered
+    so that they are not queued again, and the generator keeps its own frontier
+    and graph of every program it reached.
+
+    """
+
+    keeps_complete_programs_in_frontiere = True
+
+    def __init__(
+        self, grammar: ProbabilisticGrammar, max_queue_size: int = 10_000
+    ) -> None:
+        self.grammar = grammar
+        self.max_queue_size = max_queue_size
+        self._queue: list[tuple[float, int, ProgramHash]] = []
+        self._seen_configs: set[ProgramHash] = set()
+        self._order = itertools.count()
+        self.n_discarded_states = 0
+
+    def act(self, candidates: Candidates, graph: "ProgramGraph") -> SynthAction:
+        return self.act_batch(candidates, graph)[0]
+
+    def act_batch(
+        self, candidates: Candidates, graph: "ProgramGraph"
+    ) -> list[SynthAction]:
+        self._enqueue(candidates.jumps_to_frontiere)
+
+        current_score = self.config_score(graph.hashable_config)
+        complete_fills = set(candidates.constant_fill_blanks)
+        best_fill: Optional[FillBlanks] = None
+        best_fill_score = -math.inf
+        for action in candidates.fill_blanks:
+            if action in complete_fills:
+                continue
+            score = current_score + self._fill_score_increase(action)
+            if score > best_fill_score:
+                best_fill, best_fill_score = action, score
+
+        jumps_configs = {jump.config for jump in candidates.jumps_to_frontiere}
+        while self._queue:
+            negative_score, _order, config = self._queue[0]
+            if config in jumps_configs:
+                break
+            # Explored or reachable by a fill action, can be queued again if seen later.
+            heapq.heappop(self._queue)
+            self._seen_configs.discard(config)
+
+        best_queued_score = -self._queue[0][0] if self._queue else -math.inf
+        best_other_score = max(best_queued_score, best_fill_score)
+        complete_fills_scores = {
+            action: current_score + self._fill_score_increase(action)
+            for action in candidates.constant_fill_blanks
+        }
+        likeliest_fills = sorted(
+            (
+                action
+                for action, score in complete_fills_scores.items()
+                if score >= best_other_score
+            ),
+            key=complete_fills_scores.__getitem__,
+            reverse=True,
+        )
+        if likeliest_fills:
+            # Other complete programs stay in the frontiere, and are queued later.
+            return list(likeliest_fills)
+
+        if self._queue and best_queued_score > best_fill_score:
+            _score, _order, config = heapq.heappop(self._queue)
+            self._seen_configs.discard(config)
+            return [JumpToFrontiere(config=config)]
+        if best_fill is not None:
+            return [best_fill]
+
+        if candidates.stop is None:  # pragma: no cover
+            raise ValueError("Candidates should always contain a Stop action")
+        return [candidates.stop]
+
+    def config_score(self, config: ProgramHash) -> float:
+        score = 0.0
+        for blank, content in config:
+            context = blank_context(blank)
+            if content is None:
+                score += self.grammar.best_log_probability(context)
+            else:
+                score += self.grammar.log_probability(context, content_symbol(content))
+        return score
+
+    def _fill_score_increase(self, action: FillBlanks) -> float:
+        increase = 0.0
+        for blank, content in action.blanks_contents:
+            context = blank_context(blank)
+            increase += self.grammar.log_probability(
+                context, content_symbol(content)
+            ) - self.grammar.best_log_probability(context)
+            for sub_context in _sub_blanks_contexts(content):
+                increase += self.grammar.best_log_probability(sub_context)
+        return increase
+
+    def _enqueue(self, jumps: list[JumpToFrontiere]) -> None:
+        for jump in jumps:
+            if jump.config in self._seen_configs:
+                continue
+            self._seen_configs.add(jump.config)
+            heapq.heappush(
+                self._queue,
+                (-self.config_score(jump.config), next(self._order), jump.config),
+            )
+
+        if len(self._queue) > 2 * self.max_queue_size:
+            # Trimming only when twice too large keeps pushes amortized logarithmic.
+            kept = heapq.nsmallest(self.max_queue_size, self._queue)
+            self.n_discarded_states += len(self._queue) - len(kept)
+            self._queue = kept
+            heapq.heapify(self._queue)
+
+
+def blank_context(blank: Blank) -> Context:
+    """Context of a blank, read from its id made of its parents path."""
+    if ">" not in blank.id:
+        return ROOT_CONTEXT
+    return _parse_context(blank.id)
+
+
+def content_symbol(content: BlankContent) -> str:
+    if content.kind == "if":
+        return "if"
+    return content.name
+
+
+def _sub_blanks_contexts(content: BlankContent) -> list[Context]:
+    match content.kind:
+        case "operation":
+            return [(content.name, input_name) for input_name in content.inputs_types]
+        case "if":
+            return [("if", "test"), ("if", "body"), ("if", "else")]
+    return []
+
+
+def _parse_context(path: str) -> Context:
+    parent, argument = path.split(">")[-2:]
+    return parent, argument
@@ -0,0 +1,124 @@
+"""Canonical content-based digests of example values.
+
+Values are walked structurally and fed to a blake2b hasher without being copied,
+so unhashable inputs such as lists, dicts, sets or arrays get stable keys.
+Two values with the same content get the same digest,
+whatever the insertion order of their dicts and sets.
+Other hashable values fall back on their python hash, which is only stable
+within a single process, and for objects hashed by identity only while they live.
+Digests that must be compared across processes or over time are made stable,
+raising an `UnstableDigestError` instead of falling back on python hashes.
+
+"""
+
+import hashlib
+import struct
+from typing import Any, Mapping
+
+from pydantic import BaseModel
+
+DIGEST_SIZE = 16
+
+Digest = bytes
+
+
+class UnstableDigestError(TypeError):
+    """A value has no content to digest, only a process dependent python hash."""
+
+
+def canonical_digest(value: Any, stable: bool = False) -> Digest:
+    """Digest of the content of the given value.
+
+    Args:
+        value: Value to digest.
+        stable: Raise an UnstableDigestError if part of the value can only be
+            digested from its python hash, instead of falling back on it.
+
+    """
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    _feed(hasher, value, stable)
+    return hasher.digest()
+
+
+def inputs_digest(inputs: Mapping[str, Any], stable: bool = False) -> Digest:
+    """Digest of named inputs, independent of the order they are given in."""
+    return canonical_digest(dict(inputs), stable=stable)
+
+
+def _feed(hasher: "hashlib.blake2b", value: Any, stable: bool) -> None:
+    match value:
+        case None:
+            hasher.update(b"N")
+        case bool():
+            hasher.update(b"T" if value else b"F")
+        case int():
+            hasher.update(b"i")
+            _feed_sized(hasher, value.to_bytes(_int_size(value), "little", signed=True))
+        case float():
+            hasher.update(b"f")
+            hasher.update(struct.pack("<d", value))
+        case str():
+            hasher.update(b"s")
+            _feed_sized(hasher, value.encode("utf-8"))
+        case bytes() | bytearray() | memoryview():
+            hasher.update(b"b")
+            _feed_sized(hasher, bytes(value))
+        case tuple() | list():
+            hasher.update(b"t" if isinstance(value, tuple) else b"l")
+            hasher.update(len(value).to_bytes(8, "little"))
+            for element in value:
+                _feed(hasher, element, stable)
+        case dict():
+            hasher.update(b"d")
+            _feed_unordered(
+                hasher,
+                [
+                    canonical_digest(key, stable) + canonical_digest(val, stable)
+                    for key, val in value.items()
+                ],
+            )
+        case set() | frozenset():
+            hasher.update(b"S")
+            _feed_unordered(
+                hasher, [canonical_digest(element, stable) for element in value]
+            )
+        case BaseModel():
+            hasher.update(b"m")
+            _feed_sized(hasher, type(value).__qualname__.encode("utf-8"))
+            _feed(hasher, value.model_dump(), stable)
+        case _ if hasattr(value, "__array_interface__"):
+            # NumPy-like arrays, hashed from their buffer without importing numpy.
+            interface = value.__array_interface__
+            hasher.update(b"a")
+            _feed_sized(hasher, interface["typestr"].encode("ascii"))
+            _feed(hasher, tuple(interface["shape"]), stable)
+            _feed_sized(hasher, value.tobytes())
+        case _:
+            if stable:
+                raise UnstableDigestError(
+                    f"{type(value)} value {value!r} has no stable content digest"
+                )
+            try:
+                value_hash = hash(value)
+            except TypeError as error:
+                raise TypeError(
+                    f"Cannot make a canonical digest of {type(value)} value {value!r}"
+                ) from error
+            hasher.update(b"h")
+            _feed_sized(hasher, type(value).__qualname__.encode("utf-8"))
+            hasher.update(value_hash.to_bytes(8, "little", signed=True))
+
+
+def _feed_sized(hasher: "hashlib.blake2b", data: bytes) -> None:
+    hasher.update(len(data).to_bytes(8, "little"))
+    hasher.update(data)
+
+
+def _feed_unordered(hasher: "hashlib.blake2b", digests: list[Digest]) -> None:
+    hasher.update(len(digests).to_bytes(8, "little"))
+    for digest in sorted(digests):
+        hasher.update(digest)
+
+
+def _int_size(value: int) -> int:
+    return (value.bit_length() + 8) // 8
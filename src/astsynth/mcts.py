@@ -0,0 +1,323 @@
+"""Monte Carlo tree search over programs, scored by random rollouts.
+
+The search tree is made of partial programs, each child filling every empty blank
+of its parent, as the generator does. Each simulation selects a path down the tree
+by upper confidence bounds, expands its leaf, completes it with random contents
+and scores the completed program by the fraction of task examples it satisfies.
+The agent then moves the generator towards the partial programs of best mean score,
+so that likely solutions are generated long before an exhaustive enumeration.
+
+"""
+
+import heapq
+import math
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Self
+
+from astsynth.agent import (
+    Candidates,
+    SynthAction,
+    SynthesisAgent,
+    TopDownBFS,
+)
+from astsynth.generator import ProgramGenerator
+from astsynth.program.blanks import Blank, BlankContent, ProgramHash
+from astsynth.program.evaluate import program_function
+from astsynth.program.graph import ProgramGraph
+from astsynth.program.writter import graph_to_program
+
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+    from astsynth.task import ExamplesProvider
+
+SearchStatistics = dict[ProgramHash, tuple[int, float]]
+"""Number of visits and sum of rollout scores of each partial program."""
+
+
+class MonteCarloTreeSearchAgent(SynthesisAgent):
+    """Anytime search guided by Monte Carlo tree search statistics.
+
+    Before each move, `n_simulations` simulations are run from the empty program.
+    With `n_workers` > 1, simulations are split between independent searches
+    in worker processes and their statistics are merged (root parallelization),
+    the dsl and task must then be picklable. Worker processes are stopped when
+    the enumeration ends, or when closing the agent, which is a context manager.
+    Complete programs reachable from the current program are all given at once,
+    from the best to the worst score, so that no program is ever skipped.
+
+    The search tree stops growing once `max_tree_size` partial programs are
+    expanded, simulations then only roll out from its leaves, so that statistics
+    stay bounded, and merged statistics of workers are trimmed to the same size.
+    Scores of complete programs are cached up to `max_cached_scores` programs,
+    the cache being cleared when full.
+
+    """
+
+    def __init__(
+        self,
+        dsl: "DomainSpecificLanguage",
+        task: "ExamplesProvider",
+        n_simulations: int = 64,
+        exploration: float = math.sqrt(2),
+        max_rollout_depth: int = 3,
+        n_workers: int = 1,
+        seed: Optional[int] = None,
+        max_tree_size: int = 100_000,
+        max_cached_scores: int = 100_000,
+    ) -> None:
+        self.dsl = dsl
+        self.task = task
+        self.n_simulations = n_simulations
+        self.exploration = exploration
+        self.max_rollout_depth = max_rollout_depth
+        self.n_workers = n_workers
+        self.max_tree_size = max_tree_size
+        self.max_cached_scores = max_cached_scores
+        self.random = random.Random(seed)
+        self.generator = ProgramGenerator(
+            dsl=dsl, output_type=task.output_type, agent=TopDownBFS()
+        )
+        self.examples = list(task.iter_examples())
+
+        self.visits: dict[ProgramHash, int] = {}
+        self.scores: dict[ProgramHash, float] = {}
+        self._children: dict[ProgramHash, list[ProgramGraph]] = {}
+        self._depths: dict[ProgramHash, int] = {}
+        self._complete_scores: dict[ProgramHash, float] = {}
+        self._executor: Optional[Executor] = None
+
+    def enumerate(
+        self, generator: ProgramGenerator, max_depth: int
+    ) -> Iterator[ProgramGraph]:
+        try:
+            yield from super().enumerate(generator, max_depth)
+        finally:
+            self.close()
+
+    def act(self, candidates: Candidates, graph: ProgramGraph) -> SynthAction:
+        return self.act_batch(candidates, graph)[0]
+
+    def act_batch(
+        self, candidates: Candidates, graph: ProgramGraph
+    ) -> list[SynthAction]:
+        if candidates.constant_fill_blanks:
+            complete_fills: dict[SynthAction, float] = {
+                action: self._program_score(_filled(graph, action.blanks_contents))
+                for action in candidates.constant_fill_blanks
+            }
+            return sorted(complete_fills, key=complete_fills.__getitem__, reverse=True)
+
+        if candidates.fill_blanks or candidates.jumps_to_frontiere:
+            self.search()
+
+        moves: dict[ProgramHash, SynthAction] = {}
+        for action in candidates.fill_blanks:
+            moves[_filled(graph, action.blanks_contents).hashable_config] = action
+        for jump in candidates.jumps_to_frontiere:
+            moves[jump.config] = jump
+        visited_moves = [config for config in moves if self.visits.get(config)]
+        if visited_moves:
+            return [moves[max(visited_moves, key=self.mean_score)]]
+
+        if candidates.fill_blanks:
+            return [candidates.fill_blanks[0]]
+        if candidates.jumps_to_frontiere:
+            return [candidates.jumps_to_frontiere[0]]
+        if candidates.stop is None:  # pragma: no cover
+            raise ValueError("Candidates should always contain a Stop action")
+        return [candidates.stop]
+
+    def mean_score(self, config: ProgramHash) -> float:
+        visits = self.visits.get(config, 0)
+        if visits == 0:
+            return 0.0
+        return self.scores[config] / visits
+
+    def search(self) -> None:
+        """Run simulations, in worker processes if there are many workers."""
+        if self.n_workers <= 1:
+            for _ in range(self.n_simulations):
+                self.simulate()
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        n_simulations = max(1, self.n_simulations // self.n_workers)
+        futures = [
+            self._executor.submit(
+                _search_statistics,
+                self.dsl,
+                self.task,
+                n_simulations,
+                self.exploration,
+                self.max_rollout_depth,
+                self.random.getrandbits(64),
+                self.max_tree_size,
+                self.max_cached_scores,
+            )
+            for _worker in range(self.n_workers)
+        ]
+        for future in futures:
+            self.merge(future.result())
+
+    def merge(self, statistics: SearchStatistics) -> None:
+        """Add statistics of an other search, only keeping the `max_tree_size`
+        most visited partial programs."""
+        for config, (visits, score) in statistics.items():
+            self.visits[config] = self.visits.get(config, 0) + visits
+            self.scores[config] = self.scores.get(config, 0.0) + score
+        if len(self.visits) > self.max_tree_size:
+            kept = heapq.nlargest(
+                self.max_tree_size, self.visits, key=self.visits.__getitem__
+            )
+            self.visits = {config: self.visits[config] for config in kept}
+            self.scores = {config: self.scores[config] for config in kept}
+
+    def statistics(self) -> SearchStatistics:
+        return {
+            config: (visits, self.scores[config])
+            for config, visits in self.visits.items()
+        }
+
+    def close(self) -> None:
+        """Stop the worker processes, if any."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def simulate(self) -> None:
+        """Select a path by upper confidence bounds, expand its leaf,
+        score a random completion of it and back the score up the path."""
+        graph = ProgramGraph(output_type=self.task.output_type)
+        config = graph.hashable_config
+        self._depths.setdefault(config, 0)
+        path = [config]
+        while config in self._children and self._children[config]:
+            graph = self._select_child(config)
+            config = graph.hashable_config
+            path.append(config)
+
+        if (
+            not graph.complete
+            and config not in self._children
+            and len(self._children) < self.max_tree_size
+        ):
+            self._children[config] = self._expand(graph, config)
+            if self._children[config]:
+                graph = self.random.choice(self._children[config])
+                config = graph.hashable_config
+                path.append(config)
+
+        score = self._rollout(graph)
+        for path_config in path:
+            self.visits[path_config] = self.visits.get(path_config, 0) + 1
+            self.scores[path_config] = self.scores.get(path_config, 0.0) + score
+
+    def _select_child(self, config: ProgramHash) -> ProgramGraph:
+        parent_visits = self.visits.get(config, 0)
+        best_child, best_bound = None, -math.inf
+        for child in self._children[config]:
+            child_config = child.hashable_config
+            child_visits = self.visits.get(child_config, 0)
+            if child_visits == 0:
+                return child
+            bound = self.mean_score(child_config) + self.exploration * math.sqrt(
+                math.log(parent_visits) / child_visits
+            )
+            if bound > best_bound:
+                best_child, best_bound = child, bound
+        assert best_child is not None
+        return best_child
+
+    def _expand(self, graph: ProgramGraph, config: ProgramHash) -> list[ProgramGraph]:
+        depth = self._depths[config]
+        children: list[ProgramGraph] = []
+        for blanks_contents, child in self.generator.fill_blanks_consequences(graph):
+            child_depth = depth if child.complete else depth + 1
+            if child_depth > self.max_rollout_depth:
+                continue
+            self._depths.setdefault(child.hashable_config, child_depth)
+            children.append(child)
+        return children
+
+    def _rollout(self, graph: ProgramGraph) -> float:
+        """Score of a random completion of the program, 0 if it cannot be completed."""
+        if not graph.complete:
+            graph = deepcopy(graph)
+        while not graph.complete:
+            for blank in graph.empty_blanks:
+                options = self.generator.fill_blank_options(blank, graph)
+                if graph.depth(blank) >= self.max_rollout_depth:
+                    options = [
+                        (blank, content)
+                        for blank, content in options
+                        if content.kind in ("input", "constant")
+                    ]
+                if not options:
+                    return 0.0
+                _blank, content = self.random.choice(options)
+                graph.fill_blank(blank=blank, content=content)
+        return self._program_score(graph)
+
+    def _program_score(self, graph: ProgramGraph) -> float:
+        """Fraction of the task examples satisfied by the complete program."""
+        config = graph.hashable_config
+        score = self._complete_scores.get(config)
+        if score is not None:
+            return score
+
+        program = graph_to_program(graph, "generated_func", self.dsl)
+        function = program_function(program)
+        n_satisfied = 0
+        for inputs, output in self.examples:
+            try:
+                n_satisfied += function(**inputs) == output
+            except Exception:
+                continue
+        score = n_satisfied / len(self.examples) if self.examples else 0.0
+        if len(self._complete_scores) >= self.max_cached_scores:
+            self._complete_scores.clear()
+        self._complete_scores[config] = score
+        return score
+
+
+def _filled(
+    graph: ProgramGraph, blanks_contents: tuple[tuple[Blank, BlankContent], ...]
+) -> ProgramGraph:
+    filled_graph = deepcopy(graph)
+    for blank, content in blanks_contents:
+        filled_graph.fill_blank(blank=blank, content=content)
+    return filled_graph
+
+
+def _search_statistics(
+    dsl: "DomainSpecificLanguage",
+    task: "ExamplesProvider",
+    n_simulations: int,
+    exploration: float,
+    max_rollout_depth: int,
+    seed: int,
+    max_tree_size: int,
+    max_cached_scores: int,
+) -> SearchStatistics:
+    """Statistics of an independent search, run in a worker process."""
+    agent = MonteCarloTreeSearchAgent(
+        dsl=dsl,
+        task=task,
+        n_simulations=n_simulations,
+        exploration=exploration,
+        max_rollout_depth=max_rollout_depth,
+        seed=seed,
+        max_tree_size=max_tree_size,
+        max_cached_scores=max_cached_scores,
+    )
+    agent.search()
+    return agent.statistics()
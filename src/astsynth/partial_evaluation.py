@@ -0,0 +1,118 @@
+"""Scores of partial programs from the values of their complete subtrees.
+
+A partial program cannot be run, but its complete subtrees can.
+Comparing their values to the expected outputs of the task examples tells
+how close the partial program may be to a solution, which guides beam search.
+
+"""
+
+import itertools
+from typing import TYPE_CHECKING, Any, Optional
+
+from astsynth.program.blanks import Blank
+from astsynth.program.evaluate import operations_functions
+from astsynth.program.graph import ProgramGraph, if_sub_blanks
+
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+    from astsynth.task import ExamplesProvider
+
+
+class ExamplesAgreementScore:
+    """Beam score of partial programs by agreement of their subtrees with examples.
+
+    The value of a complete subtree agrees with an expected output when equal to it.
+    Strings contained in the expected output partially agree,
+    by the fraction of the output they cover.
+    A partial program scores the best mean agreement of its complete subtrees,
+    minus a small penalty per node so that smaller programs come first on ties.
+
+    """
+
+    def __init__(
+        self,
+        dsl: "DomainSpecificLanguage",
+        task: "ExamplesProvider",
+        max_examples: int = 10,
+        size_penalty: float = 1e-3,
+    ) -> None:
+        self.functions = operations_functions(dsl)
+        self.examples = list(itertools.islice(task.iter_examples(), max_examples))
+        if not self.examples:
+            raise ValueError("Cannot score agreement without any example")
+        self.size_penalty = size_penalty
+
+    def __call__(self, graph: ProgramGraph) -> float:
+        subtrees_values: dict[Blank, Optional[list[Any]]] = {}
+        best_agreement = 0.0
+        for blank in graph.blanks:
+            values = self._subtree_values(blank, graph, subtrees_values)
+            if values is None:
+                continue
+            agreement = sum(
+                _agreement(value, output)
+                for value, (_inputs, output) in zip(values, self.examples)
+            ) / len(self.examples)
+            best_agreement = max(best_agreement, agreement)
+        return best_agreement - self.size_penalty * graph.number_of_nodes()
+
+    def _subtree_values(
+        self,
+        blank: Blank,
+        graph: ProgramGraph,
+        subtrees_values: dict[Blank, Optional[list[Any]]],
+    ) -> Optional[list[Any]]:
+        """Values of the subtree of the blank on each example,
+        None if the subtree is incomplete or raised an exception."""
+        if blank in subtrees_values:
+            return subtrees_values[blank]
+        subtrees_values[blank] = None
+
+        content = graph.content(blank)
+        if content is None:
+            return None
+        values: Optional[list[Any]] = None
+        match content.kind:
+            case "input":
+                values = [inputs[content.name] for inputs, _output in self.examples]
+            case "constant":
+                values = [content.value for _example in self.examples]
+            case "operation":
+                arguments = [
+                    self._subtree_values(sub_blank, graph, subtrees_values)
+                    for sub_blank in graph.sub_blanks(blank=blank, operation=content)
+                ]
+                if any(argument is None for argument in arguments):
+                    return None
+                function = self.functions[content.name]
+                try:
+                    values = [
+                        function(*example_arguments)
+                        for example_arguments in zip(*arguments)
+                    ]
+                except Exception:
+                    return None
+            case "if":
+                test, body, else_case = (
+                    self._subtree_values(sub_blank, graph, subtrees_values)
+                    for sub_blank in if_sub_blanks(graph, blank)
+                )
+                if test is None or body is None or else_case is None:
+                    return None
+                values = [
+                    body_value if test_value else else_value
+                    for test_value, body_value, else_value in zip(test, body, else_case)
+                ]
+        subtrees_values[blank] = values
+        return values
+
+
+def _agreement(value: Any, output: Any) -> float:
+    if isinstance(value, str) and isinstance(output, str):
+        if value and value in output:
+            return len(value) / len(output)
+        return 0.0
+    try:
+        return float(value == output)
+    except Exception:
+        return 0.0
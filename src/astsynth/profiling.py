@@ -0,0 +1,155 @@
+"""Instrumentation of the synthesis phases.
+
+A disabled profiler only counts events, timing a phase then costs no clock read,
+so that instrumented code paths can always go through a profiler.
+
+"""
+
+from contextlib import contextmanager, nullcontext
+import sys
+import time
+from typing import ContextManager, Iterator, Optional
+
+from pydantic import BaseModel
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+PHASES = ("generate", "agent", "write", "compile", "evaluate")
+"""Phases of the synthesis timed by the profiler."""
+
+_NO_PHASE: ContextManager[None] = nullcontext()
+
+
+class SynthesisProfile(BaseModel):
+    """Detailed statistics of a profiled synthesis."""
+
+    phases_runtime: dict[str, float]
+    """Time (s) spent in each phase of the synthesis."""
+    n_offered_actions: int
+    """Number of candidate actions offered to the agent."""
+    n_taken_actions: int
+    """Number of actions taken by the agent."""
+    frontier_sizes: list[int]
+    """Size of the frontier along the search, sampled every `frontier_sizes_interval` steps."""
+    frontier_sizes_interval: int
+    """Number of generator steps between two frontier size samples."""
+    n_dedup_hits: int
+    """Number of fills leading to a program state already known by the generator."""
+    n_cache_hits: int
+    """Number of memoized operation calls answered from the evaluator cache."""
+    n_cache_misses: int
+    """Number of memoized operation calls computed by the evaluator."""
+    peak_memory: Optional[int]
+    """Peak resident memory (bytes) of the process, None if unavailable."""
+    n_programs_by_depth: dict[int, int]
+    """Number of generated programs of each depth."""
+    programs_per_second_by_depth: dict[int, float]
+    """Generated programs per second of synthesis time spent on each depth."""
+
+    @property
+    def cache_hit_rate(self) -> float:
+        n_calls = self.n_cache_hits + self.n_cache_misses
+        return self.n_cache_hits / n_calls if n_calls else 0.0
+
+
+class Profiler:
+    """Collect timings and counters of the synthesis phases when enabled."""
+
+    __slots__ = (
+        "enabled",
+        "phases_runtime",
+        "n_offered_actions",
+        "n_taken_actions",
+        "frontier_sizes",
+        "frontier_sizes_interval",
+        "max_frontier_samples",
+        "n_dedup_hits",
+        "n_programs_by_depth",
+        "depths_runtime",
+        "_n_steps",
+        "_last_program_time",
+    )
+
+    def __init__(self, enabled: bool = True, max_frontier_samples: int = 10_000):
+        self.enabled = enabled
+        self.phases_runtime: dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.n_offered_actions = 0
+        self.n_taken_actions = 0
+        self.frontier_sizes: list[int] = []
+        self.frontier_sizes_interval = 1
+        self.max_frontier_samples = max_frontier_samples
+        self.n_dedup_hits = 0
+        self.n_programs_by_depth: dict[int, int] = {}
+        self.depths_runtime: dict[int, float] = {}
+        self._n_steps = 0
+        self._last_program_time = time.perf_counter()
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Context timing the given phase, doing nothing if disabled."""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._timed_phase(name)
+
+    @contextmanager
+    def _timed_phase(self, name: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases_runtime[name] += time.perf_counter() - start_time
+
+    def record_step(self, n_offered_actions: int, frontier_size: int) -> None:
+        """Record a generator step, keeping a bounded sample of frontier sizes
+        by halving samples and doubling their interval when full."""
+        self.n_offered_actions += n_offered_actions
+        if not self.enabled:
+            return
+        if self._n_steps % self.frontier_sizes_interval == 0:
+            self.frontier_sizes.append(frontier_size)
+            if len(self.frontier_sizes) >= self.max_frontier_samples:
+                self.frontier_sizes = self.frontier_sizes[::2]
+                self.frontier_sizes_interval *= 2
+        self._n_steps += 1
+
+    def record_program(self, depth: int) -> None:
+        """Record a generated program, the time since the previous one
+        being spent on its depth."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.n_programs_by_depth[depth] = self.n_programs_by_depth.get(depth, 0) + 1
+        self.depths_runtime[depth] = (
+            self.depths_runtime.get(depth, 0.0) + now - self._last_program_time
+        )
+        self._last_program_time = now
+
+    def profile(self, n_cache_hits: int, n_cache_misses: int) -> SynthesisProfile:
+        return SynthesisProfile(
+            phases_runtime=dict(self.phases_runtime),
+            n_offered_actions=self.n_offered_actions,
+            n_taken_actions=self.n_taken_actions,
+            frontier_sizes=list(self.frontier_sizes),
+            frontier_sizes_interval=self.frontier_sizes_interval,
+            n_dedup_hits=self.n_dedup_hits,
+            n_cache_hits=n_cache_hits,
+            n_cache_misses=n_cache_misses,
+            peak_memory=peak_memory(),
+            n_programs_by_depth=dict(self.n_programs_by_depth),
+            programs_per_second_by_depth={
+                depth: n_programs / self.depths_runtime[depth]
+                for depth, n_programs in self.n_programs_by_depth.items()
+                if self.depths_runtime[depth] > 0
+            },
+        )
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident memory (bytes) of the process, None if unavailable."""
+    if resource is None:  # pragma: no cover
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kibibytes, macOS reports bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -1,9 +1,63 @@
-from pydantic import BaseModel
+import ast
+from types import CodeType
+from typing import Any, Optional
+
+from astor import to_source
+from pydantic import BaseModel, PrivateAttr, computed_field
 
 
 class GeneratedProgram(BaseModel):
+    """A generated program, only rendered to source code when it is asked for.
+
+    Programs built by the writer only carry their module ast,
+    which is enough to evaluate them, rendering is left to the first access of `source`.
+
+    """
+
     name: str
-    source: str
+    _source: Optional[str] = PrivateAttr(default=None)
+    _module: Optional[ast.Module] = PrivateAttr(default=None)
+    _code: Optional[CodeType] = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        name: str,
+        source: Optional[str] = None,
+        module: Optional[ast.Module] = None,
+        **data: Any,
+    ) -> None:
+        if source is None and module is None:
+            raise ValueError("A generated program needs either a source or a module")
+        super().__init__(name=name, **data)
+        self._source = source
+        self._module = module
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def source(self) -> str:
+        if self._source is None:
+            self._source = to_source(self.module)
+        return self._source
+
+    @property
+    def module(self) -> ast.Module:
+        if self._module is None:
+            self._module = ast.parse(self.source)
+        return self._module
+
+    @property
+    def code(self) -> CodeType:
+        """Compiled module of the program, ready to be executed."""
+        if self._code is None:
+            self._code = compile(
+                ast.fix_missing_locations(self.module), filename="<ast>", mode="exec"
+            )
+        return self._code
+
+    @property
+    def rendered(self) -> bool:
+        """True if the source of the program was already rendered."""
+        return self._source is not None
 
     def __len__(self):
         return len(self.source)
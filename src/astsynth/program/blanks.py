@@ -2,6 +2,7 @@ from typing import (
     Annotated,
     Any,
     Callable,
+    ClassVar,
     Generic,
     Literal,
     Optional,
@@ -9,51 +10,136 @@ from typing import (
     TypeAlias,
     TypeVar,
     Union,
+    get_origin,
 )
 from typing_extensions import Self
+from weakref import WeakValueDictionary
 import inspect
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field, GetCoreSchemaHandler
+from pydantic_core import core_schema
 
 T = TypeVar("T")
 
 
-class Blank(BaseModel):
+def _check_type_expression(value: Any) -> Any:
+    if value is None:
+        return type(None)
+    if (
+        isinstance(value, (type, TypeVar))
+        or value is Any
+        or get_origin(value) is not None
+    ):
+        return value
+    raise ValueError(f"{value!r} is not a type expression")
+
+
+TypeExpression: TypeAlias = Annotated[Any, AfterValidator(_check_type_expression)]
+"""A class or a parametric type expression such as list[int] or Optional[str]."""
+
+
+class Blank:
+    """Interned immutable symbol of a place to fill in a program.
+
+    Creating a blank with the same id and type as an existing one gives that one,
+    so that blanks are compared by identity and hashed from their address,
+    which matters as they are hashed in every program configuration.
+    Pydantic models validate and serialize blanks as {"id": ..., "type": ...}.
+
+    """
+
+    __slots__ = ("id", "type", "__weakref__")
     id: str
-    type: Type[object]
+    type: Any
+
+    _interned: "WeakValueDictionary[tuple[str, Any], Blank]" = WeakValueDictionary()
+
+    def __new__(cls, id: str, type: Any) -> "Blank":
+        type = _check_type_expression(type)
+        key = (id, type)
+        blank = cls._interned.get(key)
+        if blank is None:
+            blank = super().__new__(cls)
+            object.__setattr__(blank, "id", id)
+            object.__setattr__(blank, "type", type)
+            cls._interned[key] = blank
+        return blank
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (Blank, (self.id, self.type))
+
+    def __copy__(self) -> "Blank":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "Blank":
+        return self
+
+    def __repr__(self) -> str:
+        return f"Blank(id={self.id!r}, type={self.type!r})"
 
     def __str__(self) -> str:  # pragma: no cover
         return "□"
 
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        from_fields = core_schema.no_info_after_validator_function(
+            lambda fields: cls(**fields),
+            core_schema.typed_dict_schema(
+                {
+                    "id": core_schema.typed_dict_field(core_schema.str_schema()),
+                    "type": core_schema.typed_dict_field(core_schema.any_schema()),
+                }
+            ),
+        )
+        return core_schema.union_schema(
+            [core_schema.is_instance_schema(cls), from_fields],
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda blank: {"id": blank.id, "type": blank.type}
+            ),
+        )
+
+
+class _Symbol(BaseModel):
+    """Content symbol hashed from its kind and the cached hash of its name,
+    and compared by identity before comparing fields."""
+
+    _kind_hash: ClassVar[int]
+
     def __hash__(self) -> int:
-        return hash("Blank|" + self.id)
+        return self._kind_hash ^ hash(self.name)  # type: ignore[attr-defined]
+
+    def __eq__(self, other: object) -> bool:
+        return self is other or super().__eq__(other)
 
 
-class Input(BaseModel, Generic[T]):
+class Input(_Symbol, Generic[T]):
     kind: Literal["input"] = "input"
     name: str
-    type: Type[T]
+    type: TypeExpression
 
-    def __hash__(self) -> int:
-        return hash("Input|" + self.name)
+    _kind_hash: ClassVar[int] = hash("Input")
 
     @classmethod
     def from_dict(cls, variable_data: dict[str, Type[T]]) -> list[Self]:
         return [cls(name=name, type=type) for name, type in variable_data.items()]
 
 
-class Constant(BaseModel, Generic[T]):
+class Constant(_Symbol, Generic[T]):
     kind: Literal["constant"] = "constant"
     name: str
     value: T
 
+    _kind_hash: ClassVar[int] = hash("Constant")
+
     @property
     def type(self) -> Type[T]:
         return type(self.value)
 
-    def __hash__(self) -> int:
-        return hash("Constant|" + self.name)
-
     @classmethod
     def from_dict(cls, variable_data: dict[str, T]) -> list[Self]:
         return [cls(name=name, value=value) for name, value in variable_data.items()]
@@ -66,19 +152,73 @@ class AnnotationMissing(Exception):
     pass
 
 
-class Operation(BaseModel):
+OPERATION_METADATA_ATTRIBUTE = "__astsynth_operation__"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def operation(
+    *,
+    pure: bool = True,
+    cost: float = 1.0,
+    can_raise: bool = False,
+    vectorizable: bool = False,
+) -> Callable[[F], F]:
+    """Declare evaluation metadata of a DSL operation.
+
+    Args:
+        pure: The operation always gives the same output for the same inputs
+            and has no side effect, so its results can be memoized.
+        cost: Estimated relative cost of a call to the operation.
+        can_raise: The operation may raise an exception on some inputs,
+            which then counts as a failure on the example instead of an error.
+        vectorizable: The operation can be called with one sequence of values
+            per non-constant argument, aligned on examples, and returns the sequence
+            of its outputs.
+
+    """
+
+    def _declare_metadata(func: F) -> F:
+        setattr(
+            func,
+            OPERATION_METADATA_ATTRIBUTE,
+            {
+                "pure": pure,
+                "cost": cost,
+                "can_raise": can_raise,
+                "vectorizable": vectorizable,
+            },
+        )
+        return func
+
+    return _declare_metadata
+
+
+def operation_metadata(func: Callable[..., Any]) -> dict[str, Any]:
+    """Evaluation metadata declared with the `operation` decorator, if any."""
+    return getattr(func, OPERATION_METADATA_ATTRIBUTE, {})
+
+
+class Operation(_Symbol):
     kind: Literal["operation"] = "operation"
     name: str
     source: str
-    output_type: Type[Any]
-    inputs_types: dict[str, Type[Any]]
+    output_type: TypeExpression
+    inputs_types: dict[str, TypeExpression]
+    pure: bool = True
+    """Same outputs for same inputs and no side effect, allowing memoization."""
+    cost: float = 1.0
+    """Estimated relative cost of a call to the operation."""
+    can_raise: bool = False
+    """Exceptions raised by the operation count as failures on the example."""
+    vectorizable: bool = False
+    """The operation can be called on sequences of values aligned on examples."""
 
     @property
     def arity(self) -> int:  # pragma: no cover
         return len(self.inputs_types)
 
-    def __hash__(self) -> int:
-        return hash("Operation|" + self.name)
+    _kind_hash: ClassVar[int] = hash("Operation")
 
     @classmethod
     def from_func(cls, func: Callable[..., Any]) -> Self:
@@ -99,14 +239,35 @@ class Operation(BaseModel):
             source=source,
             output_type=output_type,
             inputs_types=input_types,
+            **operation_metadata(func),
         )
 
 
+class DerivedConstant(Constant):
+    """Constant computed once from an expression of DSL constants and operations.
+
+    Programs using it are written with the assignment of its expression,
+    along with the constants and operations the expression depends on.
+
+    """
+
+    expression: str
+    """Source of the expression giving the constant value, such as add(TWO, THREE)."""
+    depth: int
+    """Number of nested operations in the expression."""
+    constants: list[Constant] = Field(default_factory=list)
+    """Constants the expression depends on."""
+    operations: list[Operation] = Field(default_factory=list)
+    """Operations the expression depends on."""
+
+
 class IfBranching(BaseModel):
     kind: Literal["if"] = "if"
 
+    _kind_hash: ClassVar[int] = hash("IfBranching")
+
     def __hash__(self) -> int:
-        return hash("IfBranching")
+        return self._kind_hash
 
 
 StandardOperation: TypeAlias = Annotated[IfBranching, Field(discriminator="kind")]
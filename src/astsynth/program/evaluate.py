@@ -1,12 +1,24 @@
 import ast
-from astsynth.program import GeneratedProgram
-from astsynth.task import Example, Task
-
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
 
 from pydantic import BaseModel
 
+from astsynth.hashing import Digest, UnstableDigestError, canonical_digest
+from astsynth.program import GeneratedProgram
+from astsynth.task import Example, ExamplesProvider, Task
 
-from typing import Any
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+    from astsynth.program.blanks import Operation
 
 
 class ExampleResult(BaseModel):
@@ -27,11 +39,251 @@ class ValidationResult(BaseModel):
 
 
 def evaluate_program_on_task(
-    program: "GeneratedProgram", task: "Task"
+    program: "GeneratedProgram", task: "ExamplesProvider"
 ) -> ValidationResult:
-    exec(compile(ast.parse(program.source), filename="<ast>", mode="exec"), locals())
+    program_func = program_function(program)
     results = []
-    for example in task.examples.values():
-        call_result = eval(f"{program.name}(**example.input)")
-        results.append(ExampleResult(example=example, result=call_result))
+    for inputs, output in task.iter_examples():
+        call_result = program_func(**inputs)
+        results.append(
+            ExampleResult(
+                example=Example(input=inputs, output=output), result=call_result
+            )
+        )
     return ValidationResult(individual_results=results)
+
+
+def program_succeeds_on_task(
+    program: "GeneratedProgram", task: "ExamplesProvider"
+) -> bool:
+    """Check if the program succeeds on every example, stopping at the first failure.
+
+    Unlike `evaluate_program_on_task`, no result is kept for each example.
+
+    """
+    return function_succeeds_on_task(program_function(program), task)
+
+
+def function_succeeds_on_task(
+    program_func: Callable[..., Any], task: "ExamplesProvider"
+) -> bool:
+    for inputs, output in task.iter_examples():
+        if program_func(**inputs) != output:
+            return False
+    return True
+
+
+def program_function(program: "GeneratedProgram") -> Callable[..., Any]:
+    namespace: dict[str, Any] = {}
+    exec(program.code, namespace)
+    return namespace[program.name]
+
+
+def operations_functions(
+    dsl: "DomainSpecificLanguage",
+    operations: Optional[Sequence["Operation"]] = None,
+) -> dict[str, Callable[..., Any]]:
+    """Python functions of the given operations, by operation name, all operations
+    of the DSL by default.
+
+    Operations are defined in a single module with the prelude and constants
+    of the DSL, as in programs, so that they can use them and call each other.
+
+    """
+    from astsynth.program.writter import dsl_module
+
+    if operations is None:
+        operations = dsl.operations
+    namespace: dict[str, Any] = {}
+    exec(compile(dsl_module(dsl), filename="<operations>", mode="exec"), namespace)
+    return {operation.name: namespace[operation.name] for operation in operations}
+
+
+class CompiledProgram(NamedTuple):
+    """A program ready to be called on examples, with its evaluation strategy."""
+
+    function: Callable[..., Any]
+    cost: float
+    """Sum of the costs of the operation calls of the program."""
+    can_raise: bool
+    """Exceptions of the program count as failures."""
+    vectorized: bool
+    """The program is called once on columns of examples."""
+
+
+class Evaluator:
+    """Evaluate programs using the metadata of the DSL operations.
+
+    - Pure operations costing at least `memoize_min_cost` are memoized
+      across every program evaluated, impure ones are never cached.
+      Calls are only memoized when every argument has a stable content digest.
+    - Exceptions of programs using operations that can raise count as failures.
+    - Programs only made of vectorizable operations are called once per task
+      on columns of example inputs, or once per batch of columns for tasks
+      streaming their examples.
+    - Batches of programs can be scheduled from the cheapest to the most expensive.
+
+    """
+
+    def __init__(
+        self,
+        dsl: "DomainSpecificLanguage",
+        memoize_min_cost: float = 10.0,
+        max_memoized_calls: int = 1_000_000,
+        streamed_batch_size: int = 4096,
+    ) -> None:
+        self.operations = {op.name: op for op in dsl.operations}
+        self.memoize_min_cost = memoize_min_cost
+        self.max_memoized_calls = max_memoized_calls
+        self._memoized_calls: dict[tuple[str, Digest], Any] = {}
+        self.n_memoized_hits = 0
+        """Number of memoized operation calls answered from the cache."""
+        self.n_memoized_misses = 0
+        """Number of memoized operation calls computed and cached."""
+        self.streamed_batch_size = streamed_batch_size
+        """Number of examples of streamed tasks given at once to vectorized programs."""
+        self._tasks_columns: dict[Digest, tuple[dict[str, list[Any]], list[Any]]] = {}
+
+    def used_operations(self, program: "GeneratedProgram") -> list["Operation"]:
+        return [
+            self.operations[statement.name]
+            for statement in program.module.body
+            if isinstance(statement, ast.FunctionDef)
+            and statement.name in self.operations
+        ]
+
+    def cost(self, program: "GeneratedProgram") -> float:
+        """Sum of the costs of the operation calls of the program."""
+        program_def = program.module.body[-1]
+        return sum(
+            self.operations[node.func.id].cost
+            for node in ast.walk(program_def)
+            if isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in self.operations
+        )
+
+    def compile(self, program: "GeneratedProgram") -> CompiledProgram:
+        operations = self.used_operations(program)
+        namespace: dict[str, Any] = {}
+        exec(program.code, namespace)
+        for operation in operations:
+            if operation.pure and operation.cost >= self.memoize_min_cost:
+                namespace[operation.name] = self._memoized(
+                    operation.name, namespace[operation.name]
+                )
+        return CompiledProgram(
+            function=namespace[program.name],
+            cost=self.cost(program),
+            can_raise=any(operation.can_raise for operation in operations),
+            vectorized=_is_vectorizable(program, operations),
+        )
+
+    def schedule(
+        self, programs: Sequence["GeneratedProgram"]
+    ) -> list["GeneratedProgram"]:
+        """Order programs from the cheapest to the most expensive to evaluate."""
+        return sorted(programs, key=self.cost)
+
+    def succeeds_on_task(
+        self, compiled: CompiledProgram, task: "ExamplesProvider"
+    ) -> bool:
+        """Check if the program succeeds on every example, stopping at the first failure."""
+        if compiled.vectorized:
+            for inputs_columns, outputs in self._task_columns(task):
+                try:
+                    results = compiled.function(**inputs_columns)
+                except Exception:
+                    if compiled.can_raise:
+                        return False
+                    raise
+                if list(results) != list(outputs):
+                    return False
+            return True
+
+        for inputs, output in task.iter_examples():
+            try:
+                result = compiled.function(**inputs)
+            except Exception:
+                if compiled.can_raise:
+                    return False
+                raise
+            if result != output:
+                return False
+        return True
+
+    def program_succeeds_on_task(
+        self, program: "GeneratedProgram", task: "ExamplesProvider"
+    ) -> bool:
+        return self.succeeds_on_task(self.compile(program), task)
+
+    def _memoized(
+        self, operation_name: str, func: Callable[..., Any]
+    ) -> Callable[..., Any]:
+        memoized_calls = self._memoized_calls
+
+        def _memoized_operation(*args: Any) -> Any:
+            try:
+                key = (operation_name, canonical_digest(args, stable=True))
+            except UnstableDigestError:
+                # Python hashes of objects can be reused by other objects
+                return func(*args)
+            if key in memoized_calls:
+                self.n_memoized_hits += 1
+                return memoized_calls[key]
+            self.n_memoized_misses += 1
+            result = func(*args)
+            if len(memoized_calls) >= self.max_memoized_calls:
+                memoized_calls.clear()
+            memoized_calls[key] = result
+            return result
+
+        return _memoized_operation
+
+    def _task_columns(
+        self, task: "ExamplesProvider"
+    ) -> Iterable[tuple[Mapping[str, Sequence[Any]], Sequence[Any]]]:
+        """Columns of the examples inputs and outputs, by batches.
+
+        Columns of in-memory tasks are cached by the digest of their examples,
+        tasks streaming their examples are read lazily batch by batch.
+
+        """
+        if isinstance(task, Task):
+            columns = self._tasks_columns.get(task.digest)
+            if columns is None:
+                columns = _examples_columns(task)
+                self._tasks_columns[task.digest] = columns
+            return [columns]
+        batches = getattr(task, "batches", None)
+        if batches is not None:
+            return batches(self.streamed_batch_size)
+        return [_examples_columns(task)]
+
+
+def _examples_columns(
+    task: "ExamplesProvider",
+) -> tuple[dict[str, list[Any]], list[Any]]:
+    inputs_columns: dict[str, list[Any]] = {name: [] for name in task.input_types}
+    outputs: list[Any] = []
+    for inputs, output in task.iter_examples():
+        for name, value in inputs.items():
+            inputs_columns[name].append(value)
+        outputs.append(output)
+    return inputs_columns, outputs
+
+
+def _is_vectorizable(
+    program: "GeneratedProgram", operations: list["Operation"]
+) -> bool:
+    """Programs are vectorizable if they only use vectorizable operations,
+    return the output of one of them and do not branch."""
+    if not operations or not all(operation.vectorizable for operation in operations):
+        return False
+    program_def = program.module.body[-1]
+    if not isinstance(program_def, ast.FunctionDef):  # pragma: no cover
+        return False
+    last_statement = program_def.body[-1]
+    return isinstance(last_statement, ast.Return) and isinstance(
+        last_statement.value, ast.Call
+    )
@@ -1,129 +1,260 @@
 from __future__ import annotations
 
-from typing import Any, NamedTuple, Optional, Type
-from networkx import DiGraph, descendants
-
+from array import array
+from functools import lru_cache
+from typing import Any, Iterator, NamedTuple, Optional, Type, Union
 
 from astsynth.program.blanks import (
     Blank,
     BlankContent,
     BlanksConfig,
     IfBranching,
-    Input,
-    Operation,
-    Constant,
     ProgramHash,
 )
 
+_NO_NODE = -1
+
+
+class ProgramGraph:
+    """Represent the tree of blanks and their content making the heart of the program.
 
-class ProgramGraph(DiGraph):
-    """Represent the tree of blanks and their content making the heart of the program."""
+    Blanks are stored in flat arrays indexed by integer node ids, in insertion order.
+    Sub-blanks of a content get consecutive ids, so that they are found from the id
+    of their first sub-blank and the arity of the content.
+    Blanks given to methods are still found by their string id in a dict.
+    Emptied blanks leave holes in the arrays, copies included, that are skipped
+    when listing blanks.
+    A networkx-like nodes view, predecessors and successors are kept
+    for callers of the former DiGraph interface.
 
-    def __init__(
-        self,
-        incoming_graph_data: dict | None = None,
-        output_type: Type[object] = object,
-        **attr: Any,
-    ) -> None:
-        super().__init__(incoming_graph_data, **attr)
+    """
+
+    __slots__ = (
+        "root",
+        "_blanks",
+        "_contents",
+        "_depths",
+        "_parents",
+        "_first_sub_blanks",
+        "_ids",
+        "_n_empty",
+    )
+
+    def __init__(self, output_type: Type[object] = object) -> None:
         self.root = Blank(id="return", type=output_type)
-        self.add_node(self.root, depth=0)
+        self._blanks: list[Optional[Blank]] = []
+        self._contents: list[Optional[BlankContent]] = []
+        self._depths = array("i")
+        self._parents = array("i")
+        self._first_sub_blanks = array("i")
+        self._ids: dict[str, int] = {}
+        self._n_empty = 0
+        self._add_blank(self.root, depth=0, parent=_NO_NODE)
 
     def fill_blank(self, blank: Blank, content: BlankContent) -> None:
-        match content.kind:
-            case "input" | "constant":
-                return self._fill_with_variable(blank, content)
-            case "operation":
-                return self._fill_with_operation(blank, content)
-            case "if":
-                return self._fill_with_if(blank, content)
-        raise NotImplementedError()
+        node = self._ids[blank.id]
+        if self._contents[node] is None:
+            self._n_empty -= 1
+        self._contents[node] = content
+        sub_blanks = _content_sub_blanks(blank, content)
+        if not sub_blanks:
+            return
+        self._first_sub_blanks[node] = len(self._blanks)
+        sub_depth = self._depths[node] + 1
+        for sub_blank in sub_blanks:
+            self._add_blank(sub_blank, depth=sub_depth, parent=node)
 
     def empty_blank(self, blank: Blank) -> None:
-        for other_blank in descendants(self, blank):
-            self.remove_node(other_blank)
+        self._empty_node(self._ids[blank.id])
 
     def content(self, blank: Blank) -> Optional[BlankContent]:
-        blank_childs: list[BlankContent] = list(self.successors(blank))
-        if not blank_childs:
-            return None
-        assert len(blank_childs) == 1, "Blank should have only one content"
-        leaf_node = blank_childs.pop()
-        return self.nodes[leaf_node]["content"]
+        return self._contents[self._ids[blank.id]]
 
     def replace_blank(self, blank: Blank, content: BlankContent) -> None:
         if self.content(blank) is not None:
             self.empty_blank(blank)
         self.fill_blank(blank, content)
 
-    def sub_blanks(
-        self, blank: Blank, operation: Operation | IfBranching
-    ) -> list[Blank]:
-        op_node = _node_value(blank, operation)
-        return list(self.successors(op_node))
-
-    def _fill_with_variable(self, blank: Blank, variable: Input | Constant) -> None:
-        var_node = _node_value(blank, variable)
-        self.add_node(var_node, content=variable)
-        self.add_edge(blank, var_node)
-
-    def _fill_with_operation(self, blank: Blank, operation: Operation) -> None:
-        op_node = _node_value(blank, operation)
-        self.add_node(op_node, content=operation)
-        self.add_edge(blank, op_node)
-        new_depth = self.nodes[blank]["depth"] + 1
-        for input_name, input_type in operation.inputs_types.items():
-            new_blank = Blank(id=f"{op_node}>{input_name}", type=input_type)
-            self.add_node(new_blank, depth=new_depth)
-            self.add_edge(op_node, new_blank)
-
-    def _fill_with_if(self, blank: Blank, ifbranching: IfBranching) -> None:
-        if_node = _node_value(blank, ifbranching)
-
-        if_sub_blanks = IfBlanks(
-            test_expression=Blank(id=f"{if_node}>test", type=bool),
-            body=Blank(id=f"{if_node}>body", type=blank.type),
-            else_case=Blank(id=f"{if_node}>else", type=blank.type),
-        )
-
-        self.add_node(if_node, content=ifbranching, subblanks=if_sub_blanks)
-        self.add_edge(blank, if_node)
-        new_depth = self.nodes[blank]["depth"] + 1
+    def sub_blanks(self, blank: Blank, operation: BlankContent) -> list[Blank]:
+        return [self._blank(node) for node in self._sub_nodes(self._ids[blank.id])]
 
-        self.add_node(if_sub_blanks.test_expression, depth=new_depth)
-        self.add_edge(if_node, if_sub_blanks.test_expression)
+    def depth(self, blank: Blank) -> int:
+        """Number of contents between the root and the blank."""
+        return self._depths[self._ids[blank.id]]
 
-        self.add_node(if_sub_blanks.body, depth=new_depth)
-        self.add_edge(if_node, if_sub_blanks.body)
+    def parent(self, blank: Blank) -> Optional[tuple[Blank, BlankContent]]:
+        """Parent blank of the blank with its content, None for the root."""
+        parent_node = self._parents[self._ids[blank.id]]
+        if parent_node == _NO_NODE:
+            return None
+        parent_content = self._contents[parent_node]
+        assert parent_content is not None
+        return self._blank(parent_node), parent_content
 
-        self.add_node(if_sub_blanks.else_case, depth=new_depth)
-        self.add_edge(if_node, if_sub_blanks.else_case)
+    def contents(self) -> Iterator[BlankContent]:
+        """Contents filling the blanks of the graph."""
+        return (content for content in self._contents if content is not None)
 
     @property
     def blanks(self) -> list[Blank]:
-        return [node for node in self.nodes() if isinstance(node, Blank)]
+        return [blank for blank in self._blanks if blank is not None]
 
     @property
     def empty_blanks(self) -> list[Blank]:
-        return [blank for blank in self.blanks if self.content(blank) is None]
+        return [
+            blank
+            for blank, content in zip(self._blanks, self._contents)
+            if blank is not None and content is None
+        ]
 
     @property
     def complete(self) -> bool:
-        return len(self.empty_blanks) == 0
+        return self._n_empty == 0
 
     def config(self) -> BlanksConfig:
-        filled_blanks_content: BlanksConfig = {}
-        for blank in self.blanks:
-            content = self.content(blank)
-            filled_blanks_content[blank] = content
-        return filled_blanks_content
+        return {
+            blank: content
+            for blank, content in zip(self._blanks, self._contents)
+            if blank is not None
+        }
 
     @property
     def hashable_config(self) -> ProgramHash:
-        return hashable_config(self.config())
+        return tuple(
+            [
+                (blank, content)
+                for blank, content in zip(self._blanks, self._contents)
+                if blank is not None
+            ]
+        )
+
+    def number_of_nodes(self) -> int:
+        """Number of blanks and contents, as if each of them was a graph node."""
+        n_blanks = len(self._ids)
+        return n_blanks + n_blanks - self._n_empty
+
+    @property
+    def nodes(self) -> "_NodesView":
+        """Networkx-like view of blanks and content nodes with their data."""
+        return _NodesView(self)
+
+    def predecessors(self, node: Union[Blank, str]) -> Iterator[Union[Blank, str]]:
+        """Networkx-like parent node, a content node of a blank or the blank of a content node."""
+        if isinstance(node, Blank):
+            parent_node = self._parents[self._ids[node.id]]
+            if parent_node != _NO_NODE:
+                yield self._content_node(parent_node)
+            return
+        yield self._blank(self._content_node_blank(node))
+
+    def successors(self, node: Union[Blank, str]) -> Iterator[Union[Blank, str]]:
+        """Networkx-like children nodes, the content node of a blank or the sub-blanks of a content node."""
+        if isinstance(node, Blank):
+            blank_node = self._ids[node.id]
+            if self._contents[blank_node] is not None:
+                yield self._content_node(blank_node)
+            return
+        for sub_node in self._sub_nodes(self._content_node_blank(node)):
+            yield self._blank(sub_node)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "ProgramGraph":
+        # Blanks and contents are never mutated, copies can share them.
+        graph_copy = ProgramGraph.__new__(ProgramGraph)
+        graph_copy.root = self.root
+        graph_copy._blanks = self._blanks.copy()
+        graph_copy._contents = self._contents.copy()
+        graph_copy._depths = self._depths[:]
+        graph_copy._parents = self._parents[:]
+        graph_copy._first_sub_blanks = self._first_sub_blanks[:]
+        graph_copy._ids = self._ids.copy()
+        graph_copy._n_empty = self._n_empty
+        return graph_copy
 
     def __hash__(self) -> int:  # pragma: no cover
-        return hash(hashable_config(self.config()))
+        return hash(self.hashable_config)
+
+    def _add_blank(self, blank: Blank, depth: int, parent: int) -> None:
+        self._ids[blank.id] = len(self._blanks)
+        self._blanks.append(blank)
+        self._contents.append(None)
+        self._depths.append(depth)
+        self._parents.append(parent)
+        self._first_sub_blanks.append(_NO_NODE)
+        self._n_empty += 1
+
+    def _blank(self, node: int) -> Blank:
+        blank = self._blanks[node]
+        assert blank is not None, "Blank was emptied from the graph"
+        return blank
+
+    def _sub_nodes(self, node: int) -> range:
+        first_sub_node = self._first_sub_blanks[node]
+        if first_sub_node == _NO_NODE:
+            return range(0)
+        content = self._contents[node]
+        assert content is not None
+        return range(first_sub_node, first_sub_node + _arity(content))
+
+    def _empty_node(self, node: int) -> None:
+        if self._contents[node] is None:
+            return
+        for sub_node in self._sub_nodes(node):
+            self._empty_node(sub_node)
+            del self._ids[self._blank(sub_node).id]
+            self._blanks[sub_node] = None
+            self._n_empty -= 1
+        self._contents[node] = None
+        self._first_sub_blanks[node] = _NO_NODE
+        self._n_empty += 1
+
+    def _content_node(self, node: int) -> str:
+        content = self._contents[node]
+        assert content is not None
+        return _node_value(self._blank(node), content)
+
+    def _content_node_blank(self, content_node: str) -> int:
+        blank_id = content_node.rsplit(">", maxsplit=1)[0]
+        node = self._ids.get(blank_id)
+        if node is None or self._contents[node] is None:
+            raise KeyError(f"Content node {content_node} is not in the graph")
+        return node
+
+
+class _NodesView:
+    """Networkx-like access to the data of blanks and content nodes."""
+
+    def __init__(self, graph: ProgramGraph) -> None:
+        self._graph = graph
+
+    def __getitem__(self, node: Union[Blank, str]) -> dict[str, Any]:
+        graph = self._graph
+        if isinstance(node, Blank):
+            return {"depth": graph.depth(node)}
+        blank_node = graph._content_node_blank(node)
+        content = graph._contents[blank_node]
+        data: dict[str, Any] = {"content": content}
+        if isinstance(content, IfBranching):
+            data["subblanks"] = if_sub_blanks(graph, graph._blank(blank_node))
+        return data
+
+    def __iter__(self) -> Iterator[Union[Blank, str]]:
+        graph = self._graph
+        for node, blank in enumerate(graph._blanks):
+            if blank is None:
+                continue
+            yield blank
+            if graph._contents[node] is not None:
+                yield graph._content_node(node)
+
+    def __len__(self) -> int:
+        return self._graph.number_of_nodes()
+
+    def __call__(self, data: Union[bool, str] = False) -> list[Any]:
+        if data is False:
+            return list(self)
+        if data is True:
+            return [(node, self[node]) for node in self]
+        return [(node, self[node].get(data)) for node in self]
 
 
 class IfBlanks(NamedTuple):
@@ -136,13 +267,44 @@ def if_sub_blanks(graph: ProgramGraph, blank: Blank) -> IfBlanks:
     content = graph.content(blank)
     if not content or content.kind != "if":
         raise ValueError("Blank was expeted to contain an if branching operation")
-    return graph.nodes[_node_value(blank, content)]["subblanks"]
+    return IfBlanks(*graph.sub_blanks(blank, content))
 
 
 def hashable_config(config: BlanksConfig) -> ProgramHash:
     return tuple([(blank, content) for blank, content in config.items()])
 
 
+def _arity(content: BlankContent) -> int:
+    """Number of sub-blanks of a content, only asked for contents having some."""
+    match content.kind:
+        case "operation":
+            return len(content.inputs_types)
+        case "if":
+            return 3
+    return 0  # pragma: no cover
+
+
+@lru_cache(maxsize=1 << 16)
+def _content_sub_blanks(blank: Blank, content: BlankContent) -> tuple[Blank, ...]:
+    """Sub-blanks created by filling the blank with the content,
+    cached as they are built again for every program using them."""
+    match content.kind:
+        case "operation":
+            op_node = _node_value(blank, content)
+            return tuple(
+                Blank(id=f"{op_node}>{input_name}", type=input_type)
+                for input_name, input_type in content.inputs_types.items()
+            )
+        case "if":
+            if_node = _node_value(blank, content)
+            return (
+                Blank(id=f"{if_node}>test", type=bool),
+                Blank(id=f"{if_node}>body", type=blank.type),
+                Blank(id=f"{if_node}>else", type=blank.type),
+            )
+    return ()
+
+
 def _node_value(blank: Blank, content: BlankContent) -> str:
     match content.kind:
         case "if":
@@ -1,93 +1,288 @@
-from astsynth.program.blanks import Blank, BlankContent, Constant, Operation
+from astsynth.program.blanks import (
+    Blank,
+    BlankContent,
+    Constant,
+    DerivedConstant,
+    Operation,
+)
 from astsynth.dsl import DomainSpecificLanguage
 from astsynth.program import GeneratedProgram
 from astsynth.program.graph import ProgramGraph, if_sub_blanks
-
-
-from astor import to_source
+from astsynth.type_lattice import type_source
 
 
 import ast
-from typing import Sequence
+from functools import lru_cache
+from typing import Any, Hashable, Iterable, Optional, Sequence
 
 
 def graph_to_program(
     graph: ProgramGraph, program_name: str, dsl: DomainSpecificLanguage
 ) -> GeneratedProgram:
-    constants_ast: dict[Constant, ast.Assign] = {}
+    """Make a program from the given graph, its source is only rendered on demand."""
+    return GeneratedProgram(
+        name=program_name, module=graph_to_module(graph, program_name, dsl)
+    )
 
-    for constant in dsl.constants:
-        constants_ast[constant] = ast.Assign(
-            targets=[ast.Name(constant.name)],
-            value=ast.Constant(constant.value),
+
+def graph_to_module(
+    graph: ProgramGraph, program_name: str, dsl: DomainSpecificLanguage
+) -> ast.Module:
+    dsl_constants = set(dsl.constants)
+    dsl_operations = set(dsl.operations)
+
+    used_constants: set[Constant] = set()
+    used_derived_constants: set[DerivedConstant] = set()
+    used_operations: set[Operation] = set()
+    for content in graph.contents():
+        if isinstance(content, DerivedConstant):
+            used_derived_constants.add(content)
+            used_constants.update(content.constants)
+            used_operations.update(content.operations)
+        elif isinstance(content, Constant) and content in dsl_constants:
+            used_constants.add(content)
+        elif isinstance(content, Operation) and content in dsl_operations:
+            used_operations.add(content)
+
+    active_constants = _constants_assignments(used_constants)
+    active_ops = _operations_function_defs(used_operations)
+    active_derived_constants: list[ast.stmt] = [
+        ast.Assign(
+            targets=[ast.Name(constant.name, ctx=ast.Store())],
+            value=ast.parse(constant.expression, mode="eval").body,
         )
+        for constant in sorted(used_derived_constants, key=lambda const: const.name)
+    ]
 
     inputs_arguments = [
-        ast.arg(input_var.name, annotation=ast.Name(input_var.type.__name__))
+        ast.arg(input_var.name, annotation=_type_annotation(input_var.type))
         for input_var in dsl.inputs
     ]
-    operations_ast: dict[Operation, ast.FunctionDef] = {}
-    for op in dsl.operations:
-        operations_ast[op] = ast.parse(op.source).body[0]  # type: ignore
-
-    active_constants: list[ast.Assign] = []
-    active_ops: list[ast.FunctionDef] = []
-
-    for _node, content in graph.nodes(data="content"):
-        if content in constants_ast:
-            active_constants.append(constants_ast[content])
-        elif content in operations_ast:
-            active_ops.append(operations_ast[content])
-
-    def _assign_const_id(assign: ast.Assign) -> str:
-        target_name: ast.Name = assign.targets[0]  # type: ignore
-        return target_name.id
-
-    active_constants = sorted(list(set(active_constants)), key=_assign_const_id)
-    active_ops = sorted(list(set(active_ops)), key=lambda func_def: func_def.name)
 
     function_body = _root_blank_to_ast_body(graph.root, graph)
 
     function = ast.FunctionDef(
         name=program_name,
-        body=function_body,
+        body=list(function_body),
         decorator_list=[],
-        args=ast.arguments(args=inputs_arguments, defaults=[]),  # type: ignore
+        args=ast.arguments(
+            posonlyargs=[],
+            args=inputs_arguments,
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        ),
     )
 
-    module = ast.Module(
-        body=active_constants + active_ops + [function],  # pyright: ignore
-        type_ignores=[],
+    body = active_constants + active_ops + active_derived_constants + [function]
+    return ast.Module(body=_used_prelude(dsl.prelude, body) + body, type_ignores=[])
+
+
+def dsl_module(dsl: DomainSpecificLanguage) -> ast.Module:
+    """Module defining every constant and operation of the DSL after its prelude,
+    as they are defined in the modules of programs written from the DSL."""
+    body = _constants_assignments(dsl.constants) + _operations_function_defs(
+        dsl.operations
     )
-    source = to_source(module)
-    return GeneratedProgram(name=program_name, source=source)
+    prelude = [
+        statement for _bound_names, statement in _prelude_statements(dsl.prelude)
+    ]
+    return ast.fix_missing_locations(ast.Module(body=prelude + body, type_ignores=[]))
+
+
+def _constants_assignments(constants: Iterable[Constant]) -> list[ast.stmt]:
+    return [
+        ast.Assign(
+            targets=[ast.Name(constant.name, ctx=ast.Store())],
+            value=ast.Constant(constant.value),
+        )
+        for constant in sorted(constants, key=lambda const: const.name)
+    ]
+
+
+def _operations_function_defs(operations: Iterable[Operation]) -> list[ast.stmt]:
+    return [
+        _operation_function_def(op.source)
+        for op in sorted(operations, key=lambda op: op.name)
+    ]
+
+
+def _used_prelude(prelude: str, body: list[ast.stmt]) -> list[ast.stmt]:
+    """Imports and classes of the DSL prelude defining names used by the body,
+    directly or through other prelude statements."""
+    statements = _prelude_statements(prelude)
+    used_names = set().union(*(_used_names(statement) for statement in body))
+    used = [bound_names is None for bound_names, _statement in statements]
+    found_new_names = True
+    while found_new_names:
+        found_new_names = False
+        for index, (bound_names, statement) in enumerate(statements):
+            if used[index] or bound_names is None or not bound_names & used_names:
+                continue
+            used[index] = True
+            used_names |= _used_names(statement)
+            found_new_names = True
+    return [
+        statement
+        for is_used, (_bound_names, statement) in zip(used, statements)
+        if is_used
+    ]
+
+
+@lru_cache(maxsize=None)
+def _prelude_statements(
+    prelude: str,
+) -> tuple[tuple[Optional[frozenset[str]], ast.stmt], ...]:
+    """Parse the prelude once, with the names bound by each of its statements,
+    None for star imports that are always written."""
+    statements: list[tuple[Optional[frozenset[str]], ast.stmt]] = []
+    for statement in ast.parse(prelude).body:
+        match statement:
+            case ast.ClassDef():
+                statements.append((frozenset([statement.name]), statement))
+            case ast.Import():
+                bound_names = frozenset(
+                    alias.asname or alias.name.split(".")[0]
+                    for alias in statement.names
+                )
+                statements.append((bound_names, statement))
+            case ast.ImportFrom():
+                if any(alias.name == "*" for alias in statement.names):
+                    statements.append((None, statement))
+                else:
+                    bound_names = frozenset(
+                        alias.asname or alias.name for alias in statement.names
+                    )
+                    statements.append((bound_names, statement))
+    return tuple(statements)
+
+
+def _used_names(node: ast.AST) -> set[str]:
+    return {name.id for name in ast.walk(node) if isinstance(name, ast.Name)}
+
+
+@lru_cache(maxsize=None)
+def _operation_function_def(source: str) -> ast.stmt:
+    """Parse an operation source only once, its ast being shared by programs.
+
+    Decorators, such as operation metadata declarations, are not written.
+
+    """
+    function_def: ast.FunctionDef = ast.parse(source).body[0]  # type: ignore
+    function_def.decorator_list = []
+    return function_def
+
+
+@lru_cache(maxsize=None)
+def _type_annotation(type_expression: Any) -> ast.expr:
+    return ast.parse(type_source(type_expression), mode="eval").body
+
+
+def _load_name(name: str) -> ast.Name:
+    return ast.Name(name, ctx=ast.Load())
 
 
 def _root_blank_to_ast_body(
     blank: Blank,
     graph: ProgramGraph,
 ) -> Sequence[ast.Return | ast.Assign | ast.If]:
-    ast_value, missing_variables, variables_count = _blank_ast_value(blank, graph, 0)
-    ast_lines: list[ast.Return | ast.Assign | ast.If] = []
+    shared_variables: dict[SubtreeKey, str] = {}
+    subtrees_keys: dict[Blank, SubtreeKey] = {}
+    ast_value, missing_variables = _blank_ast_value(
+        blank, graph, shared_variables, subtrees_keys
+    )
+    last_line: ast.Return | ast.If
     if isinstance(ast_value, (ast.Name, ast.Call)):
-        ast_lines.append(ast.Return(ast_value))
+        last_line = ast.Return(ast_value)
     else:
-        ast_lines.append(ast_value)
+        last_line = ast_value
 
+    assignments: list[ast.Assign] = []
     while missing_variables:
         var_name, blank = missing_variables.pop(0)
-        ast_value, new_missing_variables, variables_count = _blank_ast_value(
-            blank, graph, variables_count
+        ast_value, new_missing_variables = _blank_ast_value(
+            blank, graph, shared_variables, subtrees_keys
         )
         missing_variables += new_missing_variables
-        ast_lines.insert(0, ast.Assign(targets=[ast.Name(var_name)], value=ast_value))  # type: ignore
+        assignments.insert(
+            0,
+            ast.Assign(
+                targets=[ast.Name(var_name, ctx=ast.Store())],
+                value=ast_value,  # type: ignore
+            ),
+        )
 
+    ast_lines: list[ast.Return | ast.Assign | ast.If] = []
+    ast_lines += _dependency_ordered(assignments)
+    ast_lines.append(last_line)
     return ast_lines
 
 
+SubtreeKey = tuple[Hashable, ...]
+"""Structural description of a blank subtree, equal for identical subtrees."""
+
+
+def _subtree_key(
+    blank: Blank, graph: ProgramGraph, subtrees_keys: dict[Blank, SubtreeKey]
+) -> SubtreeKey:
+    if blank in subtrees_keys:
+        return subtrees_keys[blank]
+    content = graph.content(blank)
+    if content is None:
+        raise TypeError("Cannot represent the ast value of an empty blank")
+    key: SubtreeKey
+    match content.kind:
+        case "input" | "constant":
+            key = (content.kind, content.name)
+        case "operation":
+            key = (
+                content.kind,
+                content.name,
+                tuple(
+                    _subtree_key(sub_blank, graph, subtrees_keys)
+                    for sub_blank in graph.sub_blanks(blank=blank, operation=content)
+                ),
+            )
+            if not content.pure:
+                # Each impure call must be computed, so its subtrees are never shared.
+                key += (blank,)
+        case _:  # pragma: no cover
+            # If branches can only fill the root blank, never an operation argument.
+            raise TypeError(f"Unsupported type: {type(content)}")
+    subtrees_keys[blank] = key
+    return key
+
+
+def _dependency_ordered(assignments: list[ast.Assign]) -> list[ast.Assign]:
+    """Order assignments so that shared variables are assigned before any use."""
+    assignment_by_name: dict[str, ast.Assign] = {
+        assignment.targets[0].id: assignment  # type: ignore
+        for assignment in assignments
+    }
+    ordered: list[ast.Assign] = []
+    placed: set[str] = set()
+
+    def _place(assignment: ast.Assign) -> None:
+        var_name: str = assignment.targets[0].id  # type: ignore
+        if var_name in placed:
+            return
+        placed.add(var_name)
+        for node in ast.walk(assignment.value):
+            if isinstance(node, ast.Name) and node.id in assignment_by_name:
+                _place(assignment_by_name[node.id])
+        ordered.append(assignment)
+
+    for assignment in assignments:
+        _place(assignment)
+    return ordered
+
+
 def _blank_ast_value(
-    blank: Blank, graph: ProgramGraph, variable_count: int
-) -> tuple[ast.Name | ast.Call | ast.If, list[tuple[str, Blank]], int]:
+    blank: Blank,
+    graph: ProgramGraph,
+    shared_variables: dict[SubtreeKey, str],
+    subtrees_keys: dict[Blank, SubtreeKey],
+) -> tuple[ast.Name | ast.Call | ast.If, list[tuple[str, Blank]]]:
     content = graph.content(blank)
     if content is None:
         raise TypeError("Cannot represent the ast value of an empty blank")
@@ -100,14 +295,18 @@ def _blank_ast_value(
             case "input" | "constant":
                 return subcontent.name
             case "operation":
-                variable_name = f"x{variable_count}"
+                subtree_key = _subtree_key(subblank, graph, subtrees_keys)
+                if subtree_key in shared_variables:
+                    return shared_variables[subtree_key]
+                variable_name = f"x{len(shared_variables)}"
+                shared_variables[subtree_key] = variable_name
                 missing_variables.append((variable_name, subblank))
                 return variable_name
         raise NotImplementedError
 
     match content.kind:
         case "input" | "constant":
-            ast_value: ast.Name | ast.Call | ast.If = ast.Name(content.name)
+            ast_value: ast.Name | ast.Call | ast.If = _load_name(content.name)
         case "operation":
             args_asts: list[ast.expr] = []
             for op_blank in graph.sub_blanks(blank=blank, operation=content):
@@ -115,9 +314,9 @@ def _blank_ast_value(
                 if op_blank_content is None:
                     raise TypeError("Cannot represent the ast value of an empty blank")
                 var_name = _refer_to_subblank_variable_name(op_blank, op_blank_content)
-                args_asts.append(ast.Name(var_name))
+                args_asts.append(_load_name(var_name))
             ast_value = ast.Call(
-                func=ast.Name(content.name), args=args_asts, keywords=[]
+                func=_load_name(content.name), args=args_asts, keywords=[]
             )
         case "if":
             sub_blanks = if_sub_blanks(graph, blank)
@@ -131,14 +330,14 @@ def _blank_ast_value(
             if else_content is None:
                 raise TypeError("Cannot represent the ast value of an empty blank")
             ast_value = ast.If(
-                test=ast.Name(
+                test=_load_name(
                     _refer_to_subblank_variable_name(
                         sub_blanks.test_expression, test_content
                     )
                 ),
                 body=[
                     ast.Return(
-                        ast.Name(
+                        _load_name(
                             _refer_to_subblank_variable_name(
                                 sub_blanks.body, body_content
                             )
@@ -147,7 +346,7 @@ def _blank_ast_value(
                 ],
                 orelse=[
                     ast.Return(
-                        ast.Name(
+                        _load_name(
                             _refer_to_subblank_variable_name(
                                 sub_blanks.else_case, else_content
                             )
@@ -157,4 +356,4 @@ def _blank_ast_value(
             )
         case _:  # pragma: no cover
             raise TypeError(f"Unsupported type: {type(content)}")
-    return ast_value, missing_variables, variable_count + len(missing_variables)
+    return ast_value, missing_variables
@@ -0,0 +1,159 @@
+"""Index of programs by their outputs on a fixed set of probe inputs.
+
+The vector of outputs of a program on the probe inputs is a fingerprint of its
+behavior. Once built from an enumeration, the index solves any task whose
+examples cover the probe inputs with a single lookup, without any search.
+
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence, Type
+
+from astsynth.agent import TopDownBFS
+from astsynth.enumeration import SearchStrategy
+from astsynth.dsl import DomainSpecificLanguage
+from astsynth.generator import ProgramGenerator
+from astsynth.hashing import (
+    Digest,
+    UnstableDigestError,
+    canonical_digest,
+    inputs_digest,
+)
+from astsynth.namer import DefaultProgramNamer, ProgramNamer
+from astsynth.program import GeneratedProgram
+from astsynth.program.evaluate import function_succeeds_on_task, program_function
+from astsynth.program.writter import graph_to_program
+from astsynth.task import ExamplesProvider
+
+
+class SignatureIndex:
+    """Map from output signatures on probe inputs to canonical programs.
+
+    The canonical program of a signature is the first one enumerated with it,
+    so the smallest one for breadth-first agents.
+
+    Indexes built from values without a stable content digest can be used
+    within the process building them, but cannot be saved.
+
+    """
+
+    def __init__(
+        self,
+        probes_digests: Sequence[Digest],
+        programs: Optional[dict[Digest, GeneratedProgram]] = None,
+        stable: bool = True,
+    ) -> None:
+        self.probes_digests = list(probes_digests)
+        self.programs: dict[Digest, GeneratedProgram] = (
+            programs if programs is not None else {}
+        )
+        self.stable = stable
+        """All digests of the index are stable across processes."""
+
+    @classmethod
+    def build(
+        cls,
+        dsl: DomainSpecificLanguage,
+        probes: Sequence[Mapping[str, Any]],
+        output_type: Type[object],
+        max_depth: int = 3,
+        agent: Optional[SearchStrategy] = None,
+        namer: ProgramNamer = DefaultProgramNamer(),
+    ) -> "SignatureIndex":
+        """Build the index by enumerating all programs up to the given depth.
+
+        Programs raising an exception on any probe input are not indexed.
+
+        """
+        if not probes:
+            raise ValueError("SignatureIndex needs at least one probe input")
+        index = cls(probes_digests=[])
+        index.probes_digests = [index._digest(probe) for probe in probes]
+        generator = ProgramGenerator(
+            dsl=dsl,
+            output_type=output_type,
+            agent=agent if agent is not None else TopDownBFS(),
+        )
+        for program_graph in generator.enumerate(max_depth=max_depth):
+            program = graph_to_program(program_graph, namer.name(program_graph), dsl)
+            program_func = program_function(program)
+            try:
+                outputs = tuple(program_func(**probe) for probe in probes)
+            except Exception:
+                continue
+            signature = index._digest(outputs)
+            if signature not in index.programs:
+                index.programs[signature] = program
+        return index
+
+    def lookup(self, task: ExamplesProvider) -> Optional[GeneratedProgram]:
+        """Find the canonical program solving the task, if any is indexed.
+
+        The task examples must cover every probe input,
+        examples outside of the probe inputs are checked against the found program.
+
+        """
+        outputs_by_inputs: dict[Digest, Any] = {}
+        for inputs, output in task.iter_examples():
+            outputs_by_inputs[inputs_digest(inputs)] = output
+
+        if any(digest not in outputs_by_inputs for digest in self.probes_digests):
+            return None
+        signature = canonical_digest(
+            tuple(outputs_by_inputs[digest] for digest in self.probes_digests)
+        )
+        program = self.programs.get(signature)
+        if program is None:
+            return None
+
+        if len(outputs_by_inputs) > len(self.probes_digests):
+            if not function_succeeds_on_task(program_function(program), task):
+                return None
+        return program
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+    def _digest(self, value: Any) -> Digest:
+        """Digest of the value, marking the index as unstable
+        if it falls back on python hashes."""
+        try:
+            return canonical_digest(value, stable=True)
+        except UnstableDigestError:
+            self.stable = False
+            return canonical_digest(value)
+
+    def save(self, path: Path) -> None:
+        if not self.stable:
+            raise ValueError(
+                "Cannot save a signature index with digests of values"
+                " that have no stable content digest"
+            )
+        path.write_text(
+            json.dumps(
+                {
+                    "probes": [digest.hex() for digest in self.probes_digests],
+                    "programs": {
+                        signature.hex(): {
+                            "name": program.name,
+                            "source": program.source,
+                        }
+                        for signature, program in self.programs.items()
+                    },
+                }
+            )
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "SignatureIndex":
+        data = json.loads(path.read_text())
+        return cls(
+            probes_digests=[bytes.fromhex(digest) for digest in data["probes"]],
+            programs={
+                bytes.fromhex(signature): GeneratedProgram(
+                    name=program["name"], source=program["source"]
+                )
+                for signature, program in data["programs"].items()
+            },
+        )
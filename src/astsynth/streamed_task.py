@@ -0,0 +1,377 @@
+"""Tasks streaming their examples from files instead of holding them in memory.
+
+Two file formats are supported:
+
+- JSONL: one `{"input": {...}, "output": ...}` object per line.
+- Columnar: one typed column per input and output followed by a small json header,
+  memory-mapped and read without copy.
+
+"""
+
+import json
+import mmap
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Mapping, Self, Sequence, Type
+
+COLUMNAR_MAGIC = b"ASTSYNTH"
+_FOOTER_SIZE_BYTES = 8
+_ALIGNMENT = 8
+_OUTPUT_COLUMN = "return"
+
+_TYPE_FORMATS: dict[Type[Any], str] = {bool: "?", int: "q", float: "d"}
+_TYPES_BY_NAME: dict[str, Type[Any]] = {
+    "bool": bool,
+    "int": int,
+    "float": float,
+    "str": str,
+}
+
+
+class StreamedTask:
+    """Task whose examples are read from a file when iterated over.
+
+    The file stays open until the task is closed, tasks being context managers.
+
+    """
+
+    def __init__(
+        self,
+        examples: "JsonlExamples | ColumnarExamples",
+    ) -> None:
+        self.examples = examples
+
+    @classmethod
+    def from_jsonl(cls, path: Path) -> "StreamedTask":
+        return cls(JsonlExamples(path))
+
+    @classmethod
+    def from_columnar(cls, path: Path) -> "StreamedTask":
+        return cls(ColumnarExamples(path))
+
+    @property
+    def input_types(self) -> dict[str, Type[Any]]:
+        return self.examples.input_types
+
+    @property
+    def output_type(self) -> Type[Any]:
+        return self.examples.output_type
+
+    def iter_examples(self) -> Iterator[tuple[dict[str, Any], Any]]:
+        return iter(self.examples)
+
+    def batches(
+        self, batch_size: int
+    ) -> Iterator[tuple[Mapping[str, Sequence[Any]], Sequence[Any]]]:
+        """Iterate over examples by batches of columns (inputs columns, outputs)."""
+        return self.examples.batches(batch_size)
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def close(self) -> None:
+        self.examples.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class JsonlExamples:
+    """Examples read lazily line by line from a memory-mapped JSONL file.
+
+    Types are inferred from the first example, as in `Task.from_tuples`,
+    and checked on every example when it is read.
+
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        if path.stat().st_size == 0:
+            raise ValueError(f"No example found in {path}")
+        self._file = open(path, mode="rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._length: int | None = None
+
+        first_line = self._mmap.readline()
+        if not first_line.strip():
+            self.close()
+            raise ValueError(f"No example found in {path}")
+        inputs, output = _parse_jsonl_line(first_line)
+        self.input_types = {name: type(value) for name, value in inputs.items()}
+        self.output_type: Type[Any] = type(output)
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _lines(self) -> Iterator[bytes]:
+        position = 0
+        while position < len(self._mmap):
+            end = self._mmap.find(b"\n", position)
+            if end == -1:
+                end = len(self._mmap)
+            line = self._mmap[position:end]
+            position = end + 1
+            if line.strip():
+                yield line
+
+    def __iter__(self) -> Iterator[tuple[dict[str, Any], Any]]:
+        for line_index, line in enumerate(self._lines()):
+            inputs, output = _parse_jsonl_line(line)
+            self._check_types(inputs, output, line_index)
+            yield inputs, output
+
+    def _check_types(
+        self, inputs: dict[str, Any], output: Any, line_index: int
+    ) -> None:
+        if inputs.keys() != self.input_types.keys():
+            raise ValueError(
+                f"Example {line_index} of {self.path} has inputs {sorted(inputs)},"
+                f" expected {sorted(self.input_types)} as in the first example"
+            )
+        for name, value in inputs.items():
+            if not isinstance(value, self.input_types[name]):
+                raise TypeError(
+                    f"Input {name} of example {line_index} of {self.path}"
+                    f" is of type {type(value)}, expected {self.input_types[name]}"
+                    " as in the first example"
+                )
+        if not isinstance(output, self.output_type):
+            raise TypeError(
+                f"Output of example {line_index} of {self.path}"
+                f" is of type {type(output)}, expected {self.output_type}"
+                " as in the first example"
+            )
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _line in self._lines())
+        return self._length
+
+    def batches(
+        self, batch_size: int
+    ) -> Iterator[tuple[Mapping[str, Sequence[Any]], Sequence[Any]]]:
+        inputs_columns: dict[str, list[Any]] = {name: [] for name in self.input_types}
+        outputs: list[Any] = []
+        for inputs, output in self:
+            for name, value in inputs.items():
+                inputs_columns[name].append(value)
+            outputs.append(output)
+            if len(outputs) == batch_size:
+                yield inputs_columns, outputs
+                inputs_columns = {name: [] for name in self.input_types}
+                outputs = []
+        if outputs:
+            yield inputs_columns, outputs
+
+
+def _parse_jsonl_line(line: bytes) -> tuple[dict[str, Any], Any]:
+    example = json.loads(line)
+    return example["input"], example["output"]
+
+
+class ColumnarExamples:
+    """Examples stored as typed columns of a memory-mapped file.
+
+    Columns are exposed as `memoryview` over the mapped file,
+    so loading is independent of the number of examples.
+    Supported column types are bool, int, float and str.
+    Column slices given by `batches` must be released before closing.
+
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        if path.stat().st_size == 0:
+            raise ValueError(f"{path} is not a columnar examples file")
+        self._file = open(path, mode="rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer = memoryview(self._mmap)
+        self.columns: dict[str, _Column] = {}
+
+        if bytes(buffer[: len(COLUMNAR_MAGIC)]) != COLUMNAR_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar examples file")
+        footer_start = len(buffer) - _FOOTER_SIZE_BYTES
+        header_start = int.from_bytes(buffer[footer_start:], "little")
+        header = json.loads(bytes(buffer[header_start:footer_start]))
+
+        self._length: int = header["n_examples"]
+        self.columns = {
+            column["name"]: _Column.from_header(column, buffer)
+            for column in header["columns"]
+        }
+        self.output_type: Type[Any] = self.columns[_OUTPUT_COLUMN].type
+        self.input_types: dict[str, Type[Any]] = {
+            name: column.type
+            for name, column in self.columns.items()
+            if name != _OUTPUT_COLUMN
+        }
+
+    def __len__(self) -> int:
+        return self._length
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.release()
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[dict[str, Any], Any]]:
+        inputs_columns = {name: self.columns[name] for name in self.input_types}
+        outputs = self.columns[_OUTPUT_COLUMN]
+        for index in range(self._length):
+            yield (
+                {name: column[index] for name, column in inputs_columns.items()},
+                outputs[index],
+            )
+
+    def batches(
+        self, batch_size: int
+    ) -> Iterator[tuple[Mapping[str, Sequence[Any]], Sequence[Any]]]:
+        for start in range(0, self._length, batch_size):
+            stop = min(start + batch_size, self._length)
+            yield (
+                {
+                    name: self.columns[name].slice(start, stop)
+                    for name in self.input_types
+                },
+                self.columns[_OUTPUT_COLUMN].slice(start, stop),
+            )
+
+
+class _Column:
+    def __init__(
+        self,
+        column_type: Type[Any],
+        values: memoryview,
+        offsets: memoryview | None = None,
+    ) -> None:
+        self.type = column_type
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_header(cls, column: dict[str, Any], buffer: memoryview) -> "_Column":
+        column_type = _TYPES_BY_NAME[column["type"]]
+        start, nbytes = column["offset"], column["nbytes"]
+        if column_type is str:
+            offsets_start, offsets_nbytes = column["offsets"], column["offsets_nbytes"]
+            return cls(
+                column_type,
+                values=buffer[start : start + nbytes],
+                offsets=buffer[offsets_start : offsets_start + offsets_nbytes].cast(
+                    "q"
+                ),
+            )
+        return cls(
+            column_type,
+            values=buffer[start : start + nbytes].cast(_TYPE_FORMATS[column_type]),  # type: ignore[call-overload]
+        )
+
+    def release(self) -> None:
+        self.values.release()
+        if self.offsets is not None:
+            self.offsets.release()
+
+    def __getitem__(self, index: int) -> Any:
+        if self.offsets is None:
+            return self.values[index]
+        return str(self.values[self.offsets[index] : self.offsets[index + 1]], "utf-8")
+
+    def slice(self, start: int, stop: int) -> Sequence[Any]:
+        if self.offsets is None:
+            return self.values[start:stop]
+        return [self[index] for index in range(start, stop)]
+
+
+def write_columnar_examples(
+    path: Path, examples: Iterable[tuple[dict[str, Any], Any]]
+) -> None:
+    """Write examples as a columnar file readable by `ColumnarExamples`.
+
+    Every example must have the inputs of the first one, and every value
+    the exact type of its column, so that no value is silently converted.
+
+    """
+    columns: dict[str, list[Any]] = {}
+    n_examples = 0
+    for inputs, output in examples:
+        if n_examples > 0 and inputs.keys() | {_OUTPUT_COLUMN} != columns.keys():
+            raise ValueError(
+                f"Example {n_examples} has inputs {sorted(inputs)},"
+                f" expected {sorted(columns.keys() - {_OUTPUT_COLUMN})}"
+                " as in the first example"
+            )
+        for name, value in list(inputs.items()) + [(_OUTPUT_COLUMN, output)]:
+            column = columns.setdefault(name, [])
+            if column and type(value) is not type(column[0]):
+                raise ValueError(
+                    f"Value {value!r} of {name} in example {n_examples}"
+                    f" is of type {type(value)}, expected {type(column[0])}"
+                    " as in the first example"
+                )
+            column.append(value)
+        n_examples += 1
+    if n_examples == 0:
+        raise ValueError("Cannot write a columnar file without examples")
+
+    columns_headers: list[dict[str, Any]] = []
+    with open(path, mode="wb") as columnar_file:
+        columnar_file.write(COLUMNAR_MAGIC)
+        for name, values in columns.items():
+            column_type = type(values[0])
+            if column_type not in _TYPES_BY_NAME.values():
+                raise TypeError(
+                    f"Unsupported column type {column_type} for {name},"
+                    f" supported types are {list(_TYPES_BY_NAME)}"
+                )
+            column_header: dict[str, Any] = {
+                "name": name,
+                "type": column_type.__name__,
+            }
+            if column_type is str:
+                encoded = [value.encode("utf-8") for value in values]
+                offsets = array("q", [0])
+                for value_bytes in encoded:
+                    offsets.append(offsets[-1] + len(value_bytes))
+                column_header["offsets"], column_header["offsets_nbytes"] = (
+                    _write_aligned(columnar_file, offsets.tobytes())
+                )
+                data = b"".join(encoded)
+            else:
+                data = array(_TYPE_FORMATS[column_type], values).tobytes()
+            column_header["offset"], column_header["nbytes"] = _write_aligned(
+                columnar_file, data
+            )
+            columns_headers.append(column_header)
+
+        header_offset = columnar_file.tell()
+        header = {"n_examples": n_examples, "columns": columns_headers}
+        columnar_file.write(json.dumps(header).encode("utf-8"))
+        columnar_file.write(header_offset.to_bytes(_FOOTER_SIZE_BYTES, "little"))
+
+
+def _write_aligned(binary_file: BinaryIO, data: bytes) -> tuple[int, int]:
+    """Write data at the next aligned position, returns its (offset, nbytes)."""
+    position = binary_file.tell()
+    binary_file.write(b"\0" * (-position % _ALIGNMENT))
+    offset = binary_file.tell()
+    binary_file.write(data)
+    return offset, len(data)
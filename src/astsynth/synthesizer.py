@@ -1,19 +1,34 @@
+import asyncio
 import time
-from typing import TYPE_CHECKING, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
-from astsynth.agent import SynthesisAgent, TopDownBFS
+from astsynth.agent import TopDownBFS
+from astsynth.enumeration import SearchStrategy
 from astsynth.generator import ProgramGenerator
 from astsynth.namer import DefaultProgramNamer, ProgramNamer
+from astsynth.profiling import Profiler, SynthesisProfile
 from astsynth.program import GeneratedProgram
-from astsynth.program.evaluate import evaluate_program_on_task
+from astsynth.program.blanks import Blank, IfBranching, StandardOperation
+from astsynth.program.evaluate import CompiledProgram, Evaluator
 from astsynth.program.writter import graph_to_program
+from astsynth.program.graph import ProgramGraph
+from astsynth.tracing import EVALUATION, SearchHooks
+from astsynth.version_space import VersionSpace
 
 
 if TYPE_CHECKING:
     from astsynth.dsl import DomainSpecificLanguage
-    from astsynth.task import Task
+    from astsynth.task import ExamplesProvider
 
 
 class SynthesisStatistics(BaseModel):
@@ -25,53 +40,554 @@ class SynthesisStatistics(BaseModel):
     """Number of programs generated that successfully gives the right output from the inputs on every example of the task."""
     runtime: float
     """The runtime (s) of the synthesis."""
+    n_discarded_states: int = 0
+    """Number of partial programs discarded by the agent, making the search incomplete."""
+    profile: Optional[SynthesisProfile] = None
+    """Detailed statistics of each phase, only given if the synthesizer profiles."""
 
 
 class SynthesisResult(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     successful_programs: list[GeneratedProgram]
     """List of programs generated that successfully gives the right output from the inputs on every example of the task."""
     stats: SynthesisStatistics
     """Statistics of the synthesis process."""
+    version_space: Optional[VersionSpace] = Field(default=None, exclude=True)
+    """Successful programs with shared subtrees, replacing the list of successful programs
+    if the synthesis was run to give a version space. Not serialized."""
+
+
+class SynthesisSuccess(BaseModel):
+    """Successful program found during a streamed synthesis."""
+
+    program: GeneratedProgram
+    """Program succeeding on every example of the task."""
+    stats: SynthesisStatistics
+    """Statistics of the synthesis when the program was found."""
 
 
 class Synthesizer:
     def __init__(
         self,
         dsl: "DomainSpecificLanguage",
-        task: "Task",
-        agent: Optional[SynthesisAgent] = None,
+        task: "ExamplesProvider",
+        agent: Optional[SearchStrategy] = None,
+        evaluator: Optional[Evaluator] = None,
+        profile: bool = False,
+        standard_operations: Optional[list[StandardOperation]] = None,
     ) -> None:
         self.dsl = dsl
         self.task = task
         self.agent = agent if agent is not None else TopDownBFS()
+        self.evaluator = evaluator if evaluator is not None else Evaluator(dsl)
+        self.standard_operations = standard_operations
+        """Standard python operations, such as if branching, usable in programs."""
+        self.profile = profile
+        """Give detailed statistics of each phase, at a small runtime cost."""
+        self.hooks = SearchHooks()
+        """Subscribers to the events of the search and of program evaluations."""
 
     def run(
         self,
         max_depth: int = 3,
         namer: ProgramNamer = DefaultProgramNamer(),
+        max_solutions: Optional[int] = None,
+        evaluation_batch_size: int = 1,
+        version_space: bool = False,
     ) -> SynthesisResult:
+        """Synthesize programs succeeding at the task.
+
+        Args:
+            max_depth: Maximum depth of generated programs.
+            namer: Namer of the generated programs.
+            max_solutions: Stop the synthesis once this number of successful programs
+                is found. Explore the whole program space if None.
+            evaluation_batch_size: Number of generated programs evaluated together,
+                from the cheapest to the most expensive.
+            version_space: Keep successful programs in a version space sharing
+                their common subtrees, instead of a list of written programs.
+
+        """
+        stats = _empty_statistics()
+        if version_space:
+            successful_space = VersionSpace(output_type=self.task.output_type)
+            for _program in self._synthesis_steps(
+                stats,
+                max_depth,
+                namer,
+                max_solutions,
+                evaluation_batch_size,
+                successful_space,
+            ):
+                pass
+            return SynthesisResult(
+                successful_programs=[], stats=stats, version_space=successful_space
+            )
+        successful_programs = [
+            program
+            for program in self._synthesis_steps(
+                stats, max_depth, namer, max_solutions, evaluation_batch_size
+            )
+            if program is not None
+        ]
+        return SynthesisResult(successful_programs=successful_programs, stats=stats)
+
+    def run_iter(
+        self,
+        max_depth: int = 3,
+        namer: ProgramNamer = DefaultProgramNamer(),
+        max_solutions: Optional[int] = None,
+        evaluation_batch_size: int = 1,
+    ) -> Iterator[SynthesisSuccess]:
+        """Yield programs succeeding at the task as soon as they are found.
+
+        Successful programs are not kept, so that memory does not grow
+        with the number of solutions. Stopping the iteration stops the synthesis.
+        Arguments are the same as for `run`.
+
+        """
+        stats = _empty_statistics()
+        for program in self._synthesis_steps(
+            stats, max_depth, namer, max_solutions, evaluation_batch_size
+        ):
+            if program is not None:
+                yield SynthesisSuccess(program=program, stats=stats.model_copy())
+
+    async def arun_iter(
+        self,
+        max_depth: int = 3,
+        namer: ProgramNamer = DefaultProgramNamer(),
+        max_solutions: Optional[int] = None,
+        evaluation_batch_size: int = 1,
+    ) -> AsyncIterator[SynthesisSuccess]:
+        """Asynchronous form of `run_iter`.
+
+        The synthesis runs in the event loop, handing control back to it
+        after each generated program so that other tasks, and cancellation,
+        are not delayed by more than one program evaluation.
+
+        """
+        stats = _empty_statistics()
+        for program in self._synthesis_steps(
+            stats, max_depth, namer, max_solutions, evaluation_batch_size
+        ):
+            if program is not None:
+                yield SynthesisSuccess(program=program, stats=stats.model_copy())
+            await asyncio.sleep(0)
+
+    def _synthesis_steps(
+        self,
+        stats: SynthesisStatistics,
+        max_depth: int,
+        namer: ProgramNamer,
+        max_solutions: Optional[int],
+        evaluation_batch_size: int,
+        version_space: Optional[VersionSpace] = None,
+    ) -> Iterator[Optional[GeneratedProgram]]:
+        """Evaluate generated programs, yielding each successful program
+        and None for the others, with statistics updated before each yield.
+
+        Successful program graphs are added to the version space if one is given.
+
+        """
         generator = ProgramGenerator(
-            dsl=self.dsl, output_type=self.task.output_type, agent=self.agent
+            dsl=self.dsl,
+            output_type=self.task.output_type,
+            agent=self.agent,
+            standard_operations=self.standard_operations,
         )
+        profiler = generator.profiler = Profiler(enabled=self.profile)
+        hooks = generator.hooks = self.hooks
+        evaluator = self.evaluator
+        n_discarded_before = self.agent.n_discarded_states
+        n_hits_before = evaluator.n_memoized_hits
+        n_misses_before = evaluator.n_memoized_misses
 
-        successful_programs: list[GeneratedProgram] = []
-        n_generated = 0
+        def _update_profile() -> None:
+            stats.profile = profiler.profile(
+                n_cache_hits=evaluator.n_memoized_hits - n_hits_before,
+                n_cache_misses=evaluator.n_memoized_misses - n_misses_before,
+            )
 
         start_time = time.perf_counter()
-        for program_graph in generator.enumerate(max_depth=max_depth):
-            n_generated += 1
-            program_name = namer.name(program_graph)
-            generated_program = graph_to_program(program_graph, program_name, self.dsl)
-            eval_result = evaluate_program_on_task(generated_program, self.task)
-            if eval_result.full_success:
-                successful_programs.append(generated_program)
-        runtime = time.perf_counter() - start_time
-
-        return SynthesisResult(
-            successful_programs=successful_programs,
-            stats=SynthesisStatistics(
-                n_generated_programs=n_generated,
-                n_successful_programs=len(successful_programs),
-                runtime=runtime,
-            ),
+        for program_graph, generated_program in _scheduled_programs(
+            generator=generator,
+            max_depth=max_depth,
+            namer=namer,
+            dsl=self.dsl,
+            evaluator=evaluator,
+            batch_size=evaluation_batch_size,
+        ):
+            stats.n_generated_programs += 1
+            if hooks.subscribers:
+                hooks.emit(
+                    EVALUATION,
+                    phase="B",
+                    operations=[
+                        operation.name
+                        for operation in evaluator.used_operations(generated_program)
+                    ],
+                )
+            with profiler.phase("compile"):
+                compiled_program = evaluator.compile(generated_program)
+            with profiler.phase("evaluate"):
+                succeeds = evaluator.succeeds_on_task(compiled_program, self.task)
+            if hooks.subscribers:
+                hooks.emit(EVALUATION, phase="E", success=succeeds)
+            if succeeds:
+                stats.n_successful_programs += 1
+                if version_space is not None:
+                    version_space.add(program_graph)
+                if profiler.enabled:
+                    _update_profile()
+            stats.runtime = time.perf_counter() - start_time
+            stats.n_discarded_states = (
+                self.agent.n_discarded_states - n_discarded_before
+            )
+            yield generated_program if succeeds else None
+            if (
+                max_solutions is not None
+                and stats.n_successful_programs >= max_solutions
+            ):
+                return
+        stats.runtime = time.perf_counter() - start_time
+        stats.n_discarded_states = self.agent.n_discarded_states - n_discarded_before
+        if profiler.enabled:
+            _update_profile()
+
+
+class BatchSynthesizer:
+    """Synthesize programs for many tasks sharing the same inputs and output types.
+
+    The program space is enumerated once and each program is evaluated
+    on every task still active, a task being dropped once it reached
+    its maximum number of solutions.
+
+    """
+
+    def __init__(
+        self,
+        dsl: "DomainSpecificLanguage",
+        tasks: Sequence["ExamplesProvider"],
+        agent: Optional[SearchStrategy] = None,
+        evaluator: Optional[Evaluator] = None,
+    ) -> None:
+        if not tasks:
+            raise ValueError("BatchSynthesizer needs at least one task")
+        reference_task = tasks[0]
+        for task in tasks[1:]:
+            if task.input_types != reference_task.input_types:
+                raise ValueError(
+                    f"All tasks must share the same input types,"
+                    f" got {task.input_types} and {reference_task.input_types}"
+                )
+            if task.output_type != reference_task.output_type:
+                raise ValueError(
+                    f"All tasks must share the same output type,"
+                    f" got {task.output_type} and {reference_task.output_type}"
+                )
+        self.dsl = dsl
+        self.tasks = tasks
+        self.agent = agent if agent is not None else TopDownBFS()
+        self.evaluator = evaluator if evaluator is not None else Evaluator(dsl)
+
+    def run(
+        self,
+        max_depth: int = 3,
+        namer: ProgramNamer = DefaultProgramNamer(),
+        max_solutions: Optional[int] = None,
+        evaluation_batch_size: int = 1,
+    ) -> list[SynthesisResult]:
+        """Synthesize programs succeeding at each task.
+
+        Args:
+            max_depth: Maximum depth of generated programs.
+            namer: Namer of the generated programs.
+            max_solutions: Drop a task once this number of successful programs
+                is found for it. Tasks are never dropped if None.
+            evaluation_batch_size: Number of generated programs evaluated together,
+                from the cheapest to the most expensive.
+
+        Returns:
+            The synthesis result of each task, in the order of the given tasks.
+
+        """
+        generator = ProgramGenerator(
+            dsl=self.dsl, output_type=self.tasks[0].output_type, agent=self.agent
         )
+
+        successful_programs: list[list[GeneratedProgram]] = [[] for _ in self.tasks]
+        n_generated = [0 for _ in self.tasks]
+        runtimes = [0.0 for _ in self.tasks]
+        active_tasks = list(range(len(self.tasks)))
+        n_discarded_before = self.agent.n_discarded_states
+
+        start_time = time.perf_counter()
+        for _program_graph, generated_program in _scheduled_programs(
+            generator=generator,
+            max_depth=max_depth,
+            namer=namer,
+            dsl=self.dsl,
+            evaluator=self.evaluator,
+            batch_size=evaluation_batch_size,
+        ):
+            compiled_program = self.evaluator.compile(generated_program)
+
+            still_active_tasks = []
+            for task_index in active_tasks:
+                n_generated[task_index] += 1
+                task_programs = successful_programs[task_index]
+                if self.evaluator.succeeds_on_task(
+                    compiled_program, self.tasks[task_index]
+                ):
+                    task_programs.append(generated_program)
+                if max_solutions is not None and len(task_programs) >= max_solutions:
+                    runtimes[task_index] = time.perf_counter() - start_time
+                    continue
+                still_active_tasks.append(task_index)
+
+            active_tasks = still_active_tasks
+            if not active_tasks:
+                break
+
+        for task_index in active_tasks:
+            runtimes[task_index] = time.perf_counter() - start_time
+        n_discarded = self.agent.n_discarded_states - n_discarded_before
+
+        return [
+            SynthesisResult(
+                successful_programs=task_programs,
+                stats=SynthesisStatistics(
+                    n_generated_programs=n_generated[task_index],
+                    n_successful_programs=len(task_programs),
+                    runtime=runtimes[task_index],
+                    n_discarded_states=n_discarded,
+                ),
+            )
+            for task_index, task_programs in enumerate(successful_programs)
+        ]
+
+
+class ConditionalSynthesizer:
+    """Synthesize programs branching on an if, dividing the examples to conquer them.
+
+    Instead of enumerating every combination of test, body and else subtrees,
+    programs without branching are enumerated once and grouped by the examples
+    they solve, then boolean tests are enumerated once and grouped by the examples
+    they are true on. Each test splits the examples between a body program solving
+    those where it is true and an else program solving the others.
+    Branches are combined at the root of programs, as if branches are written.
+
+    """
+
+    def __init__(
+        self,
+        dsl: "DomainSpecificLanguage",
+        task: "ExamplesProvider",
+        agent: Optional[SearchStrategy] = None,
+        evaluator: Optional[Evaluator] = None,
+    ) -> None:
+        self.dsl = dsl
+        self.task = task
+        self.agent = agent if agent is not None else TopDownBFS()
+        self.evaluator = evaluator if evaluator is not None else Evaluator(dsl)
+
+    def run(
+        self,
+        max_depth: int = 3,
+        test_max_depth: Optional[int] = None,
+        namer: ProgramNamer = DefaultProgramNamer(),
+        max_solutions: Optional[int] = None,
+    ) -> SynthesisResult:
+        """Synthesize programs succeeding at the task, branching if needed.
+
+        Programs solving every example on their own are given first,
+        then programs branching between two programs that each solve
+        a part of the examples only: for each distinct split of the examples
+        by a test, one program per pair of body and else programs
+        solving distinct sets of examples.
+
+        Args:
+            max_depth: Maximum depth of the programs of each branch.
+            test_max_depth: Maximum depth of the tests of if branches,
+                the same as for branches if None.
+            namer: Namer of the generated programs.
+            max_solutions: Stop the synthesis once this number of successful programs
+                is found. Give every distinct branching if None.
+
+        """
+        if test_max_depth is None:
+            test_max_depth = max_depth
+        examples = list(self.task.iter_examples())
+        all_examples = (1 << len(examples)) - 1
+        stats = _empty_statistics()
+        successful_programs: list[GeneratedProgram] = []
+        n_discarded_before = self.agent.n_discarded_states
+        start_time = time.perf_counter()
+
+        def _done() -> bool:
+            return (
+                max_solutions is not None and len(successful_programs) >= max_solutions
+            )
+
+        def _add_solution(graph: ProgramGraph) -> None:
+            successful_programs.append(
+                graph_to_program(graph, namer.name(graph), self.dsl)
+            )
+
+        # First program solving exactly each set of examples
+        bodies: dict[int, ProgramGraph] = {}
+        for graph, compiled_program in self._compiled_programs(
+            self.task.output_type, max_depth
+        ):
+            stats.n_generated_programs += 1
+            solved = _examples_mask(
+                compiled_program,
+                examples,
+                lambda result, output: bool(result == output),
+            )
+            if solved == all_examples:
+                _add_solution(graph)
+                if _done():
+                    break
+            elif solved and solved not in bodies and not compiled_program.can_raise:
+                # Branches are computed before the if is written,
+                # so they also run on the examples of the other branch
+                bodies[solved] = graph
+
+        # First test being true exactly on each set of examples
+        tests: dict[int, ProgramGraph] = {}
+        if not _done() and len(bodies) > 1:
+            for graph, compiled_program in self._compiled_programs(
+                bool, test_max_depth
+            ):
+                stats.n_generated_programs += 1
+                true_on = _examples_mask(
+                    compiled_program, examples, lambda result, _output: result is True
+                )
+                if true_on in (0, all_examples) or true_on in tests:
+                    continue
+                tests[true_on] = graph
+
+        for true_on, test in tests.items():
+            if _done():
+                break
+            false_on = all_examples ^ true_on
+            for body_solved, body in bodies.items():
+                if _done() or body_solved & true_on != true_on:
+                    continue
+                for else_solved, else_case in bodies.items():
+                    if else_solved & false_on != false_on:
+                        continue
+                    if_graph = _if_branching_graph(
+                        self.task.output_type, test, body, else_case
+                    )
+                    stats.n_generated_programs += 1
+                    program = graph_to_program(if_graph, namer.name(if_graph), self.dsl)
+                    if not self.evaluator.program_succeeds_on_task(program, self.task):
+                        continue
+                    successful_programs.append(program)
+                    if _done():
+                        break
+
+        stats.n_successful_programs = len(successful_programs)
+        stats.runtime = time.perf_counter() - start_time
+        stats.n_discarded_states = self.agent.n_discarded_states - n_discarded_before
+        return SynthesisResult(successful_programs=successful_programs, stats=stats)
+
+    def _compiled_programs(
+        self, output_type: Any, max_depth: int
+    ) -> Iterator[tuple[ProgramGraph, CompiledProgram]]:
+        generator = ProgramGenerator(
+            dsl=self.dsl, output_type=output_type, agent=self.agent
+        )
+        for graph in generator.enumerate(max_depth=max_depth):
+            program = graph_to_program(graph, "branch", self.dsl)
+            yield graph, self.evaluator.compile(program)
+
+
+def _examples_mask(
+    compiled_program: CompiledProgram,
+    examples: list[tuple[dict[str, Any], Any]],
+    matches: Callable[[Any, Any], bool],
+) -> int:
+    """Bits of the examples on which the program result matches the output."""
+    mask = 0
+    for example_index, (inputs, output) in enumerate(examples):
+        try:
+            result = compiled_program.function(**inputs)
+        except Exception:
+            if compiled_program.can_raise:
+                continue
+            raise
+        if matches(result, output):
+            mask |= 1 << example_index
+    return mask
+
+
+def _if_branching_graph(
+    output_type: Any,
+    test: ProgramGraph,
+    body: ProgramGraph,
+    else_case: ProgramGraph,
+) -> ProgramGraph:
+    graph = ProgramGraph(output_type=output_type)
+    if_branching = IfBranching()
+    graph.fill_blank(graph.root, if_branching)
+    for sub_blank, branch in zip(
+        graph.sub_blanks(graph.root, if_branching), (test, body, else_case)
+    ):
+        _copy_subtree(branch, branch.root, graph, sub_blank)
+    return graph
+
+
+def _copy_subtree(
+    source: ProgramGraph, source_blank: Blank, graph: ProgramGraph, blank: Blank
+) -> None:
+    content = source.content(source_blank)
+    if content is None:
+        raise ValueError("Only complete programs can be copied")
+    graph.fill_blank(blank, content)
+    if content.kind in ("input", "constant"):
+        return
+    for source_sub_blank, sub_blank in zip(
+        source.sub_blanks(source_blank, content), graph.sub_blanks(blank, content)
+    ):
+        _copy_subtree(source, source_sub_blank, graph, sub_blank)
+
+
+def _empty_statistics() -> SynthesisStatistics:
+    return SynthesisStatistics(
+        n_generated_programs=0, n_successful_programs=0, runtime=0.0
+    )
+
+
+def _scheduled_programs(
+    generator: ProgramGenerator,
+    max_depth: int,
+    namer: ProgramNamer,
+    dsl: "DomainSpecificLanguage",
+    evaluator: Evaluator,
+    batch_size: int,
+) -> Iterator[tuple[ProgramGraph, GeneratedProgram]]:
+    """Generated programs with their graph,
+    ordered by evaluation cost within each batch."""
+    profiler = generator.profiler
+    batch: list[GeneratedProgram] = []
+    batch_graphs: dict[int, ProgramGraph] = {}
+    for program_graph in generator.enumerate(max_depth=max_depth):
+        if profiler.enabled:
+            profiler.record_program(max(map(program_graph.depth, program_graph.blanks)))
+        with profiler.phase("write"):
+            program_name = namer.name(program_graph)
+            program = graph_to_program(program_graph, program_name, dsl)
+        batch.append(program)
+        batch_graphs[id(program)] = program_graph
+        if len(batch) >= batch_size:
+            for program in evaluator.schedule(batch) if batch_size > 1 else batch:
+                yield batch_graphs[id(program)], program
+            batch = []
+            batch_graphs = {}
+    for program in evaluator.schedule(batch):
+        yield batch_graphs[id(program)], program
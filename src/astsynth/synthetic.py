@@ -0,0 +1,354 @@
+"""Synthetic DSLs and tasks with planted solutions, for scaling stress tests.
+
+DSLs are generated as python sources with a controlled number of types,
+operations per type, arity distribution, constants and use of if branching.
+Operations mix the representation of their arguments into a value of their output
+type, so that different programs almost never agree on every example.
+Tasks are then planted: a random program of known depth is built from the DSL
+and its outputs on random inputs give the examples.
+
+A scaling experiment is a single seeded command, for example:
+
+    python -m astsynth.synthetic --seed 0 --n-types 3 --solution-depth 2
+
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from astsynth.agent import TopDownBFS
+from astsynth.enumeration import CanonicalDFS, SearchStrategy
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.program import GeneratedProgram
+from astsynth.program.blanks import (
+    BlankContent,
+    IfBranching,
+    Input,
+    StandardOperation,
+)
+from astsynth.program.evaluate import program_function
+from astsynth.program.graph import ProgramGraph
+from astsynth.program.writter import graph_to_program
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+
+SYNTHETIC_TYPES: list[tuple[str, Any]] = [
+    ("int", int),
+    ("str", str),
+    ("float", float),
+    ("ints", list[int]),
+    ("strs", list[str]),
+]
+"""Name and type of the types synthetic DSLs draw from, in order."""
+
+_CONVERSIONS = {
+    "int": "mixed % 1009",
+    "str": '"abcdefgh"[mixed % 8] + "xyz"[mixed % 3]',
+    "float": "(mixed % 1009) / 8",
+    "bool": "mixed % 2 == 0",
+    "ints": "[mixed % 10, mixed // 10 % 10]",
+    "strs": '["ab"[mixed % 2], "cd"[mixed // 2 % 2]]',
+}
+"""Conversion of the mixed integer of an operation to its output type."""
+
+_ANNOTATIONS = {
+    "int": "int",
+    "str": "str",
+    "float": "float",
+    "bool": "bool",
+    "ints": "list[int]",
+    "strs": "list[str]",
+}
+
+_SCALAR_TYPES = ("int", "str", "float", "bool")
+"""Types of which constants can be written in a DSL source."""
+
+
+class SyntheticDslConfig(BaseModel):
+    n_types: int = 2
+    """Number of types used by operations, at most the number of synthetic types."""
+    operations_per_type: int = 2
+    """Number of operations returning each type."""
+    arity_weights: list[float] = Field(default_factory=lambda: [1.0, 1.0])
+    """Relative probability of each arity, from 1 to len(arity_weights)."""
+    n_constants: int = 2
+    """Number of constants, spread over the scalar types."""
+    if_branching: bool = False
+    """Add the bool type and allow if branching in programs."""
+
+
+class SyntheticDsl(BaseModel):
+    source: str
+    """Python source of the DSL, readable by `load_symbols_from_python_source`."""
+    type_names: list[str]
+    """Names of the types of the DSL, such as "int" or "ints" for list[int]."""
+    standard_operations: list[StandardOperation] = Field(default_factory=list)
+
+    def load(self) -> DomainSpecificLanguage:
+        return load_symbols_from_python_source(self.source)
+
+
+class SyntheticTask(BaseModel):
+    task: Task
+    solution: GeneratedProgram
+    """Planted program, succeeding on the task by construction."""
+    solution_depth: int
+
+
+def generate_dsl(config: SyntheticDslConfig, seed: int = 0) -> SyntheticDsl:
+    if not 1 <= config.n_types <= len(SYNTHETIC_TYPES):
+        raise ValueError(
+            f"Number of types must be between 1 and {len(SYNTHETIC_TYPES)},"
+            f" got {config.n_types}"
+        )
+    if not config.arity_weights or sum(config.arity_weights) <= 0:
+        raise ValueError("Arity weights must give a positive weight to some arity")
+
+    rng = random.Random(seed)
+    type_names = [name for name, _type in SYNTHETIC_TYPES[: config.n_types]]
+    if config.if_branching:
+        type_names.append("bool")
+
+    lines: list[str] = []
+    scalar_types = [name for name in type_names if name in _SCALAR_TYPES]
+    for constant_index in range(config.n_constants if scalar_types else 0):
+        type_name = scalar_types[constant_index % len(scalar_types)]
+        value = _random_value(type_name, rng)
+        lines.append(f"C_{type_name.upper()}_{constant_index} = {value!r}")
+
+    arities = list(range(1, len(config.arity_weights) + 1))
+    for output_type in type_names:
+        for operation_index in range(config.operations_per_type):
+            (arity,) = rng.choices(arities, weights=config.arity_weights)
+            arguments = [
+                f"a{argument_index}: {_ANNOTATIONS[rng.choice(type_names)]}"
+                for argument_index in range(arity)
+            ]
+            arguments_names = ", ".join(f"a{index}" for index in range(arity))
+            lines += [
+                "",
+                f"def op_{output_type}_{operation_index}({', '.join(arguments)})"
+                f" -> {_ANNOTATIONS[output_type]}:",
+                "    mixed = sum((index + 1) * ord(char) for index, char"
+                f" in enumerate(repr(({arguments_names},)))) * {rng.randint(3, 997)}",
+                f"    return {_CONVERSIONS[output_type]}",
+            ]
+
+    return SyntheticDsl(
+        source="\n".join(lines) + "\n",
+        type_names=type_names,
+        standard_operations=[IfBranching()] if config.if_branching else [],
+    )
+
+
+def plant_task(
+    synthetic_dsl: SyntheticDsl,
+    solution_depth: int,
+    n_examples: int = 5,
+    if_probability: float = 0.3,
+    seed: int = 0,
+) -> SyntheticTask:
+    """Task of a random program of the given depth, with one input of each type.
+
+    Operations nest along a single path from the output down to the solution depth,
+    other arguments being inputs or constants. If branching, when the DSL allows it,
+    may only be planted at the root of the program, testing a boolean leaf.
+
+    """
+    rng = random.Random(seed)
+    dsl = synthetic_dsl.load()
+    inputs: dict[str, Input] = {
+        type_name: Input(name=f"x_{type_name}", type=_type_from_name(type_name))
+        for type_name in synthetic_dsl.type_names
+    }
+    dsl.inputs += list(inputs.values())
+    output_type_names = [name for name in synthetic_dsl.type_names if name != "bool"]
+    output_type_name = rng.choice(output_type_names)
+
+    leaves: dict[str, list[BlankContent]] = {
+        type_name: [input_content] for type_name, input_content in inputs.items()
+    }
+    for constant in dsl.constants:
+        leaves[_type_name(type(constant.value))].append(constant)
+    operations: dict[str, list[BlankContent]] = {}
+    for operation in dsl.operations:
+        operations.setdefault(_type_name(operation.output_type), []).append(operation)
+    allow_if = bool(synthetic_dsl.standard_operations)
+
+    graph = ProgramGraph(output_type=_type_from_name(output_type_name))
+
+    def _plant(blank_type_name: str, depth_left: int, blank: Any) -> None:
+        if depth_left == 0:
+            graph.fill_blank(blank, rng.choice(leaves[blank_type_name]))
+            return
+        # Programs are written with if branching at their root only
+        if allow_if and blank is graph.root and rng.random() < if_probability:
+            if_branching = IfBranching()
+            graph.fill_blank(blank, if_branching)
+            test, body, else_case = graph.sub_blanks(blank, if_branching)
+            graph.fill_blank(test, rng.choice(leaves["bool"]))
+            _plant(blank_type_name, depth_left - 1, body)
+            graph.fill_blank(else_case, rng.choice(leaves[blank_type_name]))
+            return
+        operation = rng.choice(operations[blank_type_name])
+        graph.fill_blank(blank, operation)
+        sub_blanks = graph.sub_blanks(blank, operation)
+        _plant(_type_name(sub_blanks[0].type), depth_left - 1, sub_blanks[0])
+        for sub_blank in sub_blanks[1:]:
+            graph.fill_blank(sub_blank, rng.choice(leaves[_type_name(sub_blank.type)]))
+
+    _plant(output_type_name, solution_depth, graph.root)
+    solution = graph_to_program(graph, "planted_solution", dsl)
+    solution_function = program_function(solution)
+
+    examples: list[tuple[dict[str, Any], Any]] = []
+    seen_inputs: set[str] = set()
+    for _ in range(100 * n_examples):
+        if len(examples) >= n_examples:
+            break
+        example_inputs = {
+            input_content.name: _random_value(type_name, rng)
+            for type_name, input_content in inputs.items()
+        }
+        if repr(example_inputs) in seen_inputs:
+            continue
+        seen_inputs.add(repr(example_inputs))
+        examples.append((example_inputs, solution_function(**example_inputs)))
+    return SyntheticTask(
+        task=Task.from_tuples(examples),
+        solution=solution,
+        solution_depth=solution_depth,
+    )
+
+
+def _random_value(type_name: str, rng: random.Random) -> Any:
+    match type_name:
+        case "int":
+            return rng.randint(0, 9)
+        case "str":
+            return "".join(rng.choices("abc", k=rng.randint(1, 3)))
+        case "float":
+            return rng.randint(0, 99) / 4
+        case "bool":
+            return rng.random() < 0.5
+        case "ints":
+            return [rng.randint(0, 9) for _ in range(rng.randint(1, 3))]
+        case "strs":
+            return [rng.choice("abc") for _ in range(rng.randint(1, 3))]
+    raise ValueError(f"Unknown synthetic type {type_name}")
+
+
+def _type_from_name(type_name: str) -> Any:
+    if type_name == "bool":
+        return bool
+    return dict(SYNTHETIC_TYPES)[type_name]
+
+
+def _type_name(type_expression: Any) -> str:
+    if type_expression is bool:
+        return "bool"
+    for name, synthetic_type in SYNTHETIC_TYPES:
+        if synthetic_type == type_expression:
+            return name
+    raise ValueError(f"{type_expression} is not a synthetic type")
+
+
+_AGENTS: dict[str, Callable[[], SearchStrategy]] = {
+    "bfs": TopDownBFS,
+    "dfs": CanonicalDFS,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-types", type=int, default=2)
+    parser.add_argument("--operations-per-type", type=int, default=2)
+    parser.add_argument("--arity-weights", type=float, nargs="+", default=[1.0, 1.0])
+    parser.add_argument("--n-constants", type=int, default=2)
+    parser.add_argument("--if-branching", action="store_true")
+    parser.add_argument("--solution-depth", type=int, default=2)
+    parser.add_argument("--n-examples", type=int, default=5)
+    parser.add_argument("--agent", choices=sorted(_AGENTS), default="bfs")
+    parser.add_argument(
+        "--max-depth", type=int, default=None, help="Defaults to the solution depth."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=None,
+        help="Write the DSL source, the task and the planted solution there.",
+    )
+    args = parser.parse_args(argv)
+
+    synthetic_dsl = generate_dsl(
+        SyntheticDslConfig(
+            n_types=args.n_types,
+            operations_per_type=args.operations_per_type,
+            arity_weights=args.arity_weights,
+            n_constants=args.n_constants,
+            if_branching=args.if_branching,
+        ),
+        seed=args.seed,
+    )
+    synthetic_task = plant_task(
+        synthetic_dsl,
+        solution_depth=args.solution_depth,
+        n_examples=args.n_examples,
+        seed=args.seed,
+    )
+    if args.output_dir is not None:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        (args.output_dir / "dsl.py").write_text(synthetic_dsl.source)
+        (args.output_dir / "solution.py").write_text(synthetic_task.solution.source)
+        (args.output_dir / "examples.json").write_text(
+            json.dumps(
+                [
+                    {"inputs": inputs, "output": output}
+                    for inputs, output in synthetic_task.task.iter_examples()
+                ],
+                indent=2,
+            )
+        )
+
+    dsl = synthetic_dsl.load()
+    dsl.add_task_inputs(synthetic_task.task)
+    synthesizer = Synthesizer(
+        dsl,
+        synthetic_task.task,
+        agent=_AGENTS[args.agent](),
+        standard_operations=synthetic_dsl.standard_operations,
+    )
+    max_depth = args.max_depth if args.max_depth is not None else args.solution_depth
+    start_time = time.perf_counter()
+    first_success = next(iter(synthesizer.run_iter(max_depth=max_depth)), None)
+    print(
+        json.dumps(
+            {
+                "n_operations": len(dsl.operations),
+                "n_constants": len(dsl.constants),
+                "solution_depth": args.solution_depth,
+                "max_depth": max_depth,
+                "agent": args.agent,
+                "solved": first_success is not None,
+                "time_to_first_solution": time.perf_counter() - start_time,
+                "n_generated_programs": (
+                    first_success.stats.n_generated_programs
+                    if first_success is not None
+                    else None
+                ),
+            }
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
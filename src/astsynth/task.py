@@ -1,5 +1,7 @@
-from typing import Any, Generic, Self, Type, TypeVar
-from pydantic import BaseModel
+from typing import Any, Generic, Iterator, Optional, Protocol, Self, Type, TypeVar
+from pydantic import BaseModel, PrivateAttr
+
+from astsynth.hashing import Digest, canonical_digest, inputs_digest
 
 
 Input = TypeVar("Input")
@@ -11,19 +13,34 @@ class Example(BaseModel):
     output: Any
 
 
+class ExamplesProvider(Protocol):
+    """Anything giving typed input/output examples to synthesize a program from."""
+
+    @property
+    def input_types(self) -> dict[str, Type[Any]]: ...
+
+    @property
+    def output_type(self) -> Type[Any]: ...
+
+    def iter_examples(self) -> Iterator[tuple[dict[str, Any], Any]]:
+        """Iterate over (inputs, output) pairs of examples."""
+        ...
+
+
 class Task(BaseModel, Generic[Input, Output]):
-    examples: dict[tuple[tuple[str, Input], ...], Example]
+    examples: dict[Digest, Example]
     input_types: dict[str, Type[Input]]
     output_type: Type[Output]
+    _digest: Optional[Digest] = PrivateAttr(default=None)
 
     @classmethod
     def from_tuples(cls, examples: list[tuple[dict[str, Input], Output]]) -> Self:
-        defining_example = examples.pop()
+        defining_example = examples[-1]
         inputs_kwargs, output = defining_example
         input_types = {name: type(value) for name, value in inputs_kwargs.items()}
         output_type = type(output)
 
-        formated_examples: dict[tuple[tuple[str, Input], ...], Example] = {}
+        formated_examples: dict[Digest, Example] = {}
 
         for inputs_kwargs, output in examples:
             for name, value in inputs_kwargs.items():
@@ -42,7 +59,7 @@ class Task(BaseModel, Generic[Input, Output]):
                     f"Output type {type(output)},"
                     f" is not compatible with output type of the defining example : {defining_example}"
                 )
-            input_hash = tuple([(name, value) for name, value in inputs_kwargs.items()])
+            input_hash = inputs_digest(inputs_kwargs)
             if input_hash in formated_examples:
                 raise ValueError(
                     f"Input {inputs_kwargs} is already given in example {formated_examples[input_hash]} "
@@ -52,3 +69,19 @@ class Task(BaseModel, Generic[Input, Output]):
         return cls(
             examples=formated_examples, input_types=input_types, output_type=output_type
         )
+
+    def iter_examples(self) -> Iterator[tuple[dict[str, Input], Output]]:
+        for example in self.examples.values():
+            yield example.input, example.output
+
+    @property
+    def digest(self) -> Digest:
+        """Digest of the content of the examples, computed once."""
+        if self._digest is None:
+            self._digest = canonical_digest(
+                {
+                    input_digest: example.output
+                    for input_digest, example in self.examples.items()
+                }
+            )
+        return self._digest
@@ -0,0 +1,112 @@
+"""Tracing hooks of the program search, and a Chrome trace-event sink.
+
+The generator and the synthesizer fire timestamped events to the subscribers
+of their hooks. Events are only built when there is at least one subscriber,
+so that untraced searches pay nothing more than checking an empty list.
+
+Traces written by `ChromeTraceSink` can be opened in chrome://tracing or Perfetto.
+
+"""
+
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional, TextIO, Union
+
+ACTION_CHOSEN = "action_chosen"
+"""An action was chosen by the agent, args: action kind."""
+STATE_EXPANDED = "state_expanded"
+"""Candidate actions of a program state were computed, args: candidates and frontier sizes."""
+PROGRAM_EMITTED = "program_emitted"
+"""A complete program was generated."""
+EVALUATION = "evaluation"
+"""Evaluation of a program on the task, started (B) then finished (E),
+args: program operations when started, success when finished."""
+EARLY_REJECTION = "early_rejection"
+"""A program state was rejected before being offered to the agent, args: reason."""
+
+
+class TraceEvent(NamedTuple):
+    name: str
+    phase: str
+    """Chrome trace-event phase: "i" for instants, "B" and "E" for durations."""
+    timestamp: int
+    """Time of the event (ns), from `time.perf_counter_ns`."""
+    args: dict[str, Any]
+
+
+TraceSubscriber = Callable[[TraceEvent], None]
+
+
+class SearchHooks:
+    """Subscribers to the events of a search."""
+
+    __slots__ = ("subscribers",)
+
+    def __init__(self) -> None:
+        self.subscribers: list[TraceSubscriber] = []
+
+    def subscribe(self, subscriber: TraceSubscriber) -> None:
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: TraceSubscriber) -> None:
+        self.subscribers.remove(subscriber)
+
+    def emit(self, name: str, phase: str = "i", **args: Any) -> None:
+        """Send an event to every subscriber,
+        callers check for subscribers first to avoid building args."""
+        event = TraceEvent(
+            name=name, phase=phase, timestamp=time.perf_counter_ns(), args=args
+        )
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+
+class ChromeTraceSink:
+    """Subscriber writing events to a Chrome trace-event JSON file as they come.
+
+    The file is only a valid JSON document once the sink is closed.
+
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._file: Optional[TextIO] = self.path.open("w", encoding="utf-8")
+        self._file.write('{"traceEvents": [\n')
+        self._n_events = 0
+        self._pid = os.getpid()
+        self._tid = threading.get_native_id()
+
+    def __call__(self, event: TraceEvent) -> None:
+        if self._file is None:
+            raise ValueError(f"Trace sink of {self.path} is closed")
+        chrome_event: dict[str, Any] = {
+            "name": event.name,
+            "ph": event.phase,
+            "ts": event.timestamp / 1000,
+            "pid": self._pid,
+            "tid": self._tid,
+        }
+        if event.phase == "i":
+            chrome_event["s"] = "t"
+        if event.args:
+            chrome_event["args"] = event.args
+        if self._n_events:
+            self._file.write(",\n")
+        self._file.write(json.dumps(chrome_event, default=str))
+        self._n_events += 1
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.write('\n], "displayTimeUnit": "ms"}\n')
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "ChromeTraceSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,123 @@
+"""Compatibility between type expressions, including parametric and union types.
+
+Type expressions are plain classes or parametric annotations such as
+`list[int]`, `dict[str, list[int]]`, `Optional[str]` or `int | None`.
+A `TypeLattice` precomputes which types can fill blanks of which other types,
+so that the generator only queries a table while filling blanks.
+
+"""
+
+import types
+from functools import lru_cache
+from typing import Any, Iterable, TypeVar, Union, get_args, get_origin
+
+NoneType = type(None)
+
+
+def is_subtype(sub: Any, sup: Any) -> bool:
+    """Check if a value of type `sub` can be used where type `sup` is expected.
+
+    Parameters of generic types are treated as covariant,
+    and missing parameters (bare `list`) are compatible with any parameter.
+
+    """
+    sub, sup = normalize_type(sub), normalize_type(sup)
+    if sup is Any or sup is object or sub is Any or sub == sup:
+        return True
+    if isinstance(sup, TypeVar) or isinstance(sub, TypeVar):
+        return True
+
+    if _is_union(sub):
+        return all(is_subtype(sub_arg, sup) for sub_arg in get_args(sub))
+    if _is_union(sup):
+        return any(is_subtype(sub, sup_arg) for sup_arg in get_args(sup))
+
+    sub_origin, sup_origin = _origin(sub), _origin(sup)
+    if not isinstance(sub_origin, type) or not isinstance(sup_origin, type):
+        return False
+    if not issubclass(sub_origin, sup_origin):
+        return False
+
+    sub_args, sup_args = get_args(sub), get_args(sup)
+    if not sub_args or not sup_args:
+        return True
+    if len(sub_args) != len(sup_args):
+        return False
+    return all(
+        is_subtype(sub_arg, sup_arg) for sub_arg, sup_arg in zip(sub_args, sup_args)
+    )
+
+
+def normalize_type(type_expression: Any) -> Any:
+    if type_expression is None:
+        return NoneType
+    return type_expression
+
+
+class TypeLattice:
+    """Cached compatibility table between type expressions."""
+
+    def __init__(self, type_expressions: Iterable[Any] = ()) -> None:
+        self._compatible: dict[tuple[Any, Any], bool] = {}
+        self._known_types: set[Any] = set()
+        self.types: list[Any] = []
+        for type_expression in type_expressions:
+            self.add(type_expression)
+
+    def add(self, type_expression: Any) -> None:
+        """Add a type to the lattice, computing its compatibility with known types."""
+        type_expression = normalize_type(type_expression)
+        if type_expression in self._known_types:
+            return
+        self._known_types.add(type_expression)
+        self.types.append(type_expression)
+        for other in self.types:
+            self._compatible[(type_expression, other)] = is_subtype(
+                type_expression, other
+            )
+            self._compatible[(other, type_expression)] = is_subtype(
+                other, type_expression
+            )
+
+    def is_subtype(self, sub: Any, sup: Any) -> bool:
+        key = (normalize_type(sub), normalize_type(sup))
+        compatible = self._compatible.get(key)
+        if compatible is None:
+            self.add(sub)
+            self.add(sup)
+            compatible = self._compatible[key]
+        return compatible
+
+    def subtypes(self, sup: Any) -> list[Any]:
+        """All known types that can be used where type `sup` is expected."""
+        self.add(sup)
+        sup = normalize_type(sup)
+        return [sub for sub in self.types if self._compatible[(sub, sup)]]
+
+
+@lru_cache(maxsize=None)
+def type_source(type_expression: Any) -> str:
+    """Source code of the annotation of a type expression,
+    only relying on builtins for standard parametric types."""
+    type_expression = normalize_type(type_expression)
+    if type_expression is NoneType:
+        return "None"
+    if type_expression is Any:
+        return "object"
+    if _is_union(type_expression):
+        return " | ".join(type_source(arg) for arg in get_args(type_expression))
+    origin, args = get_origin(type_expression), get_args(type_expression)
+    if origin is not None and args:
+        return f"{type_source(origin)}[{', '.join(type_source(arg) for arg in args)}]"
+    if origin is not None:
+        return type_source(origin)
+    return getattr(type_expression, "__name__", repr(type_expression))
+
+
+def _is_union(type_expression: Any) -> bool:
+    return get_origin(type_expression) in (Union, types.UnionType)
+
+
+def _origin(type_expression: Any) -> Any:
+    origin = get_origin(type_expression)
+    return origin if origin is not None else type_expression
@@ -0,0 +1,318 @@
+"""Compact set of programs sharing their common subtrees.
+
+A version space is a union of terms, each term being a content applied to a union
+of alternatives for each of its arguments, so that it represents the product
+of these alternatives. Programs added one by one are merged into terms differing
+by a single argument: interchangeable constants or subexpressions only cost
+one more alternative in an argument union instead of a whole program.
+
+Terms of a union never share a program, so that the number of programs,
+the smallest ones and every program can be found without expanding the space.
+
+"""
+
+import heapq
+import itertools
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Optional, Type
+
+from astsynth.program.blanks import Blank, BlankContent
+from astsynth.program.graph import ProgramGraph
+
+if TYPE_CHECKING:
+    from astsynth.dsl import DomainSpecificLanguage
+    from astsynth.namer import ProgramNamer
+    from astsynth.program import GeneratedProgram
+
+
+class _Term(NamedTuple):
+    content: BlankContent
+    arguments: tuple[frozenset["_Term"], ...]
+    """Alternatives of each sub-blank of the content, empty for inputs and constants."""
+
+
+_Union = frozenset[_Term]
+
+ProgramTree = tuple[BlankContent, tuple["ProgramTree", ...]]
+"""A single program as its root content and the trees of its sub-blanks."""
+
+SizedTree = tuple[int, ProgramTree]
+"""Program tree and its number of contents."""
+
+
+class VersionSpace:
+    """Set of programs of the given output type, stored with shared subtrees.
+
+    Root terms are kept in an index by signature, so that adding a program
+    only merges it with the term it differs from by a single argument.
+
+    """
+
+    __slots__ = ("output_type", "_index", "_root")
+
+    def __init__(self, output_type: Type[object] = object) -> None:
+        self.output_type = output_type
+        self._index = _UnionIndex()
+        self._root: Optional[_Union] = frozenset()
+
+    @property
+    def root(self) -> _Union:
+        if self._root is None:
+            self._root = frozenset(self._index.terms)
+        return self._root
+
+    def add(self, graph: ProgramGraph) -> bool:
+        """Add the complete program, return False if it was already in the space."""
+        tree = _graph_tree(graph, graph.root)
+        if self._index.contains(tree):
+            return False
+        self._index.insert(_tree_term(tree))
+        self._root = None
+        return True
+
+    def __contains__(self, graph: ProgramGraph) -> bool:
+        return self._index.contains(_graph_tree(graph, graph.root))
+
+    def count(self) -> int:
+        """Number of programs in the space, without enumerating them."""
+        return _union_count(self.root, {})
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __iter__(self) -> Iterator[ProgramGraph]:
+        """Lazily enumerate every program, in no particular order."""
+        for tree in _union_trees(self.root):
+            yield self._tree_graph(tree)
+
+    def programs(
+        self, dsl: "DomainSpecificLanguage", namer: "ProgramNamer"
+    ) -> Iterator["GeneratedProgram"]:
+        """Lazily write every program of the space."""
+        from astsynth.program.writter import graph_to_program
+
+        for graph in self:
+            yield graph_to_program(graph, namer.name(graph), dsl)
+
+    def smallest(self) -> ProgramGraph:
+        """Program with the fewest contents, raise a ValueError if the space is empty."""
+        smallest = self.top_k(1)
+        if not smallest:
+            raise ValueError("Version space is empty")
+        return smallest[0]
+
+    def top_k(self, k: int) -> list[ProgramGraph]:
+        """The k programs with the fewest contents, from the smallest."""
+        return [
+            self._tree_graph(tree)
+            for _size, tree in _union_k_smallest(self.root, k, {})
+        ]
+
+    def _tree_graph(self, tree: ProgramTree) -> ProgramGraph:
+        graph = ProgramGraph(output_type=self.output_type)
+
+        def _fill(blank: Blank, subtree: ProgramTree) -> None:
+            content, sub_trees = subtree
+            graph.fill_blank(blank, content)
+            if sub_trees:
+                for sub_blank, sub_tree in zip(
+                    graph.sub_blanks(blank, content), sub_trees
+                ):
+                    _fill(sub_blank, sub_tree)
+
+        _fill(graph.root, tree)
+        return graph
+
+
+_Signature = tuple[BlankContent, int, tuple[_Union, ...]]
+"""Content of a term, and all its arguments but the one at the given position."""
+
+
+class _UnionIndex:
+    """Disjoint terms of a union, indexed by their signatures and contents,
+    so that each term inserted is merged with the term differing from it
+    by a single argument without going through the others."""
+
+    __slots__ = ("terms", "by_signature", "by_content")
+
+    def __init__(self) -> None:
+        self.terms: set[_Term] = set()
+        self.by_signature: dict[_Signature, _Term] = {}
+        self.by_content: dict[BlankContent, set[_Term]] = {}
+
+    def insert(self, term: _Term) -> None:
+        pending = [term]
+        while pending:
+            term = pending.pop()
+            signatures = _term_signatures(term)
+            for position, signature in enumerate(signatures):
+                other = self.by_signature.get(signature)
+                if other is None:
+                    continue
+                self._remove(other)
+                arguments = list(term.arguments)
+                arguments[position] = _merged_union(
+                    itertools.chain(other.arguments[position], term.arguments[position])
+                )
+                pending.append(_Term(term.content, tuple(arguments)))
+                break
+            else:
+                self.terms.add(term)
+                self.by_content.setdefault(term.content, set()).add(term)
+                for signature in signatures:
+                    self.by_signature[signature] = term
+
+    def contains(self, tree: ProgramTree) -> bool:
+        content, _sub_trees = tree
+        return any(
+            _term_contains(term, tree) for term in self.by_content.get(content, ())
+        )
+
+    def _remove(self, term: _Term) -> None:
+        self.terms.remove(term)
+        self.by_content[term.content].remove(term)
+        for signature in _term_signatures(term):
+            del self.by_signature[signature]
+
+
+def _term_signatures(term: _Term) -> list[_Signature]:
+    return [
+        (
+            term.content,
+            position,
+            term.arguments[:position] + term.arguments[position + 1 :],
+        )
+        for position in range(len(term.arguments))
+    ]
+
+
+def _merged_union(terms: Iterable[_Term]) -> _Union:
+    """Union of disjoint terms, merging terms differing by a single argument."""
+    index = _UnionIndex()
+    for term in terms:
+        index.insert(term)
+    return frozenset(index.terms)
+
+
+def _union_count(union: _Union, counts: dict[_Union, int]) -> int:
+    count = counts.get(union)
+    if count is None:
+        count = sum(
+            _product(_union_count(argument, counts) for argument in term.arguments)
+            for term in union
+        )
+        counts[union] = count
+    return count
+
+
+def _union_k_smallest(
+    union: _Union, k: int, k_smallest_by_union: dict[_Union, list[SizedTree]]
+) -> list[SizedTree]:
+    k_smallest = k_smallest_by_union.get(union)
+    if k_smallest is None:
+        k_smallest = heapq.nsmallest(
+            k,
+            itertools.chain.from_iterable(
+                _term_k_smallest(term, k, k_smallest_by_union) for term in union
+            ),
+            key=lambda sized_tree: sized_tree[0],
+        )
+        k_smallest_by_union[union] = k_smallest
+    return k_smallest
+
+
+def _term_k_smallest(
+    term: _Term, k: int, k_smallest_by_union: dict[_Union, list[SizedTree]]
+) -> list[SizedTree]:
+    """Smallest combinations of the smallest alternatives of each argument,
+    expanded from the smallest one by increasing one index at a time."""
+    alternatives = [
+        _union_k_smallest(argument, k, k_smallest_by_union)
+        for argument in term.arguments
+    ]
+
+    def _sized_tree(indexes: tuple[int, ...]) -> SizedTree:
+        chosen = [
+            argument_alternatives[index]
+            for argument_alternatives, index in zip(alternatives, indexes)
+        ]
+        return (
+            1 + sum(size for size, _tree in chosen),
+            (term.content, tuple(tree for _size, tree in chosen)),
+        )
+
+    first = tuple(0 for _ in alternatives)
+    heap = [(_sized_tree(first)[0], first)]
+    seen = {first}
+    k_smallest: list[SizedTree] = []
+    while heap and len(k_smallest) < k:
+        _size, indexes = heapq.heappop(heap)
+        k_smallest.append(_sized_tree(indexes))
+        for position, argument_alternatives in enumerate(alternatives):
+            if indexes[position] + 1 >= len(argument_alternatives):
+                continue
+            next_indexes = (
+                indexes[:position] + (indexes[position] + 1,) + indexes[position + 1 :]
+            )
+            if next_indexes in seen:
+                continue
+            seen.add(next_indexes)
+            heapq.heappush(heap, (_sized_tree(next_indexes)[0], next_indexes))
+    return k_smallest
+
+
+def _graph_tree(graph: ProgramGraph, blank: Blank) -> ProgramTree:
+    content = graph.content(blank)
+    if content is None:
+        raise ValueError("Only complete programs can be added to a version space")
+    if content.kind in ("input", "constant"):
+        return (content, ())
+    return (
+        content,
+        tuple(
+            _graph_tree(graph, sub_blank)
+            for sub_blank in graph.sub_blanks(blank, content)
+        ),
+    )
+
+
+def _tree_term(tree: ProgramTree) -> _Term:
+    content, sub_trees = tree
+    return _Term(
+        content, tuple(frozenset([_tree_term(sub_tree)]) for sub_tree in sub_trees)
+    )
+
+
+def _union_contains(union: _Union, tree: ProgramTree) -> bool:
+    return any(_term_contains(term, tree) for term in union)
+
+
+def _term_contains(term: _Term, tree: ProgramTree) -> bool:
+    content, sub_trees = tree
+    return term.content == content and all(
+        _union_contains(argument, sub_tree)
+        for argument, sub_tree in zip(term.arguments, sub_trees)
+    )
+
+
+def _union_trees(union: _Union) -> Iterator[ProgramTree]:
+    for term in union:
+        for sub_trees in _arguments_trees(term.arguments):
+            yield (term.content, sub_trees)
+
+
+def _arguments_trees(
+    arguments: tuple[_Union, ...],
+) -> Iterator[tuple[ProgramTree, ...]]:
+    if not arguments:
+        yield ()
+        return
+    for first_tree in _union_trees(arguments[0]):
+        for other_trees in _arguments_trees(arguments[1:]):
+            yield (first_tree,) + other_trees
+
+
+def _product(counts: Iterable[int]) -> int:
+    product = 1
+    for count in counts:
+        product *= count
+    return product
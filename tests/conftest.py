@@ -9,3 +9,19 @@ def function_ast_from_source_lines(source_lines: list[str]) -> ast.Module:
 
 def to_source_list(asts: list[ast.Module]) -> list[str]:
     return [astor.to_source(tree) for tree in asts]
+
+
+STRING_DSL_SOURCE = "\n".join(
+    [
+        "TWO = 2",
+        "THREE = 3",
+        'DASH = "-"',
+        "",
+        "def repeat(string: str, times: int) -> str:",
+        "    return string * times",
+        "",
+        "def concat(string: str, other_string: str) -> str:",
+        "    return string + other_string",
+    ]
+)
+"""Small string DSL shared by search tests, solving tasks such as s * 3 + "-"."""
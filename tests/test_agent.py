@@ -0,0 +1,112 @@
+from astsynth.agent import (
+    Candidates,
+    EmptySubBlanks,
+    FillBlanks,
+    JumpToFrontiere,
+    Stop,
+    SynthesisAgent,
+    TopDownBFS,
+)
+from astsynth.dsl import DomainSpecificLanguage
+from astsynth.generator import ProgramGenerator
+from astsynth.program.blanks import Blank, Constant, Input, Operation
+from astsynth.program.graph import ProgramGraph
+
+
+class TestCandidates:
+    def test_candidates_are_indexed_by_kind_and_blanks(self):
+        blank_a = Blank(id="a", type=int)
+        blank_b = Blank(id="b", type=int)
+        two = Constant(name="TWO", value=2)
+        number = Input(name="number", type=int)
+
+        fill_a_two = FillBlanks(blanks_contents=((blank_a, two),))
+        fill_a_number = FillBlanks(blanks_contents=((blank_a, number),))
+        fill_b_two = FillBlanks(blanks_contents=((blank_b, two),))
+        empty_a = EmptySubBlanks(blanks=(blank_a,))
+        jump = JumpToFrontiere(config=())
+        stop = Stop()
+
+        candidates = Candidates(
+            [fill_a_two, empty_a, fill_a_number, jump, fill_b_two, stop]
+        )
+
+        assert list(candidates) == [
+            fill_a_two,
+            empty_a,
+            fill_a_number,
+            jump,
+            fill_b_two,
+            stop,
+        ]
+        assert len(candidates) == 6
+        assert candidates[1] == empty_a
+        assert candidates.constant_fill_blanks_by_blanks == {
+            (blank_a,): [fill_a_two, fill_a_number],
+            (blank_b,): [fill_b_two],
+        }
+        assert candidates.empty_sub_blanks_by_blanks == {(blank_a,): 0}
+        assert candidates.jumps_to_frontiere == [jump]
+        assert candidates.stop == stop
+
+        agent = TopDownBFS()
+        graph = ProgramGraph(output_type=int)
+        assert agent.act(candidates, graph) == fill_a_two
+        assert agent.blanks_with_other_constants == {(blank_a,)}
+        assert agent.act(Candidates([fill_b_two, empty_a, stop]), graph) == fill_b_two
+        assert agent.act(Candidates([empty_a, stop]), graph) == empty_a
+        assert agent.blanks_with_other_constants == set()
+
+
+class TestBatchedActions:
+    def test_top_down_bfs_batches_constant_fills(self):
+        graph = ProgramGraph(output_type=int)
+        two = Constant(name="TWO", value=2)
+        number = Input(name="number", type=int)
+        fill_two = FillBlanks(blanks_contents=((graph.root, two),))
+        fill_number = FillBlanks(blanks_contents=((graph.root, number),))
+        stop = Stop()
+
+        agent = TopDownBFS()
+        assert agent.act_batch(Candidates([fill_two, fill_number, stop]), graph) == [
+            fill_two,
+            fill_number,
+        ]
+        assert agent.blanks_with_other_constants == set()
+        assert agent.act_batch(Candidates([fill_two, stop]), graph) == [fill_two]
+
+    def test_batches_give_same_programs_as_single_actions(self):
+        dsl = DomainSpecificLanguage(
+            inputs=[Input(name="number", type=int)],
+            constants=[
+                Constant(name="ONE", value=1),
+                Constant(name="TWO", value=2),
+            ],
+            operations=[Operation.from_func(add), Operation.from_func(neg)],
+        )
+
+        batched = ProgramGenerator(dsl=dsl, output_type=int, agent=TopDownBFS())
+        single = ProgramGenerator(dsl=dsl, output_type=int, agent=SingleTopDownBFS())
+
+        batched_programs = [
+            graph.hashable_config for graph in batched.enumerate(max_depth=2)
+        ]
+        single_programs = [
+            graph.hashable_config for graph in single.enumerate(max_depth=2)
+        ]
+        assert len(batched_programs) == len(set(batched_programs)) == 103
+        assert batched_programs == single_programs
+
+
+class SingleTopDownBFS(TopDownBFS):
+    """Top down enumeration taking the default batches of single actions."""
+
+    act_batch = SynthesisAgent.act_batch
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def neg(a: int) -> int:
+    return -a
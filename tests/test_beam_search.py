@@ -0,0 +1,63 @@
+from collections import Counter
+
+import pytest
+
+from astsynth.enumeration import BeamSearch
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.partial_evaluation import ExamplesAgreementScore
+from astsynth.program.blanks import Input
+from astsynth.program.graph import ProgramGraph
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+
+class TestBeamSearch:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        self.dsl.inputs.append(Input(name="s", type=str))
+        self.task = Task.from_tuples([({"s": "ab"}, "ababab-"), ({"s": "c"}, "ccc-")])
+
+    def test_wide_beam_enumerates_every_program(self):
+        agent = BeamSearch(beam_width=1000)
+        generator = ProgramGenerator(dsl=self.dsl, output_type=str, agent=agent)
+        configs = [graph.hashable_config for graph in generator.enumerate(max_depth=2)]
+        assert len(configs) == len(set(configs)) == 122
+        assert agent.n_discarded_states == 0
+
+    def test_beam_keeps_bounded_number_of_states(self):
+        scored_depths: list[int] = []
+
+        def _count_depth(graph: ProgramGraph) -> float:
+            scored_depths.append(max(graph.depth(blank) for blank in graph.blanks))
+            return -graph.number_of_nodes()
+
+        agent = BeamSearch(beam_width=3, score=_count_depth)
+        generator = ProgramGenerator(dsl=self.dsl, output_type=str, agent=agent)
+        n_programs = len(list(generator.enumerate(max_depth=3)))
+
+        n_scored_by_depth = Counter(scored_depths)
+        assert sorted(n_scored_by_depth) == [1, 2, 3]
+        assert agent.n_discarded_states == sum(
+            n_scored - 3 for n_scored in n_scored_by_depth.values() if n_scored > 3
+        )
+        assert n_programs < 122
+
+    def test_examples_agreement_guides_search(self):
+        smallest_result = Synthesizer(
+            self.dsl, self.task, agent=BeamSearch(beam_width=8)
+        ).run(max_depth=3, max_solutions=1)
+        assert smallest_result.stats.n_successful_programs == 0
+
+        guided_result = Synthesizer(
+            self.dsl,
+            self.task,
+            agent=BeamSearch(
+                beam_width=8, score=ExamplesAgreementScore(self.dsl, self.task)
+            ),
+        ).run(max_depth=3, max_solutions=1)
+        assert guided_result.stats.n_successful_programs == 1
+        assert guided_result.stats.n_discarded_states == 48
+        assert "return concat(x0, DASH)" in guided_result.successful_programs[0].source
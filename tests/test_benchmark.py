@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from astsynth.benchmark import (
+    BENCHMARK_TASKS,
+    BenchmarkTask,
+    BenchmarkReport,
+    benchmark_cases,
+    benchmark_dsl,
+    find_regressions,
+    main,
+    run_suite,
+)
+from astsynth.synthesizer import Synthesizer
+
+
+class TestBenchmark:
+    def test_cases_only_reach_planted_solution_depth(self):
+        cases = benchmark_cases(max_depths=(1, 2), examples_counts=(5,))
+        assert {case.task.solution_depth for case in cases} == {1, 2}
+        assert all(case.max_depth >= case.task.solution_depth for case in cases)
+
+    @pytest.mark.parametrize(
+        "benchmark_task",
+        [
+            pytest.param(
+                task,
+                id=task.name,
+                marks=[pytest.mark.slow] if task.solution_depth > 2 else [],
+            )
+            for task in BENCHMARK_TASKS
+        ],
+    )
+    def test_tasks_are_solved_at_their_solution_depth(
+        self, benchmark_task: BenchmarkTask
+    ):
+        task = benchmark_task.task(n_examples=5)
+        dsl = benchmark_dsl(benchmark_task.dsl, task)
+        synthesizer = Synthesizer(dsl=dsl, task=task)
+        solutions = synthesizer.run_iter(max_depth=benchmark_task.solution_depth)
+        assert next(iter(solutions), None) is not None
+
+    def test_suite_finds_planted_solutions(self):
+        cases = benchmark_cases(
+            tasks=[task for task in BENCHMARK_TASKS if task.solution_depth == 1],
+            max_depths=(1,),
+            examples_counts=(5,),
+            operation_copies=(0, 1),
+        )
+        report = run_suite(cases)
+        assert len(report.results) == 6
+        for result in report.results:
+            assert result.time_to_first_solution is not None
+            assert result.n_programs > 0
+            assert result.peak_memory > 0
+        n_programs_by_copies = {
+            result.n_operations: result.n_programs
+            for result in report.results
+            if result.task == "string_repeat"
+        }
+        assert n_programs_by_copies == {2: 4, 4: 7}
+
+    def test_regressions_are_reported(self):
+        cases = benchmark_cases(
+            tasks=BENCHMARK_TASKS[:1], max_depths=(1,), examples_counts=(5,)
+        )
+        baseline = run_suite(cases[:1])
+        slower = baseline.model_copy(deep=True)
+        slower.results[0].enumeration_rate = baseline.results[0].enumeration_rate / 2
+        slower.results[0].n_programs += 1
+        assert find_regressions(baseline, baseline) == []
+        regressions = find_regressions(baseline, slower)
+        assert len(regressions) == 2
+        assert "enumeration_rate" in regressions[0]
+
+        worse = baseline.model_copy(deep=True)
+        worse.results[0].peak_memory = 2 * baseline.results[0].peak_memory
+        worse.results[0].time_to_first_solution = None
+        new_case = baseline.results[0].model_copy(update={"max_depth": 2})
+        worse.results.append(new_case)
+        regressions = find_regressions(baseline, worse)
+        assert len(regressions) == 2
+        assert "peak_memory" in regressions[0]
+        assert "no solution found anymore" in regressions[1]
+
+    def test_command_writes_report(self, tmp_path: Path):
+        output_path = tmp_path / "report.json"
+        exit_code = main(
+            [
+                "--output",
+                str(output_path),
+                "--dsls",
+                "string",
+                "--max-depths",
+                "1",
+                "--examples-counts",
+                "5",
+                "--operation-copies",
+                "0",
+            ]
+        )
+        assert exit_code == 0
+        report = BenchmarkReport.model_validate(json.loads(output_path.read_text()))
+        assert [result.task for result in report.results] == ["string_repeat"]
+
+        baseline_path = tmp_path / "baseline.json"
+        for result in report.results:
+            result.enumeration_rate *= 1e9
+        baseline_path.write_text(report.model_dump_json())
+        output_path.unlink()
+        exit_code = main(
+            [
+                "--output",
+                str(output_path),
+                "--baseline",
+                str(baseline_path),
+                "--dsls",
+                "string",
+                "--max-depths",
+                "1",
+                "--examples-counts",
+                "5",
+                "--operation-copies",
+                "0",
+            ]
+        )
+        assert exit_code == 1
+        assert output_path.exists()
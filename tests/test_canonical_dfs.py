@@ -0,0 +1,54 @@
+import itertools
+import tracemalloc
+
+import pytest
+
+from astsynth.enumeration import BeamSearch, CanonicalDFS
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.program.blanks import Input
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+
+class TestCanonicalDFS:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        self.dsl.inputs.append(Input(name="s", type=str))
+
+    def test_enumerates_every_program_once(self):
+        generator = ProgramGenerator(
+            dsl=self.dsl, output_type=str, agent=CanonicalDFS()
+        )
+        configs = [graph.hashable_config for graph in generator.enumerate(max_depth=2)]
+        assert len(configs) == len(set(configs)) == 122
+
+        beam_generator = ProgramGenerator(
+            dsl=self.dsl, output_type=str, agent=BeamSearch(beam_width=1000)
+        )
+        assert set(configs) == {
+            graph.hashable_config for graph in beam_generator.enumerate(max_depth=2)
+        }
+
+    def test_memory_does_not_grow_with_enumerated_programs(self):
+        generator = ProgramGenerator(
+            dsl=self.dsl, output_type=str, agent=CanonicalDFS()
+        )
+        tracemalloc.start()
+        try:
+            for _graph in itertools.islice(generator.enumerate(max_depth=4), 2000):
+                pass
+            _current, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak_memory < 500_000
+
+    def test_finds_solution(self):
+        task = Task.from_tuples([({"s": "ab"}, "ababab-"), ({"s": "c"}, "ccc-")])
+        result = Synthesizer(self.dsl, task, agent=CanonicalDFS()).run(
+            max_depth=2, max_solutions=1
+        )
+        assert result.stats.n_successful_programs == 1
+        assert "return concat(x0, DASH)" in result.successful_programs[0].source
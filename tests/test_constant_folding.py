@@ -0,0 +1,211 @@
+import pytest
+
+from astsynth.agent import TopDownBFS
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.program.blanks import IfBranching, Input
+from astsynth.program.writter import graph_to_program
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+
+ARITHMETIC_DSL_SOURCE = "\n".join(
+    [
+        "TWO = 2",
+        "THREE = 3",
+        "",
+        "def add(x: int, y: int) -> int:",
+        "    return x + y",
+    ]
+)
+
+
+class TestConstantFolding:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = _arithmetic_dsl()
+
+    def test_fold_constants_dedup_by_value(self):
+        derived = self.dsl.add_folded_constants(max_depth=2)
+        assert [(c.name, c.value, c.expression) for c in derived] == [
+            ("ADD_TWO_TWO", 4, "add(TWO, TWO)"),
+            ("ADD_TWO_THREE", 5, "add(TWO, THREE)"),
+            ("ADD_THREE_THREE", 6, "add(THREE, THREE)"),
+            ("ADD_TWO_ADD_TWO_THREE", 7, "add(TWO, add(TWO, THREE))"),
+            ("ADD_TWO_ADD_THREE_THREE", 8, "add(TWO, add(THREE, THREE))"),
+            ("ADD_THREE_ADD_THREE_THREE", 9, "add(THREE, add(THREE, THREE))"),
+            (
+                "ADD_ADD_TWO_TWO_ADD_THREE_THREE",
+                10,
+                "add(add(TWO, TWO), add(THREE, THREE))",
+            ),
+            (
+                "ADD_ADD_TWO_THREE_ADD_THREE_THREE",
+                11,
+                "add(add(TWO, THREE), add(THREE, THREE))",
+            ),
+            (
+                "ADD_ADD_THREE_THREE_ADD_THREE_THREE",
+                12,
+                "add(add(THREE, THREE), add(THREE, THREE))",
+            ),
+        ]
+        assert self.dsl.folded_constants_depth == 2
+
+    def test_fold_constants_stops_at_max_derived_constants(self):
+        derived = self.dsl.add_folded_constants(max_depth=2, max_derived_constants=4)
+        assert len(derived) == 4
+        assert self.dsl.folded_constants_depth == 1
+
+    def test_fold_constants_drops_raising_expressions(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "ZERO = 0",
+                    "",
+                    "def inverse(x: int) -> float:",
+                    "    return 1 / x",
+                ]
+            )
+        )
+        assert dsl.add_folded_constants(max_depth=2) == []
+
+    def test_expressions_folded_with_dsl_imports_are_still_solutions(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "import math",
+                    "",
+                    "NINE = 9",
+                    "",
+                    "def root(a: int) -> int:",
+                    "    return int(math.sqrt(a))",
+                ]
+            )
+        )
+        task = Task.from_tuples([({"x": 1}, 3), ({"x": 2}, 3)])
+        dsl.add_task_inputs(task)
+        derived = dsl.add_folded_constants(max_depth=1)
+        assert [(c.name, c.value) for c in derived] == [("ROOT_NINE", 3)]
+        result = Synthesizer(dsl=dsl, task=task).run(max_depth=1)
+        assert result.stats.n_successful_programs > 0
+
+    def test_expressions_without_folded_value_are_still_generated(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "ONE = 1",
+                    "",
+                    "def rotate(x: int) -> complex:",
+                    "    return complex(0, x)",
+                ]
+            )
+        )
+        assert dsl.add_folded_constants(max_depth=1) == []
+        generator = ProgramGenerator(dsl=dsl, output_type=complex, agent=TopDownBFS())
+        assert len(list(generator.enumerate(max_depth=1))) == 1
+
+    def test_constants_filling_branches_are_not_pruned(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    'EVEN = "even"',
+                    "",
+                    "def shout(s: str) -> str:",
+                    "    return s.upper()",
+                    "",
+                    "def is_even(number: int) -> bool:",
+                    "    return number % 2 == 0",
+                ]
+            )
+        )
+        dsl.add_task_inputs(Task.from_tuples([({"number": 1}, "odd")]))
+        assert [c.name for c in dsl.add_folded_constants(max_depth=1)] == ["SHOUT_EVEN"]
+        generator = ProgramGenerator(
+            dsl=dsl,
+            standard_operations=[IfBranching()],
+            output_type=str,
+            agent=TopDownBFS(),
+        )
+        sources = [
+            graph_to_program(graph, "branching", dsl).source
+            for graph in generator.enumerate(max_depth=2)
+        ]
+        assert any("    if x0:\n        return EVEN" in source for source in sources)
+
+    def test_fold_constants_reports_environment_failures(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "ONE = 1",
+                    "",
+                    "def broken(x: int) -> int:",
+                    "    return undefined_name + x",
+                ]
+            )
+        )
+        with pytest.raises(NameError):
+            dsl.add_folded_constants(max_depth=1)
+
+    def test_fold_constants_names_are_unique(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join([ARITHMETIC_DSL_SOURCE, "ADD_TWO_TWO = 40"])
+        )
+        derived = dsl.add_folded_constants(max_depth=1)
+        assert (derived[0].name, derived[0].value) == ("ADD_TWO_TWO_1", 4)
+
+    def test_impure_operations_of_constants_are_still_generated(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "from astsynth.dsl import operation",
+                    ARITHMETIC_DSL_SOURCE,
+                    "",
+                    "@operation(pure=False)",
+                    "def noisy_add(x: int, y: int) -> int:",
+                    "    return x + y",
+                ]
+            )
+        )
+        dsl.add_folded_constants(max_depth=1)
+        generator = ProgramGenerator(dsl=dsl, output_type=int, agent=TopDownBFS())
+        returns = [
+            graph_to_program(graph, "generated_func", dsl).source.splitlines()[-1]
+            for graph in generator.enumerate(max_depth=2)
+        ]
+        assert "    return noisy_add(TWO, THREE)" in returns
+        assert "    return add(TWO, THREE)" not in returns
+
+    def test_folding_shrinks_search_and_renders_provenance(self):
+        task = Task.from_tuples([({"n": 1}, 6), ({"n": 2}, 7)])
+        unfolded = Synthesizer(dsl=_arithmetic_dsl(), task=task).run(max_depth=2)
+
+        # Folded constants stand for subexpressions of depth 1 in depth 0 leaves.
+        self.dsl.add_folded_constants(max_depth=1)
+        folded = Synthesizer(dsl=self.dsl, task=task).run(max_depth=1)
+
+        assert folded.stats.n_generated_programs < unfolded.stats.n_generated_programs
+        smallest_program = min(folded.successful_programs, key=len)
+        assert smallest_program.source == "\n".join(
+            [
+                "THREE = 3",
+                "TWO = 2",
+                "",
+                "",
+                "def add(x: int, y: int) ->int:",
+                "    return x + y",
+                "",
+                "",
+                "ADD_TWO_THREE = add(TWO, THREE)",
+                "",
+                "",
+                "def generated_func(n: int):",
+                "    return add(n, ADD_TWO_THREE)",
+                "",
+            ]
+        )
+
+
+def _arithmetic_dsl() -> DomainSpecificLanguage:
+    dsl = load_symbols_from_python_source(ARITHMETIC_DSL_SOURCE)
+    dsl.inputs.append(Input(name="n", type=int))
+    return dsl
@@ -1,10 +1,16 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import pytest
+from pytest_mock import MockerFixture
 
+import astsynth.dsl_cache
 from astsynth.program.blanks import Operation, Constant
-from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.dsl import (
+    DomainSpecificLanguage,
+    load_symbols_from_python_file,
+    load_symbols_from_python_source,
+)
 
 
 class TestDSL:
@@ -49,6 +55,73 @@ class TestDSL:
             [Operation.from_func(repeat), Operation.from_func(concat)]
         )
 
+    def test_load_dsl_from_cached_artifact(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        dsl_source = "\n".join(
+            (
+                "TWO = 2",
+                "",
+                "def repeat(string: str, times: int) -> str:",
+                "    return string * times",
+                "",
+            )
+        )
+
+        def repeat(string: str, times: int) -> str:
+            return string * times
+
+        dsl_path = tmp_path / "dsl.py"
+        cache_dir = tmp_path / "cache"
+        self.fixture.given_python_file(at=dsl_path, content=dsl_source)
+        self.fixture.when_loading_from_python_file(dsl_path, cache_dir=cache_dir)
+        assert len(list(cache_dir.iterdir())) == 1
+
+        load_spy = mocker.spy(astsynth.dsl_cache, "load_symbols_from_python_source")
+        self.fixture.dsl = DomainSpecificLanguage()
+        self.fixture.when_loading_from_python_file(dsl_path, cache_dir=cache_dir)
+        load_spy.assert_not_called()
+        self.fixture.then_constants_should_be({"TWO": 2})
+        self.fixture.then_operations_should_be([Operation.from_func(repeat)])
+
+    def test_cached_artifact_types_can_be_dsl_classes(self, tmp_path: Path) -> None:
+        dsl_source = "\n".join(
+            (
+                "from typing import Optional",
+                "",
+                "class Point:",
+                "    def __init__(self, x: int) -> None:",
+                "        self.x = x",
+                "",
+                "def point_x(point: 'Point') -> Optional[int]:",
+                "    return point.x",
+                "",
+            )
+        )
+        dsl_path = tmp_path / "dsl.py"
+        cache_dir = tmp_path / "cache"
+        self.fixture.given_python_file(at=dsl_path, content=dsl_source)
+        for _ in range(2):
+            self.fixture.dsl = DomainSpecificLanguage()
+            self.fixture.when_loading_from_python_file(dsl_path, cache_dir=cache_dir)
+            (point_x,) = self.fixture.dsl.operations
+            assert point_x.inputs_types["point"].__name__ == "Point"
+            assert point_x.output_type == Optional[int]
+        assert len(list(cache_dir.iterdir())) == 1
+
+    def test_failed_artifact_writes_leave_no_file(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        dsl_path = tmp_path / "dsl.py"
+        cache_dir = tmp_path / "cache"
+        self.fixture.given_python_file(at=dsl_path, content="TWO = 2\n")
+        mocker.patch.object(
+            astsynth.dsl_cache.pickle, "dump", side_effect=OSError("Disk full")
+        )
+        with pytest.raises(OSError, match="Disk full"):
+            self.fixture.when_loading_from_python_file(dsl_path, cache_dir=cache_dir)
+        assert list(cache_dir.iterdir()) == []
+
 
 @pytest.fixture
 def generation_fixture() -> "DSLFixture":
@@ -63,7 +136,12 @@ class DSLFixture:
         with open(at, mode="w") as pyfile:
             pyfile.write(content)
 
-    def when_loading_from_python_file(self, file_path: Path) -> None:
+    def when_loading_from_python_file(
+        self, file_path: Path, cache_dir: Optional[Path] = None
+    ) -> None:
+        if cache_dir is not None:
+            self.dsl.augment(load_symbols_from_python_file(file_path, cache_dir))
+            return
         with open(file_path) as pyfile:
             py_src = pyfile.read()
         self.dsl.augment(load_symbols_from_python_source(py_src))
@@ -1,11 +1,20 @@
-from typing import Any, Optional
+import ast
+import json
+from pathlib import Path
+from typing import Any, Iterator, Optional
 
 import pytest
 
 
 from astsynth.program import GeneratedProgram
 from astsynth.task import Task
-from astsynth.program.evaluate import evaluate_program_on_task
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.program.evaluate import (
+    Evaluator,
+    evaluate_program_on_task,
+    operations_functions,
+)
+from astsynth.streamed_task import StreamedTask
 
 
 class TestSynthesizer:
@@ -92,6 +101,262 @@ class TestSynthesizer:
             ["prog_3txp2", "prog_xpxpxp2"]
         )
 
+    def test_evaluation_does_not_render_source(self):
+        module = ast.parse(
+            "\n".join(
+                [
+                    "def prog_double(number: int):",
+                    "    return number + number",
+                ]
+            )
+        )
+        program = GeneratedProgram(name="prog_double", module=module)
+        self.fixture.given_generated_programs([program])
+        self.fixture.given_IO_examples([({"number": 1}, 2), ({"number": 2}, 4)])
+        self.fixture.when_evaluating_generated_programs()
+        self.fixture.then_successful_programs_names_should_be(["prog_double"])
+        assert not program.rendered
+        assert program.source.startswith("def prog_double(number: int):")
+        assert program.rendered
+
+
+METADATA_DSL_SOURCE = "\n".join(
+    [
+        "from astsynth.dsl import operation",
+        "",
+        "@operation(cost=100.0)",
+        "def slow_double(x: int) -> int:",
+        "    return 2 * x",
+        "",
+        "@operation(can_raise=True)",
+        "def inverse(x: int) -> float:",
+        "    return 1 / x",
+        "",
+        "@operation(vectorizable=True)",
+        "def vec_add(x: int, y: int) -> int:",
+        "    return [a + b for a, b in zip(x, y)]",
+        "",
+        "@operation(pure=False, cost=100.0)",
+        "def noisy(x: int) -> int:",
+        "    return x",
+    ]
+)
+
+
+class TestEvaluator:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(METADATA_DSL_SOURCE)
+        self.evaluator = Evaluator(self.dsl)
+
+    def _program(self, name: str, body: list[str]) -> GeneratedProgram:
+        sources = [
+            _function_def_source(op.source)
+            for op in self.dsl.operations
+            if op.name in "\n".join(body)
+        ]
+        return GeneratedProgram(
+            name=name,
+            source="\n".join(sources + [f"def {name}(x: int):"] + body),
+        )
+
+    def test_metadata_is_loaded(self):
+        assert [
+            (op.name, op.pure, op.cost, op.can_raise, op.vectorizable)
+            for op in self.dsl.operations
+        ] == [
+            ("slow_double", True, 100.0, False, False),
+            ("inverse", True, 1.0, True, False),
+            ("vec_add", True, 1.0, False, True),
+            ("noisy", False, 100.0, False, False),
+        ]
+
+    def test_pure_expensive_operations_are_memoized(self):
+        task = Task.from_tuples([({"x": 1}, 4), ({"x": 2}, 8)])
+        program = self._program(
+            "prog", ["    y = slow_double(x)", "    return slow_double(y)"]
+        )
+        assert self.evaluator.program_succeeds_on_task(program, task)
+        assert len(self.evaluator._memoized_calls) == 3
+
+        impure_program = self._program("impure", ["    return noisy(x)"])
+        self.evaluator.program_succeeds_on_task(impure_program, task)
+        assert len(self.evaluator._memoized_calls) == 3
+
+    def test_memoized_calls_are_bounded(self):
+        evaluator = Evaluator(self.dsl, max_memoized_calls=2)
+        task = Task.from_tuples([({"x": 1}, 4), ({"x": 2}, 8)])
+        program = self._program(
+            "prog", ["    y = slow_double(x)", "    return slow_double(y)"]
+        )
+        assert evaluator.program_succeeds_on_task(program, task)
+        assert len(evaluator._memoized_calls) == 1
+
+    def test_raising_operations_count_as_failures(self):
+        task = Task.from_tuples([({"x": 0}, 1.0), ({"x": 1}, 1.0)])
+        program = self._program("prog", ["    return inverse(x)"])
+        assert not self.evaluator.program_succeeds_on_task(program, task)
+
+    def test_vectorizable_operations_run_on_columns(self):
+        task = Task.from_tuples([({"x": 1}, 2), ({"x": 2}, 4)])
+        program = self._program("prog", ["    return vec_add(x, x)"])
+        compiled = self.evaluator.compile(program)
+        assert compiled.vectorized
+        assert self.evaluator.succeeds_on_task(compiled, task)
+
+    def test_raising_vectorized_operations_count_as_failures(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "from astsynth.dsl import operation",
+                    "",
+                    "@operation(vectorizable=True, can_raise=True)",
+                    "def vec_inverse(x: int) -> float:",
+                    "    return [1 / a for a in x]",
+                ]
+            )
+        )
+        program = GeneratedProgram(
+            name="prog",
+            source="\n".join(
+                [
+                    _function_def_source(dsl.operations[0].source),
+                    "",
+                    "def prog(x: int):",
+                    "    return vec_inverse(x)",
+                ]
+            ),
+        )
+        task = Task.from_tuples([({"x": 0}, 1.0), ({"x": 1}, 1.0)])
+        evaluator = Evaluator(dsl)
+        assert evaluator.compile(program).vectorized
+        assert not evaluator.program_succeeds_on_task(program, task)
+
+    def test_vectorized_columns_are_cached_by_task_content(self):
+        program = self._program("prog", ["    return vec_add(x, x)"])
+        compiled = self.evaluator.compile(program)
+        for _ in range(2):
+            task = Task.from_tuples([({"x": 1}, 2), ({"x": 2}, 4)])
+            assert self.evaluator.succeeds_on_task(compiled, task)
+        assert len(self.evaluator._tasks_columns) == 1
+
+    def test_vectorized_streamed_tasks_are_read_by_batches(self, tmp_path: Path):
+        path = tmp_path / "examples.jsonl"
+        path.write_text(
+            "\n".join(
+                json.dumps({"input": {"x": x}, "output": 2 * x}) for x in range(5)
+            )
+        )
+        evaluator = Evaluator(self.dsl, streamed_batch_size=2)
+        compiled = evaluator.compile(
+            self._program("prog", ["    return vec_add(x, x)"])
+        )
+        wrong = evaluator.compile(
+            self._program("wrong", ["    return vec_add(x, vec_add(x, x))"])
+        )
+        with StreamedTask.from_jsonl(path) as task:
+            assert evaluator.succeeds_on_task(compiled, task)
+            assert not evaluator.succeeds_on_task(wrong, task)
+        assert evaluator._tasks_columns == {}
+
+    def test_vectorized_examples_providers_are_read_at_once(self):
+        compiled = self.evaluator.compile(
+            self._program("prog", ["    return vec_add(x, x)"])
+        )
+        task = _ExamplesList([({"x": 1}, 2), ({"x": 2}, 4)])
+        assert self.evaluator.succeeds_on_task(compiled, task)
+        assert self.evaluator._tasks_columns == {}
+
+    def test_calls_without_stable_digest_are_not_memoized(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "from astsynth.dsl import operation",
+                    "",
+                    "@operation(cost=100.0)",
+                    "def unbox(box: object) -> int:",
+                    "    return box.value",
+                ]
+            )
+        )
+        evaluator = Evaluator(dsl)
+        program = GeneratedProgram(
+            name="prog",
+            source="\n".join(
+                [
+                    "class Box:",
+                    "    def __init__(self, value):",
+                    "        self.value = value",
+                    "",
+                    _function_def_source(dsl.operations[0].source),
+                    "",
+                    "def prog(n: int):",
+                    "    return unbox(Box(n))",
+                ]
+            ),
+        )
+        task = Task.from_tuples([({"n": n}, n) for n in range(6)])
+        assert evaluator.program_succeeds_on_task(program, task)
+        assert evaluator._memoized_calls == {}
+
+    def test_operations_share_the_dsl_namespace(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "import math",
+                    "from typing import Optional",
+                    "",
+                    "NINE = 9",
+                    "",
+                    "def root(a: int) -> Optional[int]:",
+                    "    return int(math.sqrt(a))",
+                    "",
+                    "def root_of_nine() -> Optional[int]:",
+                    "    return root(NINE)",
+                ]
+            )
+        )
+        functions = operations_functions(dsl)
+        assert functions["root"](16) == 4
+        assert functions["root_of_nine"]() == 3
+        assert list(operations_functions(dsl, dsl.operations[:1])) == ["root"]
+
+    def test_schedule_cheapest_first(self):
+        expensive = self._program("expensive", ["    return slow_double(x)"])
+        cheap = self._program("cheap", ["    return inverse(x)"])
+        assert [p.name for p in self.evaluator.schedule([expensive, cheap])] == [
+            "cheap",
+            "expensive",
+        ]
+
+    def test_cost_counts_every_call(self):
+        twice = self._program(
+            "twice", ["    y = slow_double(x)", "    return slow_double(y)"]
+        )
+        once = self._program("once", ["    return noisy(x)"])
+        assert self.evaluator.compile(twice).cost == 200.0
+        assert [p.name for p in self.evaluator.schedule([twice, once])] == [
+            "once",
+            "twice",
+        ]
+
+
+class _ExamplesList:
+    input_types = {"x": int}
+    output_type = int
+
+    def __init__(self, examples: list[tuple[dict[str, Any], Any]]) -> None:
+        self.examples = examples
+
+    def iter_examples(self) -> Iterator[tuple[dict[str, Any], Any]]:
+        return iter(self.examples)
+
+
+def _function_def_source(operation_source: str) -> str:
+    return "\n".join(
+        line for line in operation_source.splitlines() if not line.startswith("@")
+    )
+
 
 @pytest.fixture
 def eval_fixture() -> "EvalFixture":
@@ -0,0 +1,220 @@
+import math
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from astsynth.agent import (
+    Candidates,
+    JumpToFrontiere,
+    Stop,
+    SynthesisAgent,
+    TopDownBFS,
+)
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.grammar import (
+    ROOT_CONTEXT,
+    ProbabilisticGrammar,
+    ProbabilisticGrammarAgent,
+    program_productions,
+)
+from astsynth.program import GeneratedProgram
+from astsynth.program.blanks import IfBranching, Input
+from astsynth.program.graph import ProgramGraph
+from astsynth.program.evaluate import function_succeeds_on_task, program_function
+from astsynth.program.writter import graph_to_program
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+
+SOLVED_PROGRAM_SOURCE = "\n".join(
+    [
+        STRING_DSL_SOURCE,
+        "",
+        "def solved(s: str):",
+        "    x0 = repeat(s, THREE)",
+        "    return concat(x0, DASH)",
+    ]
+)
+
+LENGTH_DSL_SOURCE = "\n".join(
+    [
+        "def length(s: str) -> int:",
+        "    return len(s)",
+        "",
+        "def is_empty(s: str) -> bool:",
+        "    return not s",
+    ]
+)
+
+BRANCHING_PROGRAM_SOURCE = "\n".join(
+    [
+        LENGTH_DSL_SOURCE,
+        "",
+        "def branching(s: str):",
+        "    if is_empty(s):",
+        "        return length(s)",
+        "    else:",
+        "        return length(s)",
+    ]
+)
+
+
+class TestProbabilisticGrammar:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        self.dsl.inputs.append(Input(name="s", type=str))
+        self.corpus = [GeneratedProgram(name="solved", source=SOLVED_PROGRAM_SOURCE)]
+        self.grammar = ProbabilisticGrammar.fit(self.corpus)
+
+    def test_productions_follow_shared_variables(self):
+        assert list(program_productions(self.corpus[0])) == [
+            (ROOT_CONTEXT, "concat"),
+            (("concat", "string"), "repeat"),
+            (("repeat", "string"), "s"),
+            (("repeat", "times"), "THREE"),
+            (("concat", "other_string"), "DASH"),
+        ]
+
+    def test_productions_of_branching_programs(self):
+        program = GeneratedProgram(name="branching", source=BRANCHING_PROGRAM_SOURCE)
+        assert list(program_productions(program)) == [
+            (ROOT_CONTEXT, "if"),
+            (("if", "test"), "is_empty"),
+            (("is_empty", "s"), "s"),
+            (("if", "body"), "length"),
+            (("length", "s"), "s"),
+            (("if", "else"), "length"),
+            (("length", "s"), "s"),
+        ]
+
+    def test_save_and_load(self, tmp_path: Path):
+        grammar_path = tmp_path / "grammar.json"
+        self.grammar.save(grammar_path)
+        loaded = ProbabilisticGrammar.load(grammar_path)
+        assert loaded.counts == self.grammar.counts
+        assert loaded.log_probability(
+            ("repeat", "times"), "THREE"
+        ) > loaded.log_probability(("repeat", "times"), "TWO")
+
+    def test_agent_finds_likely_solution_first(self):
+        task = Task.from_tuples(
+            [({"s": "ab"}, "ababab-"), ({"s": "c"}, "ccc-")],
+        )
+        agent = ProbabilisticGrammarAgent(self.grammar)
+
+        guided_graphs = list(
+            ProgramGenerator(dsl=self.dsl, output_type=str, agent=agent).enumerate(
+                max_depth=2
+            )
+        )
+        bfs_graphs = list(
+            ProgramGenerator(
+                dsl=self.dsl, output_type=str, agent=TopDownBFS()
+            ).enumerate(max_depth=2)
+        )
+
+        def _first_success(graphs) -> int:
+            for index, graph in enumerate(graphs):
+                program = graph_to_program(graph, "generated_func", self.dsl)
+                if function_succeeds_on_task(program_function(program), task):
+                    return index
+            raise AssertionError("No successful program")
+
+        assert _first_success(guided_graphs) == 10
+        assert _first_success(bfs_graphs) == 47
+
+        guided_configs = [graph.hashable_config for graph in guided_graphs]
+        assert len(guided_configs) == len(set(guided_configs))
+        assert set(guided_configs) >= {graph.hashable_config for graph in bfs_graphs}
+        assert agent.n_discarded_states == 0
+
+    def test_agent_generates_likeliest_programs_first(self):
+        agent = ProbabilisticGrammarAgent(self.grammar)
+        scores = [
+            agent.config_score(graph.hashable_config)
+            for graph in ProgramGenerator(
+                dsl=self.dsl, output_type=str, agent=agent
+            ).enumerate(max_depth=2)
+        ]
+        assert len(scores) == 122
+        assert scores == sorted(scores, reverse=True)
+
+    def test_smoothing_counts_every_dsl_symbol(self, tmp_path: Path):
+        grammar = ProbabilisticGrammar.fit(self.corpus, dsl=self.dsl)
+        assert grammar.symbols == {"s", "TWO", "THREE", "DASH", "repeat", "concat"}
+        assert math.exp(
+            grammar.log_probability(("repeat", "times"), "TWO")
+        ) == pytest.approx(1 / (1 + 7))
+
+        grammar_path = tmp_path / "grammar.json"
+        grammar.save(grammar_path)
+        assert ProbabilisticGrammar.load(grammar_path).symbols == grammar.symbols
+
+    def test_agent_reused_after_an_interrupted_enumeration(self):
+        grammar = ProbabilisticGrammar.fit(
+            [GeneratedProgram(name="branching", source=BRANCHING_PROGRAM_SOURCE)]
+        )
+        agent = ProbabilisticGrammarAgent(grammar)
+        programs = _branching_programs(agent)
+        for _index, _program in zip(range(2), programs):
+            pass
+        programs.close()
+        assert agent._queue
+
+        configs = [graph.hashable_config for graph in _branching_programs(agent)]
+        bfs_configs = [
+            graph.hashable_config for graph in _branching_programs(TopDownBFS())
+        ]
+        assert set(configs) == set(bfs_configs)
+
+    def test_agent_stops_without_any_other_candidate(self):
+        agent = ProbabilisticGrammarAgent(self.grammar)
+        stop = Stop()
+        assert agent.act(Candidates([stop]), ProgramGraph(output_type=str)) is stop
+
+    @pytest.mark.parametrize("max_queue_size", [10_000, 1])
+    def test_agent_fills_blanks_without_constant_options(self, max_queue_size: int):
+        grammar = ProbabilisticGrammar.fit(
+            [GeneratedProgram(name="branching", source=BRANCHING_PROGRAM_SOURCE)]
+        )
+        agent = ProbabilisticGrammarAgent(grammar, max_queue_size=max_queue_size)
+        guided_configs = [graph.hashable_config for graph in _branching_programs(agent)]
+        bfs_configs = [
+            graph.hashable_config for graph in _branching_programs(TopDownBFS())
+        ]
+        assert len(guided_configs) == len(set(guided_configs))
+        if max_queue_size > 1:
+            assert set(guided_configs) == set(bfs_configs)
+            assert agent.n_discarded_states == 0
+        else:
+            assert set(guided_configs) < set(bfs_configs)
+            assert agent.n_discarded_states > 0
+
+    def test_agent_queues_programs_with_colliding_hashes(self):
+        agent = ProbabilisticGrammarAgent(self.grammar)
+        root = ProgramGraph(output_type=str)
+        filled_root = ProgramGraph(output_type=str)
+        filled_root.fill_blank(root.root, self.dsl.inputs[0])
+        jumps = [
+            JumpToFrontiere(config=_CollidingConfig(graph.hashable_config))
+            for graph in (root, filled_root)
+        ]
+        agent._enqueue(jumps)
+        assert len(agent._queue) == 2
+
+
+def _branching_programs(agent: SynthesisAgent) -> Iterator[ProgramGraph]:
+    dsl = load_symbols_from_python_source(LENGTH_DSL_SOURCE)
+    dsl.inputs.append(Input(name="s", type=str))
+    generator = ProgramGenerator(
+        dsl=dsl, output_type=int, standard_operations=[IfBranching()], agent=agent
+    )
+    return generator.enumerate(max_depth=2)
+
+
+class _CollidingConfig(tuple):
+    def __hash__(self) -> int:
+        return 0
@@ -0,0 +1,113 @@
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+
+from astsynth.hashing import UnstableDigestError, canonical_digest, inputs_digest
+from astsynth.task import Task
+
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+
+class Size(BaseModel):
+    x: int
+    y: int
+
+
+class TestCanonicalDigest:
+    @pytest.mark.parametrize(
+        "value,same_content_value",
+        [
+            ([1, [2, 3]], [1, [2, 3]]),
+            ({"a": 1, "b": [2]}, {"b": [2], "a": 1}),
+            ({1, 2, 3}, {3, 2, 1}),
+            (frozenset({"x"}), frozenset({"x"})),
+            ((1.5, None, b"bytes"), (1.5, None, b"bytes")),
+        ],
+    )
+    def test_same_content_same_digest(self, value: Any, same_content_value: Any):
+        assert canonical_digest(value) == canonical_digest(same_content_value)
+
+    @pytest.mark.parametrize(
+        "value,other_value",
+        [
+            ([1, 2], [2, 1]),
+            ([1, 2], (1, 2)),
+            ({1: 2}, {2: 1}),
+            ([[1], 2], [1, [2]]),
+            (True, 1),
+            (1, 1.0),
+            ("1", 1),
+        ],
+    )
+    def test_different_content_different_digest(self, value: Any, other_value: Any):
+        assert canonical_digest(value) != canonical_digest(other_value)
+
+    def test_models_are_digested_from_their_class_and_fields(self):
+        assert canonical_digest(Point(x=1, y=2)) == canonical_digest(Point(x=1, y=2))
+        assert canonical_digest(Point(x=1, y=2)) != canonical_digest(Point(x=2, y=1))
+        assert canonical_digest(Point(x=1, y=2)) != canonical_digest(Size(x=1, y=2))
+
+    def test_inputs_order_does_not_matter(self):
+        assert inputs_digest({"x": [1], "y": "a"}) == inputs_digest(
+            {"y": "a", "x": [1]}
+        )
+
+    def test_unhashable_value_without_structure(self):
+        class Unhashable:
+            __hash__ = None  # type: ignore
+
+        with pytest.raises(TypeError):
+            canonical_digest(Unhashable())
+
+    def test_arrays_are_digested_from_their_buffer(self):
+        first, same, other = (
+            _FakeArray([1, 2]),
+            _FakeArray([1, 2]),
+            _FakeArray([2, 1]),
+        )
+        assert canonical_digest(first, stable=True) == canonical_digest(same)
+        assert canonical_digest(first) != canonical_digest(other)
+
+    def test_python_hash_fallback_is_unstable(self):
+        class Box:
+            pass
+
+        box = Box()
+        assert canonical_digest(box) == canonical_digest(box)
+        assert canonical_digest(box) != canonical_digest(Box())
+        with pytest.raises(UnstableDigestError):
+            canonical_digest(box, stable=True)
+        with pytest.raises(UnstableDigestError):
+            inputs_digest({"boxes": {"a": [box]}}, stable=True)
+
+    def test_task_from_unhashable_inputs(self):
+        task = Task.from_tuples(
+            [
+                ({"numbers": [1, 2], "mapping": {"a": 1}}, 3),
+                ({"numbers": [3], "mapping": {"a": 1}}, 3),
+            ]
+        )
+        assert len(task.examples) == 2
+
+        with pytest.raises(ValueError):
+            Task.from_tuples(
+                [
+                    ({"numbers": [1, 2], "mapping": {"a": 1}}, 3),
+                    ({"mapping": {"a": 1}, "numbers": [1, 2]}, 3),
+                ]
+            )
+
+
+class _FakeArray:
+    """Minimal NumPy-like array of 64 bits integers."""
+
+    def __init__(self, values: list[int]) -> None:
+        self.values = values
+        self.__array_interface__ = {"typestr": "<i8", "shape": (len(values),)}
+
+    def tobytes(self) -> bytes:
+        return b"".join(value.to_bytes(8, "little") for value in self.values)
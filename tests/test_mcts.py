@@ -0,0 +1,143 @@
+import math
+
+import pytest
+
+from astsynth.agent import Candidates, Stop, TopDownBFS
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.mcts import MonteCarloTreeSearchAgent, _search_statistics
+from astsynth.program.blanks import Input
+from astsynth.program.graph import ProgramGraph
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+LENGTH_DSL_SOURCE = "\n".join(
+    [
+        "def length(s: str) -> int:",
+        "    return len(s)",
+        "",
+        "def first_code(s: str) -> int:",
+        "    return ord(s[0])",
+    ]
+)
+
+
+class TestMonteCarloTreeSearch:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        self.dsl.inputs.append(Input(name="s", type=str))
+        self.task = Task.from_tuples(
+            [({"s": "ab"}, "ababab-ababab-"), ({"s": "c"}, "ccc-ccc-")]
+        )
+
+    def test_enumerates_every_program(self):
+        agent = MonteCarloTreeSearchAgent(self.dsl, self.task, n_simulations=4, seed=0)
+        generator = ProgramGenerator(dsl=self.dsl, output_type=str, agent=agent)
+        configs = [graph.hashable_config for graph in generator.enumerate(max_depth=2)]
+        assert len(configs) == len(set(configs)) == 122
+
+    def test_finds_solution_before_enumeration(self):
+        bfs_result = Synthesizer(self.dsl, self.task, agent=TopDownBFS()).run(
+            max_depth=3, max_solutions=1
+        )
+        assert bfs_result.stats.n_generated_programs == 116
+
+        agent = MonteCarloTreeSearchAgent(
+            self.dsl, self.task, n_simulations=256, seed=0
+        )
+        mcts_result = Synthesizer(self.dsl, self.task, agent=agent).run(
+            max_depth=3, max_solutions=1
+        )
+        assert mcts_result.stats.n_successful_programs == 1
+        assert mcts_result.stats.n_generated_programs == 11
+
+    def test_root_parallel_search_merges_statistics(self):
+        with MonteCarloTreeSearchAgent(
+            self.dsl, self.task, n_simulations=8, n_workers=2, seed=0
+        ) as agent:
+            agent.search()
+
+        # Two workers each ran 4 simulations, all starting from the empty program.
+        root_config = ProgramGraph(output_type=str).hashable_config
+        assert agent.visits[root_config] == 8
+        assert len(agent.visits) > 1
+
+    def test_workers_are_stopped_when_enumeration_ends(self):
+        agent = MonteCarloTreeSearchAgent(
+            self.dsl, self.task, n_simulations=2, n_workers=2, seed=0
+        )
+        generator = ProgramGenerator(dsl=self.dsl, output_type=str, agent=agent)
+        programs = generator.enumerate(max_depth=2)
+        for _program in programs:
+            if agent._executor is not None:
+                break
+        assert agent._executor is not None
+        programs.close()
+        assert agent._executor is None
+
+    def test_tree_size_is_bounded(self):
+        agent = MonteCarloTreeSearchAgent(
+            self.dsl, self.task, n_simulations=64, max_tree_size=3, seed=0
+        )
+        agent.search()
+        assert len(agent._children) == 3
+
+    @pytest.mark.parametrize(
+        "n_simulations,max_rollout_depth", [(0, 1), (8, 0), (8, 1)]
+    )
+    def test_enumerates_every_program_without_constant_options(
+        self, n_simulations: int, max_rollout_depth: int
+    ):
+        dsl = load_symbols_from_python_source(LENGTH_DSL_SOURCE)
+        dsl.inputs.append(Input(name="s", type=str))
+        task = Task.from_tuples([({"s": ""}, 0), ({"s": "ab"}, 2)])
+        agent = MonteCarloTreeSearchAgent(
+            dsl,
+            task,
+            n_simulations=n_simulations,
+            max_rollout_depth=max_rollout_depth,
+            max_cached_scores=1,
+            seed=0,
+        )
+
+        def _configs(agent) -> set:
+            generator = ProgramGenerator(dsl=dsl, output_type=int, agent=agent)
+            return {graph.hashable_config for graph in generator.enumerate(max_depth=2)}
+
+        assert _configs(agent) == _configs(TopDownBFS())
+        assert len(agent._complete_scores) <= 1
+
+    def test_stops_without_any_other_candidate(self):
+        agent = MonteCarloTreeSearchAgent(self.dsl, self.task, seed=0)
+        stop = Stop()
+        assert agent.act(Candidates([stop]), ProgramGraph(output_type=str)) is stop
+        assert agent.mean_score(ProgramGraph(output_type=str).hashable_config) == 0.0
+
+    def test_worker_search_statistics(self):
+        statistics = _search_statistics(
+            self.dsl,
+            self.task,
+            n_simulations=16,
+            exploration=math.sqrt(2),
+            max_rollout_depth=3,
+            seed=0,
+            max_tree_size=1,
+            max_cached_scores=1,
+        )
+        root_config = ProgramGraph(output_type=str).hashable_config
+        assert statistics[root_config][0] == 16
+        assert len(statistics) == 5, "only the root should be expanded"
+
+        agent = MonteCarloTreeSearchAgent(self.dsl, self.task, seed=0)
+        agent.merge(statistics)
+        agent.merge(statistics)
+        assert agent.statistics()[root_config] == (32, 2 * statistics[root_config][1])
+
+        bounded_agent = MonteCarloTreeSearchAgent(
+            self.dsl, self.task, seed=0, max_tree_size=2
+        )
+        bounded_agent.merge(statistics)
+        assert len(bounded_agent.statistics()) == 2
+        assert bounded_agent.statistics()[root_config] == statistics[root_config]
@@ -0,0 +1,94 @@
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.partial_evaluation import ExamplesAgreementScore
+from astsynth.program.blanks import Blank, IfBranching, Input
+from astsynth.program.graph import ProgramGraph
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+NUMBERS_DSL_SOURCE = "\n".join(
+    [
+        "ZERO = 0",
+        "",
+        "def inverse(x: int) -> float:",
+        "    return 1 / x",
+        "",
+        "def is_one(x: int) -> bool:",
+        "    return x == 1",
+        "",
+        "def pair(x: int) -> list[int]:",
+        "    return [x, x]",
+    ]
+)
+
+
+class TestExamplesAgreementScore:
+    def test_complete_subtrees_contained_in_outputs_partially_agree(self):
+        dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        task = Task.from_tuples(
+            [({"s": "ab"}, "ababab-"), ({"s": "c"}, "ccc-"), ({"s": "d"}, "e")]
+        )
+        score = ExamplesAgreementScore(dsl, task, size_penalty=0.0)
+        repeat, concat = dsl.operations
+        three, s = dsl.constants[1], Input(name="s", type=str)
+
+        graph = ProgramGraph(output_type=str)
+        graph.fill_blank(graph.root, concat)
+        string_blank = Blank(id="return>concat>string", type=str)
+        graph.fill_blank(string_blank, repeat)
+        graph.fill_blank(Blank(id="return>concat>string>repeat>string", type=str), s)
+        graph.fill_blank(Blank(id="return>concat>string>repeat>times", type=int), three)
+        assert score(graph) == pytest.approx((6 / 7 + 3 / 4 + 0) / 3)
+
+    def test_raising_subtrees_are_ignored(self):
+        dsl = load_symbols_from_python_source(NUMBERS_DSL_SOURCE)
+        inverse = dsl.operations[0]
+        x = Input(name="x", type=int)
+        score = ExamplesAgreementScore(
+            dsl, Task.from_tuples([({"x": 0}, 0.0), ({"x": 1}, 0.0)]), size_penalty=0
+        )
+        graph = ProgramGraph(output_type=float)
+        graph.fill_blank(graph.root, inverse)
+        graph.fill_blank(Blank(id="return>inverse>x", type=int), x)
+        assert score(graph) == 0.5
+
+    def test_if_subtrees_take_values_of_their_branches(self):
+        dsl = load_symbols_from_python_source(NUMBERS_DSL_SOURCE)
+        zero, (_inverse, is_one, _pair) = dsl.constants[0], dsl.operations
+        x = Input(name="x", type=int)
+        score = ExamplesAgreementScore(
+            dsl, Task.from_tuples([({"x": 1}, 0), ({"x": 2}, 2)]), size_penalty=0
+        )
+        graph = ProgramGraph(output_type=int)
+        if_branching = IfBranching()
+        graph.fill_blank(graph.root, if_branching)
+        test, body, else_case = graph.sub_blanks(graph.root, if_branching)
+        graph.fill_blank(test, is_one)
+        graph.fill_blank(graph.sub_blanks(test, is_one)[0], x)
+        graph.fill_blank(body, zero)
+        assert score(graph) == 0.5
+
+        graph.fill_blank(else_case, x)
+        assert score(graph) == 1.0
+
+    def test_values_that_cannot_be_compared_do_not_agree(self):
+        dsl = load_symbols_from_python_source(NUMBERS_DSL_SOURCE)
+        pair = dsl.operations[2]
+        x = Input(name="x", type=int)
+        score = ExamplesAgreementScore(
+            dsl,
+            Task.from_tuples([({"x": 1}, _Uncomparable())]),
+            size_penalty=0,
+        )
+        graph = ProgramGraph(output_type=list[int])
+        graph.fill_blank(graph.root, pair)
+        graph.fill_blank(Blank(id="return>pair>x", type=int), x)
+        assert score(graph) == 0.0
+
+
+class _Uncomparable:
+    def __eq__(self, other: object) -> bool:
+        raise TypeError("Cannot compare")
+
+    __hash__ = object.__hash__
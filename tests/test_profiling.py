@@ -0,0 +1,29 @@
+from astsynth.profiling import Profiler
+
+
+class TestProfiler:
+    def test_cache_hit_rate(self):
+        profiler = Profiler()
+        assert profiler.profile(n_cache_hits=0, n_cache_misses=0).cache_hit_rate == 0
+        profile = profiler.profile(n_cache_hits=3, n_cache_misses=1)
+        assert profile.cache_hit_rate == 0.75
+
+    def test_frontier_sizes_sample_is_bounded(self):
+        profiler = Profiler(max_frontier_samples=4)
+        for step in range(12):
+            profiler.record_step(n_offered_actions=1, frontier_size=step)
+        profile = profiler.profile(n_cache_hits=0, n_cache_misses=0)
+        assert profile.frontier_sizes == [0, 4, 8]
+        assert profile.frontier_sizes_interval == 4
+        assert profile.n_offered_actions == 12
+
+    def test_disabled_profiler_only_counts_offered_actions(self):
+        profiler = Profiler(enabled=False)
+        with profiler.phase("generate"):
+            profiler.record_step(n_offered_actions=2, frontier_size=1)
+            profiler.record_program(depth=1)
+        profile = profiler.profile(n_cache_hits=0, n_cache_misses=0)
+        assert profile.n_offered_actions == 2
+        assert profile.frontier_sizes == []
+        assert profile.n_programs_by_depth == {}
+        assert profile.phases_runtime["generate"] == 0.0
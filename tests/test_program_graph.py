@@ -1,9 +1,19 @@
-from typing import Type
+from copy import copy, deepcopy
+from typing import Optional, Type
 from typing_extensions import Self
+import pickle
 import pytest
+from pydantic import TypeAdapter
 
-from astsynth.program.blanks import Blank, BlankContent, Input, Operation
-from astsynth.program.graph import ProgramGraph
+from astsynth.agent import EmptySubBlanks, FillBlanks
+from astsynth.program.blanks import (
+    Blank,
+    BlankContent,
+    IfBranching,
+    Input,
+    Operation,
+)
+from astsynth.program.graph import ProgramGraph, hashable_config
 
 
 class TestProgramGraph:
@@ -78,6 +88,105 @@ class TestProgramGraph:
             {Blank(id="return>add>x", type=int), Blank(id="return>add>y", type=int)}
         )
 
+    def test_nested_operation_structure(self):
+        """should track depth and parent of nested blanks,
+        and remove every nested blank when emptying an operation."""
+
+        def add(x: int, y: int) -> int:
+            return x + y
+
+        operation = Operation.from_func(add)
+        return_blank = Blank(id="return", type=object)
+        x_blank = Blank(id="return>add>x", type=int)
+        self.fixture.given_graph(
+            ProgramGraphBuilder()
+            .with_filled_blank(return_blank, operation)
+            .with_filled_blank(x_blank, operation)
+            .build()
+        )
+        nested_blank = Blank(id="return>add>x>add>y", type=int)
+        self.fixture.then_parent_should_be(nested_blank, (x_blank, operation))
+        self.fixture.then_depth_should_be(nested_blank, 2)
+        self.fixture.then_parent_should_be(return_blank, None)
+
+        self.fixture.when_emptying_blank(x_blank)
+        self.fixture.then_empty_blanks_should_be(
+            {x_blank, Blank(id="return>add>y", type=int)}
+        )
+        assert self.fixture.graph.number_of_nodes() == 4
+        assert self.fixture.graph.config()[x_blank] is None
+        assert (
+            hashable_config(self.fixture.graph.config())
+            == self.fixture.graph.hashable_config
+        )
+
+
+def test_blanks_are_interned():
+    """should give the same blank for the same id and normalized type,
+    even after pickling or copying."""
+    blank = Blank(id="return>add>x", type=int)
+    assert Blank(id="return>add>x", type=int) is blank
+    assert Blank(id="return>add>x", type=str) is not blank
+    assert Blank(id="nothing", type=None) is Blank(id="nothing", type=type(None))
+    assert pickle.loads(pickle.dumps(blank)) is blank
+    assert copy(blank) is blank
+    assert deepcopy(blank) is blank
+    blanks = TypeAdapter(tuple[Blank, ...]).validate_python(
+        [{"id": "return>add>x", "type": int}]
+    )
+    assert blanks == (blank,)
+
+
+def test_networkx_like_nodes_predecessors_and_successors():
+    def is_empty(s: str) -> bool:
+        return not s
+
+    graph = ProgramGraph(output_type=str)
+    if_branching = IfBranching()
+    graph.fill_blank(graph.root, if_branching)
+    test_blank, body_blank, else_blank = graph.sub_blanks(graph.root, if_branching)
+    is_empty_op = Operation.from_func(is_empty)
+    graph.fill_blank(test_blank, is_empty_op)
+    (s_blank,) = graph.sub_blanks(test_blank, is_empty_op)
+    s_input = Input(name="s", type=str)
+    graph.fill_blank(s_blank, s_input)
+
+    assert len(graph.nodes) == graph.number_of_nodes() == 8
+    assert graph.nodes(data=False) == list(graph.nodes)
+    assert graph.nodes[s_blank] == {"depth": 2}
+    assert graph.nodes["return>if"]["subblanks"] == (
+        test_blank,
+        body_blank,
+        else_blank,
+    )
+    assert graph.nodes(data="content")[1] == ("return>if", if_branching)
+    assert (s_blank, {"depth": 2}) in graph.nodes(data=True)
+
+    assert list(graph.predecessors(graph.root)) == []
+    assert list(graph.predecessors(s_blank)) == [test_blank.id + ">is_empty"]
+    assert list(graph.predecessors(test_blank.id + ">is_empty")) == [test_blank]
+    assert list(graph.successors(test_blank)) == [test_blank.id + ">is_empty"]
+    assert list(graph.successors(body_blank)) == []
+    assert list(graph.successors(test_blank.id + ">is_empty")) == [s_blank]
+    with pytest.raises(KeyError):
+        list(graph.successors(body_blank.id + ">is_empty"))
+
+    graph.empty_blank(test_blank)
+    assert s_blank not in list(graph.nodes)
+    assert len(graph.nodes) == len(list(graph.nodes)) == 5
+
+
+def test_actions_are_immutable_and_hashed_from_their_fields():
+    blank = Blank(id="return>add>x", type=int)
+    action = EmptySubBlanks(blanks=(blank,))
+    assert action == EmptySubBlanks(blanks=(blank,))
+    assert hash(action) == hash(EmptySubBlanks(blanks=(blank,)))
+    assert action != EmptySubBlanks(blanks=(blank,), parent_blank=blank)
+    assert action != FillBlanks(blanks_contents=())
+    assert repr(action) == f"EmptySubBlanks(parent_blank=None, blanks=({blank!r},))"
+    with pytest.raises(AttributeError):
+        action.blanks = ()
+
 
 @pytest.fixture
 def graph_fixture() -> "ProgramGraphFixture":
@@ -97,6 +206,17 @@ class ProgramGraphFixture:
     def when_replacing_blank(self, blank: Blank, content: BlankContent) -> None:
         self.graph.replace_blank(blank, content)
 
+    def when_emptying_blank(self, blank: Blank) -> None:
+        self.graph.empty_blank(blank)
+
+    def then_parent_should_be(
+        self, blank: Blank, expected_parent: Optional[tuple[Blank, BlankContent]]
+    ) -> None:
+        assert self.graph.parent(blank) == expected_parent
+
+    def then_depth_should_be(self, blank: Blank, expected_depth: int) -> None:
+        assert self.graph.depth(blank) == expected_depth
+
     def then_blank_value_should_be(
         self, blank: Blank, expected_content: BlankContent
     ) -> None:
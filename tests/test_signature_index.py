@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.program.blanks import Input
+from astsynth.signature_index import SignatureIndex
+from astsynth.task import Task
+
+INT_DSL_SOURCE = "\n".join(
+    [
+        "TWO = 2",
+        "",
+        "def add(x: int, y: int) -> int:",
+        "    return x + y",
+        "",
+        "def mul(x: int, y: int) -> int:",
+        "    return x * y",
+    ]
+)
+
+PROBES = [{"n": 0}, {"n": 1}, {"n": 5}]
+
+
+class TestSignatureIndex:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        dsl = load_symbols_from_python_source(INT_DSL_SOURCE)
+        dsl.inputs.append(Input(name="n", type=int))
+        self.index = SignatureIndex.build(
+            dsl=dsl, probes=PROBES, output_type=int, max_depth=1
+        )
+
+    def test_lookup_finds_canonical_program(self, tmp_path: Path):
+        task = Task.from_tuples([({"n": 5}, 10), ({"n": 0}, 0), ({"n": 1}, 2)])
+
+        program = self.index.lookup(task)
+        assert program is not None
+        assert "return add(n, n)" in program.source
+
+        index_path = tmp_path / "index.json"
+        self.index.save(index_path)
+        loaded_index = SignatureIndex.load(index_path)
+        assert len(loaded_index) == len(self.index)
+        loaded_program = loaded_index.lookup(task)
+        assert loaded_program is not None
+        assert loaded_program.source == program.source
+
+    def test_lookup_misses(self):
+        unknown_behavior = Task.from_tuples(
+            [({"n": 0}, 7), ({"n": 1}, 7), ({"n": 5}, 7)]
+        )
+        assert self.index.lookup(unknown_behavior) is None
+
+        missing_probe = Task.from_tuples([({"n": 0}, 0), ({"n": 1}, 2)])
+        assert self.index.lookup(missing_probe) is None
+
+        extra_failing_example = Task.from_tuples(
+            [({"n": 0}, 0), ({"n": 1}, 2), ({"n": 5}, 10), ({"n": 3}, 7)]
+        )
+        assert self.index.lookup(extra_failing_example) is None
+
+
+def test_unstable_index_cannot_be_saved(tmp_path: Path):
+    dsl = load_symbols_from_python_source(
+        "\n".join(
+            [
+                "def rotate(x: int) -> complex:",
+                "    return complex(0, x)",
+            ]
+        )
+    )
+    dsl.inputs.append(Input(name="n", type=int))
+    index = SignatureIndex.build(dsl=dsl, probes=PROBES, output_type=complex)
+    assert not index.stable
+    program = index.lookup(
+        Task.from_tuples([({"n": n}, complex(0, n)) for n in (0, 1, 5)])
+    )
+    assert program is not None
+    with pytest.raises(ValueError):
+        index.save(tmp_path / "index.json")
+
+
+def test_raising_programs_are_not_indexed():
+    dsl = load_symbols_from_python_source(
+        "\n".join(
+            [
+                "def inverse(x: int) -> float:",
+                "    return 1 / x",
+            ]
+        )
+    )
+    dsl.inputs.append(Input(name="n", type=int))
+    index = SignatureIndex.build(dsl=dsl, probes=PROBES, output_type=float)
+    assert len(index) == 0
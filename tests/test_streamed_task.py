@@ -0,0 +1,203 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.streamed_task import (
+    ColumnarExamples,
+    JsonlExamples,
+    StreamedTask,
+    write_columnar_examples,
+)
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+
+EXAMPLES: list[tuple[dict[str, Any], Any]] = [
+    ({"input_string": "abc", "times": 2}, "abcabc"),
+    ({"input_string": "ab", "times": 3}, "ababab"),
+    ({"input_string": "é", "times": 1}, "é"),
+]
+
+
+class TestStreamedTask:
+    @pytest.fixture(autouse=True)
+    def setup(self, streamed_task_fixture: "StreamedTaskFixture") -> None:
+        self.fixture = streamed_task_fixture
+
+    def test_from_tuples_keeps_given_examples(self):
+        examples = list(EXAMPLES)
+        task = Task.from_tuples(examples)
+        assert examples == EXAMPLES
+        assert list(task.iter_examples()) == EXAMPLES
+
+    def test_columnar_examples(self, tmp_path: Path):
+        path = tmp_path / "examples.bin"
+        write_columnar_examples(path, EXAMPLES)
+        with StreamedTask.from_columnar(path) as task:
+            self.fixture.when_loading(task)
+            self.fixture.then_types_should_be({"input_string": str, "times": int}, str)
+            self.fixture.then_examples_should_be(EXAMPLES)
+            self.fixture.then_batches_should_be(
+                batch_size=2,
+                expected_batches=[
+                    (
+                        {"input_string": ["abc", "ab"], "times": [2, 3]},
+                        ["abcabc", "ababab"],
+                    ),
+                    ({"input_string": ["é"], "times": [1]}, ["é"]),
+                ],
+            )
+
+    def test_jsonl_examples(self, tmp_path: Path):
+        path = tmp_path / "examples.jsonl"
+        path.write_text(
+            "\n".join(
+                json.dumps({"input": inputs, "output": output})
+                for inputs, output in EXAMPLES
+            )
+        )
+        with StreamedTask.from_jsonl(path) as task:
+            self.fixture.when_loading(task)
+            self.fixture.then_types_should_be({"input_string": str, "times": int}, str)
+            self.fixture.then_examples_should_be(EXAMPLES)
+            self.fixture.then_batches_should_be(
+                batch_size=2,
+                expected_batches=[
+                    (
+                        {"input_string": ["abc", "ab"], "times": [2, 3]},
+                        ["abcabc", "ababab"],
+                    ),
+                    ({"input_string": ["é"], "times": [1]}, ["é"]),
+                ],
+            )
+
+    def test_synthesis_on_streamed_task(self, tmp_path: Path):
+        path = tmp_path / "examples.bin"
+        write_columnar_examples(path, EXAMPLES)
+        with StreamedTask.from_columnar(path) as task:
+            self.fixture.when_loading(task)
+            self.fixture.then_synthesis_should_find_source(
+                dsl_source="\n".join(
+                    [
+                        "def repeat(string: str, times: int) -> str:",
+                        "    return string * times",
+                    ]
+                ),
+                expected_call="return repeat(input_string, times)",
+            )
+
+    def test_jsonl_examples_types_are_checked_on_every_line(self, tmp_path: Path):
+        path = tmp_path / "examples.jsonl"
+        examples = EXAMPLES + [({"input_string": "a", "times": "2"}, "aa")]
+        path.write_text(
+            "\n".join(
+                json.dumps({"input": inputs, "output": output})
+                for inputs, output in examples
+            )
+        )
+        with StreamedTask.from_jsonl(path) as task:
+            with pytest.raises(TypeError, match="Input times of example 3"):
+                list(task.iter_examples())
+
+    def test_closed_files_cannot_be_read(self, tmp_path: Path):
+        path = tmp_path / "examples.bin"
+        write_columnar_examples(path, EXAMPLES)
+        with StreamedTask.from_columnar(path) as task:
+            pass
+        with pytest.raises(ValueError):
+            list(task.iter_examples())
+
+    def test_examples_files_are_context_managers(self, tmp_path: Path):
+        columnar_path = tmp_path / "examples.bin"
+        write_columnar_examples(columnar_path, EXAMPLES)
+        jsonl_path = tmp_path / "examples.jsonl"
+        jsonl_path.write_text(
+            "\n".join(
+                json.dumps({"input": inputs, "output": output})
+                for inputs, output in EXAMPLES
+            )
+        )
+        with ColumnarExamples(columnar_path) as columnar_examples:
+            assert list(columnar_examples) == EXAMPLES
+        with JsonlExamples(jsonl_path) as jsonl_examples:
+            assert list(jsonl_examples) == EXAMPLES
+        with pytest.raises(ValueError):
+            list(jsonl_examples)
+
+    def test_invalid_examples_files(self, tmp_path: Path):
+        path = tmp_path / "examples"
+        path.write_text("\n")
+        with pytest.raises(ValueError, match="No example found"):
+            StreamedTask.from_jsonl(path)
+        with pytest.raises(ValueError, match="is not a columnar examples file"):
+            StreamedTask.from_columnar(path)
+
+        empty_path = tmp_path / "empty"
+        empty_path.touch()
+        with pytest.raises(ValueError, match="No example found"):
+            StreamedTask.from_jsonl(empty_path)
+        with pytest.raises(ValueError, match="is not a columnar examples file"):
+            StreamedTask.from_columnar(empty_path)
+
+    @pytest.mark.parametrize(
+        "examples,message",
+        [
+            ([({"x": 1}, 1), ({"y": 1}, 1)], "has inputs"),
+            ([({"x": 1}, 1), ({"x": 1, "y": 1}, 1)], "has inputs"),
+            ([({"x": 1}, 1), ({"x": True}, 1)], "of x in example 1"),
+            ([({"x": 1}, 1.5), ({"x": 1}, 2)], "of return in example 1"),
+            ([({"x": 1}, 1), ({"x": 1}, 1.5)], "of return in example 1"),
+        ],
+    )
+    def test_columnar_values_are_never_converted(
+        self,
+        tmp_path: Path,
+        examples: list[tuple[dict[str, Any], Any]],
+        message: str,
+    ):
+        path = tmp_path / "examples.bin"
+        with pytest.raises(ValueError, match=message):
+            write_columnar_examples(path, examples)
+
+
+@pytest.fixture
+def streamed_task_fixture() -> "StreamedTaskFixture":
+    return StreamedTaskFixture()
+
+
+class StreamedTaskFixture:
+    def when_loading(self, task: StreamedTask) -> None:
+        self.task = task
+
+    def then_types_should_be(
+        self, expected_input_types: dict[str, type], expected_output_type: type
+    ) -> None:
+        assert self.task.input_types == expected_input_types
+        assert self.task.output_type == expected_output_type
+
+    def then_examples_should_be(
+        self, expected_examples: list[tuple[dict[str, Any], Any]]
+    ) -> None:
+        assert len(self.task) == len(expected_examples)
+        assert list(self.task.iter_examples()) == expected_examples
+
+    def then_batches_should_be(
+        self,
+        batch_size: int,
+        expected_batches: list[tuple[dict[str, list[Any]], list[Any]]],
+    ) -> None:
+        batches = [
+            ({name: list(column) for name, column in inputs.items()}, list(outputs))
+            for inputs, outputs in self.task.batches(batch_size)
+        ]
+        assert batches == expected_batches
+
+    def then_synthesis_should_find_source(
+        self, dsl_source: str, expected_call: str
+    ) -> None:
+        dsl = load_symbols_from_python_source(dsl_source)
+        dsl.add_task_inputs(self.task)
+        result = Synthesizer(dsl=dsl, task=self.task).run(max_depth=1)
+        assert [expected_call in p.source for p in result.successful_programs] == [True]
@@ -0,0 +1,414 @@
+import ast
+import asyncio
+import itertools
+from typing import Any, Optional
+
+import pytest
+
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.profiling import PHASES
+from astsynth.program.evaluate import program_succeeds_on_task
+from astsynth.synthesizer import (
+    BatchSynthesizer,
+    ConditionalSynthesizer,
+    SynthesisResult,
+    SynthesisSuccess,
+    Synthesizer,
+)
+from astsynth.task import Task
+from tests.conftest import STRING_DSL_SOURCE
+
+
+class TestBatchSynthesizer:
+    @pytest.fixture(autouse=True)
+    def setup(self, synthesizer_fixture: "SynthesizerFixture") -> None:
+        self.fixture = synthesizer_fixture
+
+    def test_batch_results_match_individual_results(self):
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [
+                [({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")],
+                [({"string": "ab"}, "abab"), ({"string": "c"}, "cc")],
+                [({"string": "ab"}, "ba"), ({"string": "c"}, "c")],
+            ]
+        )
+        self.fixture.when_running_batch(max_depth=2)
+        self.fixture.then_batch_results_should_match_individual_runs(max_depth=2)
+        self.fixture.then_n_successful_programs_should_be([5, 2, 0])
+
+    def test_tasks_are_dropped_at_max_solutions(self):
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [
+                [({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")],
+                [({"string": "ab"}, "ba"), ({"string": "c"}, "c")],
+            ]
+        )
+        self.fixture.when_running_batch(max_depth=2, max_solutions=1)
+        self.fixture.then_n_successful_programs_should_be([1, 0])
+        self.fixture.then_first_task_should_stop_before_the_second()
+
+    def test_synthesis_stops_once_every_task_is_solved(self):
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [
+                [({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")],
+                [({"string": "ab"}, "abab"), ({"string": "c"}, "cc")],
+            ]
+        )
+        self.fixture.when_running_batch(max_depth=2, max_solutions=1)
+        self.fixture.then_n_successful_programs_should_be([1, 1])
+        self.fixture.then_batch_should_stop_before_exhausting_enumeration(max_depth=2)
+
+    def test_tasks_must_share_inputs(self):
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [
+                [({"string": "ab"}, "abab")],
+                [({"other": "ab"}, "abab")],
+            ]
+        )
+        with pytest.raises(ValueError):
+            self.fixture.when_running_batch(max_depth=1)
+
+
+class TestStreamedSynthesis:
+    @pytest.fixture(autouse=True)
+    def setup(self, synthesizer_fixture: "SynthesizerFixture") -> None:
+        self.fixture = synthesizer_fixture
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [[({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")]]
+        )
+
+    def test_run_iter_yields_run_successes(self):
+        self.fixture.when_streaming(max_depth=2)
+        self.fixture.then_streamed_programs_should_match_run(max_depth=2)
+        self.fixture.then_streamed_stats_should_be_live()
+
+    def test_arun_iter_yields_run_successes(self):
+        self.fixture.when_streaming_async(max_depth=2)
+        self.fixture.then_streamed_programs_should_match_run(max_depth=2)
+        self.fixture.then_streamed_stats_should_be_live()
+
+    def test_stopping_iteration_stops_synthesis(self):
+        self.fixture.when_streaming(max_depth=2, n_taken=1)
+        self.fixture.then_streamed_programs_should_be_first_of_run(max_depth=2)
+
+
+class TestProfiledSynthesis:
+    @pytest.fixture(autouse=True)
+    def setup(self, synthesizer_fixture: "SynthesizerFixture") -> None:
+        self.fixture = synthesizer_fixture
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [[({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")]]
+        )
+
+    def test_no_profile_by_default(self):
+        self.fixture.when_running(max_depth=2)
+        assert self.fixture.results[0].stats.profile is None
+
+    def test_profile_counts_every_program(self):
+        self.fixture.when_running(max_depth=2, profile=True)
+        self.fixture.then_profile_should_be_consistent()
+
+
+class TestBatchedEvaluation:
+    @pytest.fixture(autouse=True)
+    def setup(self, synthesizer_fixture: "SynthesizerFixture") -> None:
+        self.fixture = synthesizer_fixture
+        self.fixture.given_dsl_source(STRING_DSL_SOURCE)
+        self.fixture.given_tasks(
+            [[({"string": "ab"}, "ababab"), ({"string": "c"}, "ccc")]]
+        )
+
+    def test_batches_find_the_same_programs(self):
+        self.fixture.when_running(max_depth=2, evaluation_batch_size=4)
+        self.fixture.then_programs_should_match_unbatched_run(max_depth=2)
+
+
+PARITY_DSL_SOURCE = "\n".join(
+    [
+        'EVEN = "even"',
+        'ODD = "odd"',
+        "",
+        "def is_even(number: int) -> bool:",
+        "    return number % 2 == 0",
+        "",
+        "def describe(number: int) -> str:",
+        "    return str(number)",
+        "",
+        "def concat(string: str, other_string: str) -> str:",
+        "    return string + other_string",
+    ]
+)
+
+
+class TestConditionalSynthesis:
+    @pytest.fixture(autouse=True)
+    def setup(self, synthesizer_fixture: "SynthesizerFixture") -> None:
+        self.fixture = synthesizer_fixture
+        self.fixture.given_dsl_source(PARITY_DSL_SOURCE)
+
+    def test_branches_solve_divided_examples(self):
+        self.fixture.given_tasks(
+            [
+                [
+                    ({"number": number}, f"{number}even" if number % 2 == 0 else "odd")
+                    for number in range(6)
+                ]
+            ]
+        )
+        self.fixture.when_running_conditional(max_depth=2, test_max_depth=1)
+        self.fixture.then_programs_should_succeed()
+        self.fixture.then_last_statement_should_be_if_branching()
+        self.fixture.then_n_successful_programs_should_be([1])
+
+    def test_branches_that_can_raise_are_not_combined(self):
+        self.fixture.given_dsl_source(
+            "\n".join(
+                [
+                    "from astsynth.dsl import operation",
+                    "",
+                    "ZERO = 0",
+                    "",
+                    "@operation(can_raise=True)",
+                    "def inverse(number: int) -> int:",
+                    "    return 10 // number",
+                    "",
+                    "def is_zero(number: int) -> bool:",
+                    "    return number == 0",
+                ]
+            )
+        )
+        self.fixture.given_tasks(
+            [[({"number": 0}, 0), ({"number": 1}, 10), ({"number": 2}, 5)]]
+        )
+        self.fixture.when_running_conditional(max_depth=1)
+        self.fixture.then_n_successful_programs_should_be([0])
+
+    def test_branches_are_combined_until_max_solutions(self):
+        self.fixture.given_dsl_source(
+            "\n".join(
+                [
+                    PARITY_DSL_SOURCE,
+                    "",
+                    "def is_odd(number: int) -> bool:",
+                    "    return number % 2 == 1",
+                    "",
+                    "def is_natural(number: int) -> bool:",
+                    "    return number >= 0",
+                ]
+            )
+        )
+        self.fixture.given_tasks(
+            [
+                [
+                    ({"number": number}, f"{number}even" if number % 2 == 0 else "odd")
+                    for number in range(6)
+                ]
+            ]
+        )
+        self.fixture.when_running_conditional(
+            max_depth=2, test_max_depth=1, max_solutions=1
+        )
+        self.fixture.then_programs_should_succeed()
+        self.fixture.then_last_statement_should_be_if_branching()
+        self.fixture.then_n_successful_programs_should_be([1])
+
+    def test_combined_programs_are_checked_on_the_task(self):
+        self.fixture.given_dsl_source(
+            "\n".join(
+                [
+                    "from astsynth.dsl import operation",
+                    "",
+                    'ZERO = "zero"',
+                    'SMALL = "small"',
+                    "",
+                    "@operation(can_raise=True)",
+                    "def is_zero(number: int) -> bool:",
+                    "    if number > 2:",
+                    '        raise ValueError("Too large")',
+                    "    return number == 0",
+                ]
+            )
+        )
+        self.fixture.given_tasks(
+            [
+                [
+                    ({"number": 0}, "zero"),
+                    ({"number": 1}, "small"),
+                    ({"number": 3}, "small"),
+                ]
+            ]
+        )
+        self.fixture.when_running_conditional(max_depth=1)
+        self.fixture.then_n_successful_programs_should_be([0])
+
+    def test_programs_without_branching_come_first(self):
+        self.fixture.given_tasks([[({"number": number}, "odd") for number in range(3)]])
+        self.fixture.when_running_conditional(max_depth=1, max_solutions=1)
+        self.fixture.then_programs_should_succeed()
+        assert "if " not in self.fixture.results[0].successful_programs[0].source
+
+
+@pytest.fixture
+def synthesizer_fixture() -> "SynthesizerFixture":
+    return SynthesizerFixture()
+
+
+class SynthesizerFixture:
+    def __init__(self) -> None:
+        self.dsl_source = ""
+        self.tasks: list[Task] = []
+        self.results: list[SynthesisResult] = []
+        self.successes: list[SynthesisSuccess] = []
+
+    def given_dsl_source(self, source: str) -> None:
+        self.dsl_source = source
+
+    def given_tasks(self, tasks_examples: list[list[tuple[dict[str, Any], Any]]]):
+        self.tasks = [Task.from_tuples(examples) for examples in tasks_examples]
+
+    def _dsl(self) -> DomainSpecificLanguage:
+        dsl = load_symbols_from_python_source(self.dsl_source)
+        dsl.add_task_inputs(self.tasks[0])
+        return dsl
+
+    def when_running_batch(
+        self, max_depth: int, max_solutions: Optional[int] = None
+    ) -> None:
+        synthesizer = BatchSynthesizer(dsl=self._dsl(), tasks=self.tasks)
+        self.results = synthesizer.run(max_depth=max_depth, max_solutions=max_solutions)
+
+    def when_running(
+        self, max_depth: int, profile: bool = False, evaluation_batch_size: int = 1
+    ) -> None:
+        synthesizer = Synthesizer(dsl=self._dsl(), task=self.tasks[0], profile=profile)
+        self.results = [
+            synthesizer.run(
+                max_depth=max_depth, evaluation_batch_size=evaluation_batch_size
+            )
+        ]
+
+    def when_running_conditional(
+        self,
+        max_depth: int,
+        test_max_depth: Optional[int] = None,
+        max_solutions: Optional[int] = None,
+    ) -> None:
+        synthesizer = ConditionalSynthesizer(dsl=self._dsl(), task=self.tasks[0])
+        self.results = [
+            synthesizer.run(
+                max_depth=max_depth,
+                test_max_depth=test_max_depth,
+                max_solutions=max_solutions,
+            )
+        ]
+
+    def when_streaming(self, max_depth: int, n_taken: Optional[int] = None) -> None:
+        synthesizer = Synthesizer(dsl=self._dsl(), task=self.tasks[0])
+        self.successes = list(
+            itertools.islice(synthesizer.run_iter(max_depth=max_depth), n_taken)
+        )
+
+    def when_streaming_async(self, max_depth: int) -> None:
+        synthesizer = Synthesizer(dsl=self._dsl(), task=self.tasks[0])
+
+        async def _collect() -> list[SynthesisSuccess]:
+            return [
+                success async for success in synthesizer.arun_iter(max_depth=max_depth)
+            ]
+
+        self.successes = asyncio.run(_collect())
+
+    def then_streamed_programs_should_match_run(self, max_depth: int) -> None:
+        result = Synthesizer(dsl=self._dsl(), task=self.tasks[0]).run(
+            max_depth=max_depth
+        )
+        assert [success.program.source for success in self.successes] == [
+            program.source for program in result.successful_programs
+        ]
+
+    def then_programs_should_match_unbatched_run(self, max_depth: int) -> None:
+        result = Synthesizer(dsl=self._dsl(), task=self.tasks[0]).run(
+            max_depth=max_depth
+        )
+        batched_result = self.results[0]
+        assert sorted(p.source for p in batched_result.successful_programs) == sorted(
+            p.source for p in result.successful_programs
+        )
+        assert (
+            batched_result.stats.n_generated_programs
+            == result.stats.n_generated_programs
+        )
+        assert result.stats.n_generated_programs % 4 != 0
+
+    def then_streamed_programs_should_be_first_of_run(self, max_depth: int) -> None:
+        result = Synthesizer(dsl=self._dsl(), task=self.tasks[0]).run(
+            max_depth=max_depth, max_solutions=len(self.successes)
+        )
+        assert [success.program.source for success in self.successes] == [
+            program.source for program in result.successful_programs
+        ]
+
+    def then_streamed_stats_should_be_live(self) -> None:
+        assert [
+            success.stats.n_successful_programs for success in self.successes
+        ] == list(range(1, len(self.successes) + 1))
+        n_generated = [success.stats.n_generated_programs for success in self.successes]
+        assert n_generated == sorted(set(n_generated))
+
+    def then_profile_should_be_consistent(self) -> None:
+        stats = self.results[0].stats
+        profile = stats.profile
+        assert profile is not None
+        assert set(profile.phases_runtime) == set(PHASES)
+        assert sum(profile.phases_runtime.values()) <= stats.runtime
+        assert sum(profile.n_programs_by_depth.values()) == stats.n_generated_programs
+        assert set(profile.n_programs_by_depth) == {0, 1, 2}
+        assert 0 < profile.n_taken_actions < profile.n_offered_actions
+        assert profile.n_dedup_hits > 0
+        assert profile.frontier_sizes[-1] == 0
+
+    def then_batch_results_should_match_individual_runs(self, max_depth: int) -> None:
+        for task, batch_result in zip(self.tasks, self.results):
+            result = Synthesizer(dsl=self._dsl(), task=task).run(max_depth=max_depth)
+            assert [p.source for p in batch_result.successful_programs] == [
+                p.source for p in result.successful_programs
+            ]
+            assert (
+                batch_result.stats.n_generated_programs
+                == result.stats.n_generated_programs
+            )
+
+    def then_programs_should_succeed(self) -> None:
+        programs = self.results[0].successful_programs
+        assert programs
+        for program in programs:
+            assert program_succeeds_on_task(program, self.tasks[0])
+
+    def then_last_statement_should_be_if_branching(self) -> None:
+        for program in self.results[0].successful_programs:
+            function_def = program.module.body[-1]
+            assert isinstance(function_def, ast.FunctionDef)
+            assert isinstance(function_def.body[-1], ast.If)
+
+    def then_n_successful_programs_should_be(self, expected: list[int]) -> None:
+        assert [r.stats.n_successful_programs for r in self.results] == expected
+
+    def then_batch_should_stop_before_exhausting_enumeration(
+        self, max_depth: int
+    ) -> None:
+        for task, batch_result in zip(self.tasks, self.results):
+            result = Synthesizer(dsl=self._dsl(), task=task).run(max_depth=max_depth)
+            assert (
+                batch_result.stats.n_generated_programs
+                < result.stats.n_generated_programs
+            )
+
+    def then_first_task_should_stop_before_the_second(self) -> None:
+        first, second = self.results
+        assert first.stats.n_generated_programs < second.stats.n_generated_programs
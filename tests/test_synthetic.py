@@ -0,0 +1,101 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_file
+from astsynth.program.evaluate import program_succeeds_on_task
+from astsynth.synthesizer import Synthesizer
+from astsynth.synthetic import (
+    SyntheticDslConfig,
+    generate_dsl,
+    main,
+    plant_task,
+)
+
+
+class TestSyntheticDsl:
+    def test_controlled_parameters(self):
+        config = SyntheticDslConfig(
+            n_types=3, operations_per_type=2, arity_weights=[0, 0, 1], n_constants=4
+        )
+        dsl = generate_dsl(config, seed=0).load()
+        assert len(dsl.operations) == 6
+        assert all(len(operation.inputs_types) == 3 for operation in dsl.operations)
+        assert len(dsl.constants) == 4
+        assert {operation.output_type for operation in dsl.operations} == {
+            int,
+            str,
+            float,
+        }
+
+    def test_same_seed_same_dsl(self):
+        config = SyntheticDslConfig(n_types=4, if_branching=True)
+        assert generate_dsl(config, seed=3) == generate_dsl(config, seed=3)
+        assert generate_dsl(config, seed=3) != generate_dsl(config, seed=4)
+
+    def test_invalid_number_of_types(self):
+        with pytest.raises(ValueError, match="Number of types"):
+            generate_dsl(SyntheticDslConfig(n_types=0))
+
+
+class TestPlantedTask:
+    def test_examples_have_distinct_inputs(self):
+        synthetic_dsl = generate_dsl(SyntheticDslConfig(n_types=1), seed=0)
+        synthetic_task = plant_task(
+            synthetic_dsl, solution_depth=1, n_examples=20, seed=0
+        )
+        inputs = [inputs for inputs, _output in synthetic_task.task.iter_examples()]
+        assert len(inputs) == 10
+        assert sorted(example["x_int"] for example in inputs) == list(range(10))
+
+    def test_inputs_of_every_type(self):
+        synthetic_dsl = generate_dsl(SyntheticDslConfig(n_types=5), seed=0)
+        synthetic_task = plant_task(synthetic_dsl, solution_depth=1, seed=0)
+        assert synthetic_task.task.input_types == {
+            "x_int": int,
+            "x_str": str,
+            "x_float": float,
+            "x_ints": list,
+            "x_strs": list,
+        }
+        assert program_succeeds_on_task(synthetic_task.solution, synthetic_task.task)
+
+    @pytest.mark.parametrize("if_branching", [False, True])
+    def test_planted_solution_is_found(self, if_branching: bool):
+        synthetic_dsl = generate_dsl(
+            SyntheticDslConfig(n_types=2, if_branching=if_branching), seed=1
+        )
+        synthetic_task = plant_task(
+            synthetic_dsl, solution_depth=2, if_probability=1.0, seed=1
+        )
+        dsl = synthetic_dsl.load()
+        dsl.add_task_inputs(synthetic_task.task)
+        assert program_succeeds_on_task(synthetic_task.solution, synthetic_task.task)
+        assert ("if " in synthetic_task.solution.source) == if_branching
+
+        result = Synthesizer(
+            dsl,
+            synthetic_task.task,
+            standard_operations=synthetic_dsl.standard_operations,
+        ).run(max_depth=2, max_solutions=1)
+        assert result.stats.n_successful_programs == 1
+
+    def test_same_seed_same_task(self):
+        synthetic_dsl = generate_dsl(SyntheticDslConfig(), seed=0)
+        task = plant_task(synthetic_dsl, solution_depth=2, n_examples=7, seed=2)
+        same_task = plant_task(synthetic_dsl, solution_depth=2, n_examples=7, seed=2)
+        assert task.task == same_task.task
+        assert task.solution.source == same_task.solution.source
+        assert len(task.task.examples) == 7
+
+
+def test_command_writes_experiment(tmp_path: Path, capsys: pytest.CaptureFixture):
+    exit_code = main(["--seed", "0", "--agent", "dfs", "--output-dir", str(tmp_path)])
+    assert exit_code == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["solved"]
+    assert stats["agent"] == "dfs"
+    dsl = load_symbols_from_python_file(tmp_path / "dsl.py")
+    assert len(dsl.operations) == 4
+    assert len(json.loads((tmp_path / "examples.json").read_text())) == 5
@@ -0,0 +1,90 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+from astsynth.tracing import (
+    ACTION_CHOSEN,
+    EARLY_REJECTION,
+    EVALUATION,
+    PROGRAM_EMITTED,
+    STATE_EXPANDED,
+    ChromeTraceSink,
+    TraceEvent,
+)
+from tests.conftest import STRING_DSL_SOURCE
+
+
+class TestTracing:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(STRING_DSL_SOURCE)
+        self.task = Task.from_tuples([({"s": "ab"}, "ababab-"), ({"s": "c"}, "ccc-")])
+        self.dsl.add_task_inputs(self.task)
+
+    def test_events_of_synthesis(self):
+        events: list[TraceEvent] = []
+        synthesizer = Synthesizer(self.dsl, self.task)
+        synthesizer.hooks.subscribe(events.append)
+        result = synthesizer.run(max_depth=2)
+
+        n_events = Counter((event.name, event.phase) for event in events)
+        n_generated = result.stats.n_generated_programs
+        assert n_events[(PROGRAM_EMITTED, "i")] == n_generated
+        assert n_events[(EVALUATION, "B")] == n_events[(EVALUATION, "E")] == n_generated
+        assert n_events[(STATE_EXPANDED, "i")] > 0
+        assert n_events[(ACTION_CHOSEN, "i")] > 0
+        assert n_events[(EARLY_REJECTION, "i")] > 0
+        assert [event.timestamp for event in events] == sorted(
+            event.timestamp for event in events
+        )
+        assert (
+            sum(
+                event.args["success"]
+                for event in events
+                if event.name == EVALUATION and event.phase == "E"
+            )
+            == result.stats.n_successful_programs
+        )
+
+    def test_folded_subexpressions_are_traced_as_rejected(self):
+        self.dsl.add_folded_constants(max_depth=1)
+        events: list[TraceEvent] = []
+        synthesizer = Synthesizer(self.dsl, self.task)
+        synthesizer.hooks.subscribe(events.append)
+        synthesizer.run(max_depth=1)
+        assert any(
+            event.args == {"reason": "folded_subexpression"}
+            for event in events
+            if event.name == EARLY_REJECTION
+        )
+
+    def test_chrome_trace_sink(self, tmp_path: Path):
+        trace_path = tmp_path / "trace.json"
+        synthesizer = Synthesizer(self.dsl, self.task)
+        with ChromeTraceSink(trace_path) as sink:
+            synthesizer.hooks.subscribe(sink)
+            result = synthesizer.run(max_depth=1)
+
+        trace = json.loads(trace_path.read_text())
+        evaluations = [
+            event for event in trace["traceEvents"] if event["name"] == EVALUATION
+        ]
+        assert len(evaluations) == 2 * result.stats.n_generated_programs
+        assert {
+            operation
+            for event in evaluations
+            if event["ph"] == "B"
+            for operation in event["args"]["operations"]
+        } == {"repeat", "concat"}
+
+        sink.close()
+        synthesizer.hooks.unsubscribe(sink)
+        synthesizer.run(max_depth=1)
+        assert json.loads(trace_path.read_text()) == trace
+        with pytest.raises(ValueError):
+            sink(TraceEvent(name=EVALUATION, phase="i", timestamp=0, args={}))
@@ -0,0 +1,107 @@
+from typing import Any, List, Literal, Optional, TypeVar, Union
+
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.generator import ProgramGenerator
+from astsynth.agent import TopDownBFS
+from astsynth.program.blanks import Blank, Input
+from astsynth.program.writter import graph_to_program
+from astsynth.type_lattice import TypeLattice, is_subtype, type_source
+
+
+class TestTypeLattice:
+    @pytest.mark.parametrize(
+        "sub,sup,expected",
+        [
+            (int, int, True),
+            (bool, int, True),
+            (int, str, False),
+            (list[int], list[int], True),
+            (list[int], list[str], False),
+            (list[bool], list[int], True),
+            (list, list[int], True),
+            (list[int], list, True),
+            (dict[str, list[int]], dict[str, list[int]], True),
+            (dict[str, list[int]], dict[str, list[str]], False),
+            (str, Optional[str], True),
+            (None, Optional[str], True),
+            (Optional[str], str, False),
+            (int | str, Union[str, int, float], True),
+            (int, Any, True),
+            (list[int], object, True),
+            (TypeVar("T"), int, True),
+            (Literal["a"], str, False),
+            (tuple[int, int], tuple[int], False),
+        ],
+    )
+    def test_is_subtype(self, sub: Any, sup: Any, expected: bool):
+        assert is_subtype(sub, sup) == expected
+        assert TypeLattice([sub, sup]).is_subtype(sub, sup) == expected
+
+    def test_subtypes(self):
+        lattice = TypeLattice([int, bool, str, list[int], list[str]])
+        assert lattice.subtypes(int) == [int, bool]
+        assert lattice.subtypes(list) == [list[int], list[str], list]
+
+    def test_none_blank_type_is_none_type(self):
+        assert Blank(id="nothing", type=None).type is type(None)
+
+    @pytest.mark.parametrize(
+        "type_expression,expected_source",
+        [
+            (int, "int"),
+            (list[int], "list[int]"),
+            (Optional[str], "str | None"),
+            (dict[str, list[int]], "dict[str, list[int]]"),
+            (Any, "object"),
+            (List, "list"),
+        ],
+    )
+    def test_type_source(self, type_expression: Any, expected_source: str):
+        assert type_source(type_expression) == expected_source
+
+    def test_parametric_dsl(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "from typing import Optional",
+                    "",
+                    "def total(numbers: list[int]) -> int:",
+                    "    return sum(numbers)",
+                    "",
+                    "def words(text: str) -> list[str]:",
+                    "    return text.split()",
+                    "",
+                    "def first(texts: list[str]) -> Optional[str]:",
+                    "    return texts[0] if texts else None",
+                ]
+            )
+        )
+        assert [op.inputs_types for op in dsl.operations] == [
+            {"numbers": list[int]},
+            {"text": str},
+            {"texts": list[str]},
+        ]
+        assert dsl.operations[2].output_type == Optional[str]
+
+        dsl.inputs.append(Input(name="numbers", type=list[int]))
+        dsl.inputs.append(Input(name="text", type=str))
+        generator = ProgramGenerator(dsl=dsl, output_type=int, agent=TopDownBFS())
+        sources = [
+            graph_to_program(graph, "generated_func", dsl).source
+            for graph in generator.enumerate(max_depth=1)
+        ]
+        assert sources == [
+            "\n".join(
+                [
+                    "def total(numbers: list[int]) ->int:",
+                    "    return sum(numbers)",
+                    "",
+                    "",
+                    "def generated_func(numbers: list[int], text: str):",
+                    "    return total(numbers)",
+                    "",
+                ]
+            )
+        ]
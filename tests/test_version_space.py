@@ -0,0 +1,88 @@
+import pytest
+
+from astsynth.dsl import load_symbols_from_python_source
+from astsynth.namer import DefaultProgramNamer
+from astsynth.program.graph import ProgramGraph
+from astsynth.synthesizer import Synthesizer
+from astsynth.task import Task
+from astsynth.version_space import VersionSpace
+
+REDUNDANT_DSL_SOURCE = "\n".join(
+    [
+        'A = "a"',
+        'OTHER_A = "a"',
+        "",
+        "def concat(string: str, other_string: str) -> str:",
+        "    return string + other_string",
+        "",
+        "def first(string: str, other_string: str) -> str:",
+        "    return string",
+    ]
+)
+
+
+class TestVersionSpace:
+    @pytest.fixture(autouse=True)
+    def setup(self) -> None:
+        self.dsl = load_symbols_from_python_source(REDUNDANT_DSL_SOURCE)
+        self.task = Task.from_tuples([({"s": "b"}, "aa"), ({"s": "c"}, "aa")])
+        self.dsl.add_task_inputs(self.task)
+        self.listed = Synthesizer(self.dsl, self.task).run(max_depth=2)
+        self.space = Synthesizer(self.dsl, self.task).run(
+            max_depth=2, version_space=True
+        )
+
+    def test_same_programs_as_listed(self):
+        space = self.space.version_space
+        assert space is not None
+        assert self.space.successful_programs == []
+        assert space.count() == len(self.listed.successful_programs) == 40
+        assert sorted(
+            program.source
+            for program in space.programs(self.dsl, DefaultProgramNamer())
+        ) == sorted(program.source for program in self.listed.successful_programs)
+
+    def test_interchangeable_constants_share_terms(self):
+        space = self.space.version_space
+        assert space is not None
+        assert len(space.root) < space.count()
+        assert all(graph in space for graph in space)
+
+    def test_smallest_and_top_k(self):
+        space = self.space.version_space
+        assert space is not None
+        smallest_sizes = sorted(_size(graph) for graph in space)
+        assert _size(space.smallest()) == smallest_sizes[0]
+        assert [_size(graph) for graph in space.top_k(6)] == smallest_sizes[:6]
+        assert len(space.top_k(100)) == space.count()
+        assert space.top_k(0) == []
+
+    def test_programs_are_added_once(self):
+        space = VersionSpace(output_type=str)
+        graph = next(iter(self.space.version_space))  # type: ignore[arg-type]
+        assert space.add(graph)
+        assert not space.add(graph)
+        assert space.count() == 1
+
+    def test_programs_added_in_any_order_are_merged(self):
+        graphs = list(self.space.version_space)  # type: ignore[arg-type]
+        space = VersionSpace(output_type=str)
+        for graph in reversed(graphs):
+            assert space.add(graph)
+        assert space.count() == len(graphs)
+        assert len(space.root) < space.count()
+        assert all(graph in space for graph in graphs)
+        assert not any(space.add(graph) for graph in graphs)
+
+    def test_empty_space(self):
+        space = VersionSpace(output_type=str)
+        assert space.count() == 0
+        assert list(space) == []
+        with pytest.raises(ValueError):
+            space.smallest()
+        with pytest.raises(ValueError):
+            space.add(ProgramGraph(output_type=str))
+
+
+def _size(graph: ProgramGraph) -> int:
+    return len(list(graph.contents()))
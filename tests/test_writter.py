@@ -0,0 +1,211 @@
+from typing import Any, Optional
+
+import pytest
+
+from astsynth.dsl import DomainSpecificLanguage, load_symbols_from_python_source
+from astsynth.program.evaluate import Evaluator
+from astsynth.program.blanks import (
+    Blank,
+    BlankContent,
+    Input,
+    Operation,
+    operation,
+)
+from astsynth.program.graph import ProgramGraph
+from astsynth.program.writter import graph_to_program
+from astsynth.task import Task
+from tests.conftest import function_ast_from_source_lines, to_source_list
+
+
+class TestWritter:
+    @pytest.fixture(autouse=True)
+    def setup(self, writter_fixture: "WritterFixture") -> None:
+        self.fixture = writter_fixture
+
+    def test_identical_subtrees_are_computed_once(self):
+        def add(x: int, y: int) -> int:
+            return x + y
+
+        def double(x: int) -> int:
+            return 2 * x
+
+        def inc(x: int) -> int:
+            return x + 1
+
+        add_op = Operation.from_func(add)
+        double_op = Operation.from_func(double)
+        inc_op = Operation.from_func(inc)
+        number = Input(name="number", type=int)
+        self.fixture.given_dsl(
+            DomainSpecificLanguage(
+                inputs=[number], operations=[add_op, double_op, inc_op]
+            )
+        )
+
+        root = self.fixture.graph.root
+        self.fixture.given_filled_blank(root, add_op)
+        self.fixture.given_filled_blank(Blank(id="return>add>x", type=int), double_op)
+        self.fixture.given_filled_blank(Blank(id="return>add>y", type=int), inc_op)
+        self.fixture.given_filled_blank(
+            Blank(id="return>add>y>inc>x", type=int), double_op
+        )
+        self.fixture.given_filled_blank(
+            Blank(id="return>add>x>double>x", type=int), number
+        )
+        self.fixture.given_filled_blank(
+            Blank(id="return>add>y>inc>x>double>x", type=int), number
+        )
+
+        self.fixture.when_writting_program()
+        self.fixture.then_program_source_should_be(
+            [
+                "def add(x: int, y: int) -> int:",
+                "    return x + y",
+                "",
+                "def double(x: int) -> int:",
+                "    return 2 * x",
+                "",
+                "def inc(x: int) -> int:",
+                "    return x + 1",
+                "",
+                "def generated_func(number: int):",
+                "    x0 = double(number)",
+                "    x1 = inc(x0)",
+                "    return add(x0, x1)",
+            ]
+        )
+        self.fixture.then_program_should_compute({"number": 3}, 13)
+
+    def test_identical_impure_calls_are_not_shared(self):
+        def add(x: int, y: int) -> int:
+            return x + y
+
+        @operation(pure=False)
+        def roll(x: int) -> int:
+            return x + 1
+
+        add_op = Operation.from_func(add)
+        roll_op = Operation.from_func(roll)
+        number = Input(name="number", type=int)
+        self.fixture.given_dsl(
+            DomainSpecificLanguage(inputs=[number], operations=[add_op, roll_op])
+        )
+
+        root = self.fixture.graph.root
+        self.fixture.given_filled_blank(root, add_op)
+        self.fixture.given_filled_blank(Blank(id="return>add>x", type=int), roll_op)
+        self.fixture.given_filled_blank(Blank(id="return>add>y", type=int), roll_op)
+        self.fixture.given_filled_blank(
+            Blank(id="return>add>x>roll>x", type=int), number
+        )
+        self.fixture.given_filled_blank(
+            Blank(id="return>add>y>roll>x", type=int), number
+        )
+
+        self.fixture.when_writting_program()
+        self.fixture.then_program_source_should_be(
+            [
+                "def add(x: int, y: int) -> int:",
+                "    return x + y",
+                "",
+                "def roll(x: int) -> int:",
+                "    return x + 1",
+                "",
+                "def generated_func(number: int):",
+                "    x1 = roll(number)",
+                "    x0 = roll(number)",
+                "    return add(x0, x1)",
+            ]
+        )
+
+    def test_used_imports_and_classes_of_the_dsl_are_written(self):
+        dsl = load_symbols_from_python_source(
+            "\n".join(
+                [
+                    "import math",
+                    "from typing import Optional",
+                    "from math import *",
+                    "",
+                    "class Point:",
+                    "    def __init__(self, x: int) -> None:",
+                    "        self.x = x",
+                    "",
+                    "def make_point(x: int) -> Point:",
+                    "    return Point(x)",
+                    "",
+                    "def point_x(point: Point) -> Optional[int]:",
+                    "    return point.x",
+                ]
+            )
+        )
+        make_point, point_x = dsl.operations
+        dsl.inputs.append(Input(name="number", type=int))
+        self.fixture.given_dsl(dsl)
+        self.fixture.given_output_type(Optional[int])
+        self.fixture.given_filled_blank(self.fixture.graph.root, point_x)
+        point_blank = Blank(id="return>point_x>point", type=make_point.output_type)
+        self.fixture.given_filled_blank(point_blank, make_point)
+        self.fixture.given_filled_blank(
+            Blank(id="return>point_x>point>make_point>x", type=int), dsl.inputs[0]
+        )
+
+        self.fixture.when_writting_program()
+        self.fixture.then_program_source_should_be(
+            [
+                "from typing import Optional",
+                "from math import *",
+                "",
+                "class Point:",
+                "    def __init__(self, x: int) -> None:",
+                "        self.x = x",
+                "",
+                "def make_point(x: int) -> Point:",
+                "    return Point(x)",
+                "",
+                "def point_x(point: Point) -> Optional[int]:",
+                "    return point.x",
+                "",
+                "def generated_func(number: int):",
+                "    x0 = make_point(number)",
+                "    return point_x(x0)",
+            ]
+        )
+        self.fixture.then_program_should_succeed_on_task(
+            Task.from_tuples([({"number": 1}, 1), ({"number": 2}, 2)])
+        )
+
+
+@pytest.fixture
+def writter_fixture() -> "WritterFixture":
+    return WritterFixture()
+
+
+class WritterFixture:
+    def __init__(self) -> None:
+        self.graph = ProgramGraph(output_type=int)
+        self.dsl = DomainSpecificLanguage()
+
+    def given_dsl(self, dsl: DomainSpecificLanguage) -> None:
+        self.dsl = dsl
+
+    def given_output_type(self, output_type: Any) -> None:
+        self.graph = ProgramGraph(output_type=output_type)
+
+    def given_filled_blank(self, blank: Blank, content: BlankContent) -> None:
+        self.graph.fill_blank(blank, content)
+
+    def when_writting_program(self) -> None:
+        self.program = graph_to_program(self.graph, "generated_func", self.dsl)
+
+    def then_program_source_should_be(self, expected_lines: list[str]) -> None:
+        assert to_source_list([self.program.module]) == to_source_list(
+            [function_ast_from_source_lines(expected_lines)]
+        )
+
+    def then_program_should_succeed_on_task(self, task: Task) -> None:
+        assert Evaluator(self.dsl).program_succeeds_on_task(self.program, task)
+
+    def then_program_should_compute(self, inputs: dict, expected_output: int) -> None:
+        namespace: dict = {}
+        exec(self.program.code, namespace)
+        assert namespace[self.program.name](**inputs) == expected_output